@@ -7,6 +7,7 @@ from alembic import context
 
 from app.core.config import settings
 from app.db.base import Base
+from app.models.product import PRODUCT_SEARCH_OBJECTS
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -30,6 +31,12 @@ target_metadata = Base.metadata
 def get_url():
     return settings.SQLALCHEMY_DATABASE_URI
 
+def include_object(object, name, type_, reflected, compare_to):
+    # Поисковые объекты PostgreSQL создаются вручную и в метаданных не описаны
+    if reflected and compare_to is None and name in PRODUCT_SEARCH_OBJECTS:
+        return False
+    return True
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -48,6 +55,7 @@ def run_migrations_offline():
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -71,7 +79,8 @@ def run_migrations_online():
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
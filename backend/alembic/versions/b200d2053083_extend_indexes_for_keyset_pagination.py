@@ -0,0 +1,47 @@
+"""Extend indexes for keyset pagination
+
+Revision ID: b200d2053083
+Revises: bdb94c32ea11
+Create Date: 2026-10-17 11:40:03.918274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b200d2053083'
+down_revision: Union[str, Sequence[str], None] = 'bdb94c32ea11'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Курсор списков - (created_at, id) или id, поэтому id добавлен в конец индексов
+    op.drop_index('ix_orders_shop_id_created_at', table_name='orders')
+    op.create_index('ix_orders_shop_id_created_at', 'orders', ['shop_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.drop_index('ix_orders_shop_id_status_created_at', table_name='orders')
+    op.create_index('ix_orders_shop_id_status_created_at', 'orders', ['shop_id', 'status', 'created_at', 'id'], unique=False)
+    op.drop_index('ix_orders_user_id_created_at', table_name='orders')
+    op.create_index('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at', 'id'], unique=False)
+    op.drop_index('ix_reviews_product_id_created_at', table_name='reviews')
+    op.create_index('ix_reviews_product_id_created_at', 'reviews', ['product_id', 'created_at', 'id'], unique=False)
+    op.drop_index('ix_categories_shop_id_parent_id', table_name='categories')
+    op.create_index('ix_categories_shop_id_parent_id', 'categories', ['shop_id', 'parent_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_categories_shop_id_parent_id', table_name='categories')
+    op.create_index('ix_categories_shop_id_parent_id', 'categories', ['shop_id', 'parent_id'], unique=False)
+    op.drop_index('ix_reviews_product_id_created_at', table_name='reviews')
+    op.create_index('ix_reviews_product_id_created_at', 'reviews', ['product_id', 'created_at'], unique=False)
+    op.drop_index('ix_orders_user_id_created_at', table_name='orders')
+    op.create_index('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at'], unique=False)
+    op.drop_index('ix_orders_shop_id_status_created_at', table_name='orders')
+    op.create_index('ix_orders_shop_id_status_created_at', 'orders', ['shop_id', 'status', 'created_at'], unique=False)
+    op.drop_index('ix_orders_shop_id_created_at', table_name='orders')
+    op.create_index('ix_orders_shop_id_created_at', 'orders', ['shop_id', sa.text('created_at DESC')], unique=False)
@@ -0,0 +1,60 @@
+"""Add query indexes
+
+Revision ID: bdb94c32ea11
+Revises: 71ac1c6f7c76
+Create Date: 2026-10-17 09:12:41.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bdb94c32ea11'
+down_revision: Union[str, Sequence[str], None] = '71ac1c6f7c76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_shops_owner_id'), 'shops', ['owner_id'], unique=False)
+    op.create_index(op.f('ix_categories_parent_id'), 'categories', ['parent_id'], unique=False)
+    op.create_index('ix_categories_shop_id_parent_id', 'categories', ['shop_id', 'parent_id'], unique=False)
+    # CRUDOrder.get_by_shop: WHERE shop_id = ? ORDER BY created_at DESC
+    op.create_index('ix_orders_shop_id_created_at', 'orders', ['shop_id', sa.text('created_at DESC')], unique=False)
+    # CRUDOrder.get_by_shop_and_status
+    op.create_index('ix_orders_shop_id_status_created_at', 'orders', ['shop_id', 'status', 'created_at'], unique=False)
+    op.create_index('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False)
+    op.create_index('ix_user_roles_user_id_shop_id', 'user_roles', ['user_id', 'shop_id'], unique=False)
+    op.create_index(op.f('ix_payments_order_id'), 'payments', ['order_id'], unique=False)
+    op.create_index(op.f('ix_payments_provider_payment_id'), 'payments', ['provider_payment_id'], unique=False)
+    op.create_index('ix_products_shop_id_id', 'products', ['shop_id', 'id'], unique=False)
+    op.create_index(op.f('ix_products_category_id'), 'products', ['category_id'], unique=False)
+    op.create_index('ix_cart_items_user_id_product_id', 'cart_items', ['user_id', 'product_id'], unique=False)
+    op.create_index('ix_product_images_product_id_order', 'product_images', ['product_id', 'order'], unique=False)
+    op.create_index('ix_reviews_product_id_created_at', 'reviews', ['product_id', 'created_at'], unique=False)
+    op.create_index('ix_reviews_user_id_product_id', 'reviews', ['user_id', 'product_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reviews_user_id_product_id', table_name='reviews')
+    op.drop_index('ix_reviews_product_id_created_at', table_name='reviews')
+    op.drop_index('ix_product_images_product_id_order', table_name='product_images')
+    op.drop_index('ix_cart_items_user_id_product_id', table_name='cart_items')
+    op.drop_index(op.f('ix_products_category_id'), table_name='products')
+    op.drop_index('ix_products_shop_id_id', table_name='products')
+    op.drop_index(op.f('ix_payments_provider_payment_id'), table_name='payments')
+    op.drop_index(op.f('ix_payments_order_id'), table_name='payments')
+    op.drop_index('ix_user_roles_user_id_shop_id', table_name='user_roles')
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
+    op.drop_index('ix_orders_user_id_created_at', table_name='orders')
+    op.drop_index('ix_orders_shop_id_status_created_at', table_name='orders')
+    op.drop_index('ix_orders_shop_id_created_at', table_name='orders')
+    op.drop_index('ix_categories_shop_id_parent_id', table_name='categories')
+    op.drop_index(op.f('ix_categories_parent_id'), table_name='categories')
+    op.drop_index(op.f('ix_shops_owner_id'), table_name='shops')
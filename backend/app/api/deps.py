@@ -1,71 +1,72 @@
+from dataclasses import dataclass
 from typing import Generator, Optional
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
-from app.core.security import get_current_user, check_user_role
+from app.core.security import Permission, get_current_user, get_shop_permissions
+from app.models.shop import Shop
 from app.models.user import User
 from backend.app.crud.shop import shop as shop_crud
 
-def get_current_active_user(
+async def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-def get_shop_owner(
+@dataclass
+class ShopAccess:
+    shop_id: int
+    permissions: Permission
+    # Загружен при разрешении прав; None, если маска взята из кэша
+    shop: Optional[Shop] = None
+
+async def get_shop_access(
     shop_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
-) -> User:
-    shop = shop_crud.get(db=db, id=shop_id)
-    if not shop:
+) -> ShopAccess:
+    permissions, shop = await get_shop_permissions(db, current_user, shop_id)
+    if permissions is None:
         raise HTTPException(status_code=404, detail="Shop not found")
-    
-    if shop.owner_id != current_user.id:
+    return ShopAccess(shop_id=shop_id, permissions=permissions, shop=shop)
+
+async def get_current_shop(
+    db: AsyncSession = Depends(get_db),
+    access: ShopAccess = Depends(get_shop_access),
+) -> Shop:
+    if access.shop is None:
+        access.shop = await shop_crud.get(db=db, id=access.shop_id)
+        if not access.shop:
+            raise HTTPException(status_code=404, detail="Shop not found")
+    return access.shop
+
+def _require(access: ShopAccess, required: Permission) -> None:
+    if not access.permissions & required:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
+
+async def get_shop_owner(
+    access: ShopAccess = Depends(get_shop_access),
+    current_user: User = Depends(get_current_active_user),
+) -> User:
+    _require(access, Permission.OWNER)
     return current_user
 
-def get_shop_admin(
-    shop_id: int,
-    db: Session = Depends(get_db),
+async def get_shop_admin(
+    access: ShopAccess = Depends(get_shop_access),
     current_user: User = Depends(get_current_active_user),
 ) -> User:
-    shop = shop_crud.get(db=db, id=shop_id)
-    if not shop:
-        raise HTTPException(status_code=404, detail="Shop not found")
-    
-    if shop.owner_id == current_user.id:
-        return current_user
-    
-    if check_user_role(current_user, "admin", shop_id, db):
-        return current_user
-    
-    raise HTTPException(
-        status_code=status.HTTP_403_FORBIDDEN,
-        detail="Not enough permissions",
-    )
+    _require(access, Permission.OWNER | Permission.ADMIN)
+    return current_user
 
-def get_shop_manager(
-    shop_id: int,
-    db: Session = Depends(get_db),
+async def get_shop_manager(
+    access: ShopAccess = Depends(get_shop_access),
     current_user: User = Depends(get_current_active_user),
 ) -> User:
-    shop = shop_crud.get(db=db, id=shop_id)
-    if not shop:
-        raise HTTPException(status_code=404, detail="Shop not found")
-    
-    if shop.owner_id == current_user.id:
-        return current_user
-    
-    if check_user_role(current_user, "admin", shop_id, db) or check_user_role(current_user, "manager", shop_id, db):
-        return current_user
-    
-    raise HTTPException(
-        status_code=status.HTTP_403_FORBIDDEN,
-        detail="Not enough permissions",
-    )
+    _require(access, Permission.OWNER | Permission.ADMIN | Permission.MANAGER)
+    return current_user
@@ -2,7 +2,7 @@ from datetime import timedelta
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db
 from app.core.security import create_access_token, verify_telegram_auth
@@ -14,8 +14,8 @@ from app.schemas.user import UserCreate, User
 router = APIRouter()
 
 @router.post("/telegram-login", response_model=AuthResponse)
-def login_with_telegram(
-    auth_data: TelegramAuth, db: Session = Depends(get_db)
+async def login_with_telegram(
+    auth_data: TelegramAuth, db: AsyncSession = Depends(get_db)
 ) -> Any:
     auth_data_dict = auth_data.model_dump()
     
@@ -25,7 +25,7 @@ def login_with_telegram(
             detail="Invalid authentication data",
         )
     
-    user = user_crud.get_by_telegram_id(db, telegram_id=str(auth_data.id))
+    user = await user_crud.get_by_telegram_id(db, telegram_id=str(auth_data.id))
     if not user:
         user_in = UserCreate(
             telegram_id=str(auth_data.id),
@@ -33,7 +33,7 @@ def login_with_telegram(
             first_name=auth_data.first_name,
             last_name=auth_data.last_name,
         )
-        user = user_crud.create(db=db, obj_in=user_in)
+        user = await user_crud.create(db=db, obj_in=user_in)
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -49,10 +49,10 @@ def login_with_telegram(
     }
 
 @router.post("/token", response_model=Token)
-def get_access_token(
-    telegram_id: str, db: Session = Depends(get_db)
+async def get_access_token(
+    telegram_id: str, db: AsyncSession = Depends(get_db)
 ) -> Any:
-    user = user_crud.get_by_telegram_id(db, telegram_id=telegram_id)
+    user = await user_crud.get_by_telegram_id(db, telegram_id=telegram_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
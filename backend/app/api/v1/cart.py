@@ -1,7 +1,7 @@
 from typing import Any, List
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, get_current_active_user
 from backend.app.crud.cart import cart_item as cart_item_crud
@@ -12,13 +12,13 @@ from app.schemas.cart import CartItem, CartItemCreate, CartItemUpdate, CartItemW
 router = APIRouter()
 
 @router.get("/", response_model=Cart)
-def read_cart(
-    db: Session = Depends(get_db),
+async def read_cart(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    items = cart_item_crud.get_by_user(db=db, user_id=current_user.id)
+    items = await cart_item_crud.get_by_user(db=db, user_id=current_user.id)
     
-    totals = cart_item_crud.get_cart_totals(db=db, user_id=current_user.id)
+    totals = await cart_item_crud.get_cart_totals(db=db, user_id=current_user.id)
     
     return {
         "items": items,
@@ -27,12 +27,12 @@ def read_cart(
     }
 
 @router.post("/items", response_model=CartItem)
-def add_to_cart(
+async def add_to_cart(
     item_in: CartItemCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    product = product_crud.get(db=db, id=item_in.product_id)
+    product = await product_crud.get(db=db, id=item_in.product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
@@ -42,44 +42,44 @@ def add_to_cart(
     item_in.user_id = current_user.id
     item_in.price = product.discount_price if product.discount_price else product.price
     
-    item = cart_item_crud.create_or_update(db=db, obj_in=item_in)
+    item = await cart_item_crud.create_or_update(db=db, obj_in=item_in)
     return item
 
 @router.put("/items/{item_id}", response_model=CartItem)
-def update_cart_item(
+async def update_cart_item(
     item_id: int,
     item_in: CartItemUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    item = cart_item_crud.get(db=db, id=item_id)
+    item = await cart_item_crud.get(db=db, id=item_id)
     if not item or item.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Cart item not found")
     
-    product = product_crud.get(db=db, id=item.product_id)
+    product = await product_crud.get(db=db, id=item.product_id)
     if not product.is_available or (item_in.quantity and product.stock < item_in.quantity):
         raise HTTPException(status_code=400, detail="Product not available in requested quantity")
     
-    item = cart_item_crud.update(db=db, db_obj=item, obj_in=item_in)
+    item = await cart_item_crud.update(db=db, db_obj=item, obj_in=item_in)
     return item
 
 @router.delete("/items/{item_id}")
-def remove_from_cart(
+async def remove_from_cart(
     item_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    item = cart_item_crud.get(db=db, id=item_id)
+    item = await cart_item_crud.get(db=db, id=item_id)
     if not item or item.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Cart item not found")
     
-    cart_item_crud.remove(db=db, id=item_id)
+    await cart_item_crud.remove(db=db, id=item_id)
     return {"status": "success"}
 
 @router.delete("/")
-def clear_cart(
-    db: Session = Depends(get_db),
+async def clear_cart(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    cart_item_crud.clear_cart(db=db, user_id=current_user.id)
+    await cart_item_crud.clear_cart(db=db, user_id=current_user.id)
     return {"status": "success"}
@@ -1,102 +1,134 @@
 from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status, File, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, get_current_active_user, get_shop_manager
+from app.core.cache import catalog_cache
+from app.core.suggest import suggest_index
 from backend.app.crud.category import category as category_crud
+from backend.app.crud.product import product as product_crud
 from app.models.user import User
 from app.schemas.category import Category, CategoryCreate, CategoryUpdate, CategoryWithChildren
 
 router = APIRouter()
 
+
+async def _invalidate_category(db: AsyncSession, category: Any) -> None:
+    # Категория входит в дерево магазина и в карточки своих товаров
+    await catalog_cache.invalidate_shop(category.shop_id)
+    product_ids = await product_crud.get_ids_by_category(db=db, category_id=category.id)
+    await catalog_cache.invalidate_products(*product_ids)
+
+
 @router.get("/shop/{shop_id}", response_model=List[CategoryWithChildren])
-def read_categories(
+async def read_categories(
     shop_id: int,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
-    categories = category_crud.get_by_shop(
-        db=db, shop_id=shop_id, skip=skip, limit=limit
+    cache_key = await catalog_cache.key("shop", shop_id, "categories", skip=skip, limit=limit, cursor=cursor)
+    cached = await catalog_cache.get(cache_key, "categories")
+    if cached:
+        return cached
+
+    categories = await category_crud.get_by_shop(
+        db=db, shop_id=shop_id, skip=skip, limit=limit, cursor=cursor
+    )
+    return await catalog_cache.store(
+        cache_key, List[CategoryWithChildren], categories,
+        next_cursor=category_crud.next_cursor(categories, limit),
     )
-    return categories
 
 @router.post("/shop/{shop_id}", response_model=Category)
-def create_category(
+async def create_category(
     shop_id: int,
     category_in: CategoryCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_manager),
 ) -> Any:
-    category = category_crud.create_with_shop(
+    category = await category_crud.create_with_shop(
         db=db, obj_in=category_in, shop_id=shop_id
     )
+    await catalog_cache.invalidate_shop(shop_id)
+    suggest_index.update_category(category)
     return category
 
 @router.get("/{category_id}", response_model=Category)
-def read_category(
+async def read_category(
     category_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
-    category = category_crud.get(db=db, id=category_id)
+    category = await category_crud.get(db=db, id=category_id, use_replica=True)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
     return category
 
 @router.put("/{category_id}", response_model=Category)
-def update_category(
+async def update_category(
     category_id: int,
     category_in: CategoryUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_manager),
 ) -> Any:
-    category = category_crud.get(db=db, id=category_id)
+    category = await category_crud.get(db=db, id=category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
-    category = category_crud.update(db=db, db_obj=category, obj_in=category_in)
+    category = await category_crud.update(db=db, db_obj=category, obj_in=category_in)
+    await _invalidate_category(db, category)
+    suggest_index.update_category(category)
     return category
 
 @router.delete("/{category_id}")
-def delete_category(
+async def delete_category(
     category_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_manager),
 ) -> Any:
-    category = category_crud.get(db=db, id=category_id)
+    category = await category_crud.get(db=db, id=category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
-    category = category_crud.remove(db=db, id=category_id)
+    await _invalidate_category(db, category)
+    category = await category_crud.remove(db=db, id=category_id)
+    suggest_index.remove_category(category.shop_id, category_id)
     return {"status": "success"}
 
 @router.get("/{category_id}/subcategories", response_model=List[Category])
-def read_subcategories(
+async def read_subcategories(
+    response: Response,
     category_id: int,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
-    subcategories = category_crud.get_subcategories(
-        db=db, parent_id=category_id, skip=skip, limit=limit
+    subcategories = await category_crud.get_subcategories(
+        db=db, parent_id=category_id, skip=skip, limit=limit, cursor=cursor
     )
+    next_cursor = category_crud.next_cursor(subcategories, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return subcategories
 
 @router.post("/{category_id}/image", response_model=Category)
-def upload_category_image(
+async def upload_category_image(
     category_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_manager),
 ) -> Any:
-    category = category_crud.get(db=db, id=category_id)
+    category = await category_crud.get(db=db, id=category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
     # Логика загрузки файла и получения URL
     image_url = f"/uploads/categories/{category_id}/{file.filename}"
     
-    category = category_crud.update(db=db, db_obj=category, obj_in={"image_url": image_url})
+    category = await category_crud.update(db=db, db_obj=category, obj_in={"image_url": image_url})
+    await _invalidate_category(db, category)
     return category
@@ -1,16 +1,19 @@
 from typing import Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import logging
 
 from app.api.deps import get_db
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis import get_redis
 
 router = APIRouter()
 
 @router.get("/")
-async def health_check(db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def health_check(db: AsyncSession = Depends(get_db)) -> Dict[str, Any]:
     """
     Проверяет здоровье системы, включая подключение к БД.
     """
@@ -25,13 +28,13 @@ async def health_check(db: Session = Depends(get_db)) -> Dict[str, Any]:
     }
 
     try:
-        db.execute("SELECT 1")
+        await db.execute(text("SELECT 1"))
     except Exception as e:
         logging.error(f"Database health check failed: {str(e)}")
         health_data["services"]["database"] = "error"
         health_data["status"] = "error"
     try:
-        pass
+        await get_redis().ping()
     except Exception as e:
         logging.error(f"Redis health check failed: {str(e)}")
         health_data["services"]["redis"] = "error"
@@ -43,3 +46,11 @@ async def health_check(db: Session = Depends(get_db)) -> Dict[str, Any]:
         )
     
     return health_data
+
+
+@router.get("/metrics")
+async def get_metrics() -> Dict[str, float]:
+    """
+    Внутренние метрики процесса: состояние пулов соединений и т.п.
+    """
+    return metrics.snapshot()
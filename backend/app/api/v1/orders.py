@@ -1,11 +1,11 @@
 from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, get_current_active_user, get_shop_admin
-from backend.app.crud.order import order as order_crud
-from backend.app.crud.cart import cart_item as cart_item_crud
+from app.core.cache import catalog_cache
+from backend.app.crud.order import CheckoutError, OrderStatusConflict, order as order_crud
 from app.models.user import User
 from app.models.order import OrderStatus
 from app.schemas.order import Order, OrderCreate, OrderUpdate, OrderWithItems
@@ -13,40 +13,50 @@ from app.schemas.order import Order, OrderCreate, OrderUpdate, OrderWithItems
 router = APIRouter()
 
 @router.get("/my", response_model=List[Order])
-def read_user_orders(
+async def read_user_orders(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    orders = order_crud.get_by_user(
-        db=db, user_id=current_user.id, skip=skip, limit=limit
+    orders = await order_crud.get_by_user(
+        db=db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor
     )
+    next_cursor = order_crud.next_cursor(orders, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return orders
 
 @router.get("/shop/{shop_id}", response_model=List[Order])
-def read_shop_orders(
+async def read_shop_orders(
+    response: Response,
     shop_id: int,
     status: Optional[OrderStatus] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_admin),
 ) -> Any:
     if status:
-        orders = order_crud.get_by_shop_and_status(
-            db=db, shop_id=shop_id, status=status, skip=skip, limit=limit
+        orders = await order_crud.get_by_shop_and_status(
+            db=db, shop_id=shop_id, status=status, skip=skip, limit=limit, cursor=cursor
         )
     else:
-        orders = order_crud.get_by_shop(
-            db=db, shop_id=shop_id, skip=skip, limit=limit
+        orders = await order_crud.get_by_shop(
+            db=db, shop_id=shop_id, skip=skip, limit=limit, cursor=cursor
         )
+    next_cursor = order_crud.next_cursor(orders, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return orders
 
 @router.post("/", response_model=Order)
-def create_order(
+async def create_order(
     order_in: OrderCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     if order_in.user_id != current_user.id:
@@ -55,19 +65,21 @@ def create_order(
             detail="Cannot create order for another user",
         )
     
-    order = order_crud.create_with_items(db=db, obj_in=order_in)
-    
-    cart_item_crud.clear_cart(db=db, user_id=current_user.id)
+    try:
+        order = await order_crud.create_with_items(db=db, obj_in=order_in, clear_cart=True)
+    except CheckoutError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.errors)
     
+    await catalog_cache.invalidate_stock(order_in.shop_id, {item.product_id for item in order_in.items})
     return order
 
 @router.get("/{order_id}", response_model=OrderWithItems)
-def read_order(
+async def read_order(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    order = order_crud.get(db=db, id=order_id)
+    order = await order_crud.get(db=db, id=order_id, use_replica=True)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
@@ -82,29 +94,45 @@ def read_order(
     return order
 
 @router.put("/{order_id}", response_model=Order)
-def update_order(
+async def update_order(
     order_id: int,
     order_in: OrderUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_admin),
 ) -> Any:
-    order = order_crud.get(db=db, id=order_id)
+    order = await order_crud.get(db=db, id=order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    order = order_crud.update(db=db, db_obj=order, obj_in=order_in)
+    update_data = order_in.model_dump(exclude_unset=True)
+    # Статус меняется только через update_status - с проверкой перехода и удержаниями
+    status = update_data.pop("status", None)
+    if status is not None:
+        try:
+            order = await order_crud.update_status(db=db, order_id=order_id, status=status)
+        except OrderStatusConflict as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if status == OrderStatus.CANCELLED:
+            await catalog_cache.invalidate_stock(order.shop_id, {item.product_id for item in order.items})
+    if update_data:
+        order = await order_crud.update(db=db, db_obj=order, obj_in=update_data)
     return order
 
 @router.put("/{order_id}/status", response_model=Order)
-def update_order_status(
+async def update_order_status(
     order_id: int,
     status: OrderStatus,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_admin),
 ) -> Any:
-    order = order_crud.get(db=db, id=order_id)
+    order = await order_crud.get(db=db, id=order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    order = order_crud.update_status(db=db, order_id=order_id, status=status)
+    try:
+        order = await order_crud.update_status(db=db, order_id=order_id, status=status)
+    except OrderStatusConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if status == OrderStatus.CANCELLED:
+        await catalog_cache.invalidate_stock(order.shop_id, {item.product_id for item in order.items})
     return order
@@ -1,12 +1,16 @@
-from typing import Any, Dict
+from typing import Any
+import json
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, get_current_active_user, get_shop_admin
 from backend.app.crud.payment import payment as payment_crud
-from backend.app.crud.order import order as order_crud
-from app.services.payment_service import create_payment, process_payment_callback
+from backend.app.crud.order import OrderStatusConflict, order as order_crud
+from app.core.metrics import metrics
+from app.crud.webhook import webhook_event as webhook_event_crud
+from app.services.payment_service import create_payment, get_payment_service, webhook_event_id
+from app.services.webhook_inbox import webhook_inbox
 from app.models.user import User
 from app.models.payment import PaymentStatus, PaymentProvider
 from app.models.order import OrderStatus
@@ -18,10 +22,10 @@ router = APIRouter()
 async def create_payment_for_order(
     order_id: int,
     provider: PaymentProvider,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    order = order_crud.get(db=db, id=order_id)
+    order = await order_crud.get(db=db, id=order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
@@ -48,30 +52,48 @@ async def create_payment_for_order(
 @router.post("/webhook/{provider}")
 async def payment_webhook(
     provider: PaymentProvider,
-    payload: Dict[str, Any],
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
-    background_tasks.add_task(
-        process_payment_callback,
+    # Событие только проверяется и сохраняется, обрабатывают его воркеры webhook_inbox
+    raw_payload = await request.body()
+    try:
+        payload = json.loads(raw_payload)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON payload")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON payload")
+    # Подпись проверяется до записи: иначе поддельный запрос занял бы id события
+    # провайдера, и настоящая доставка отбросилась бы как повтор
+    service = get_payment_service(provider)
+    if not service or not await service.verify_webhook(raw_payload, request.headers):
+        metrics.inc("webhooks.rejected")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid webhook signature")
+    
+    created = await webhook_event_crud.enqueue(
+        db=db,
         provider=provider,
-        payload=payload,
-        db=db
+        event_id=webhook_event_id(provider, payload, raw_payload),
+        payload=raw_payload,
+        headers=dict(request.headers),
     )
+    metrics.inc("webhooks.received" if created else "webhooks.duplicate")
+    if created:
+        webhook_inbox.notify()
     
     return {"status": "processing"}
 
 @router.get("/{payment_id}", response_model=Payment)
 async def get_payment(
     payment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    payment = payment_crud.get(db=db, id=payment_id)
+    payment = await payment_crud.get(db=db, id=payment_id, use_replica=True)
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     
-    order = order_crud.get(db=db, id=payment.order_id)
+    order = await order_crud.get(db=db, id=payment.order_id, use_replica=True)
     if order.user_id != current_user.id:
         shop = order.shop
         if shop.owner_id != current_user.id:
@@ -87,24 +109,28 @@ async def update_payment_status(
     payment_id: int,
     status: PaymentStatus,
     details: str = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_admin),
 ) -> Any:
-    payment = payment_crud.get(db=db, id=payment_id)
+    payment = await payment_crud.get(db=db, id=payment_id)
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     
-    payment = payment_crud.update_status(
+    # Сначала заказ: при недопустимом переходе платёж остаётся как был
+    try:
+        if status == PaymentStatus.COMPLETED:
+            await order_crud.update_status(
+                db=db, order_id=payment.order_id, status=OrderStatus.PAID
+            )
+        elif status == PaymentStatus.FAILED:
+            await order_crud.update_status(
+                db=db, order_id=payment.order_id, status=OrderStatus.PENDING
+            )
+    except OrderStatusConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    payment = await payment_crud.update_status(
         db=db, payment_id=payment_id, status=status, details=details
     )
     
-    if status == PaymentStatus.COMPLETED:
-        order_crud.update_status(
-            db=db, order_id=payment.order_id, status=OrderStatus.PAID
-        )
-    elif status == PaymentStatus.FAILED:
-        order_crud.update_status(
-            db=db, order_id=payment.order_id, status=OrderStatus.PENDING
-        )
-    
     return payment
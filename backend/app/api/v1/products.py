@@ -1,104 +1,137 @@
-from typing import Any, List, Optional
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, File, UploadFile, Form
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, get_current_active_user, get_shop_manager
+from app.core.cache import catalog_cache
+from app.core.suggest import suggest_index
+from backend.app.crud.facet import ProductFilters, product_facet as product_facet_crud
 from backend.app.crud.product import product as product_crud, product_image as product_image_crud
 from app.models.user import User
 from app.schemas.product import (
     Product, ProductCreate, ProductUpdate, ProductImage, 
-    ProductImageCreate, ProductWithImages, ProductWithCategory
+    ProductImageCreate, ProductWithImages, ProductWithCategory, ProductSuggestion
 )
+from app.services.telegram_files import telegram_file_cache
 
 router = APIRouter()
 
 @router.get("/shop/{shop_id}", response_model=List[ProductWithImages])
-def read_products(
+async def read_products(
     shop_id: int,
     skip: int = 0,
     limit: int = 100,
-    category_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    filters: ProductFilters = Depends(),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
-    if category_id:
-        products = product_crud.get_by_category(
-            db=db, category_id=category_id, skip=skip, limit=limit
-        )
-    else:
-        products = product_crud.get_by_shop(
-            db=db, shop_id=shop_id, skip=skip, limit=limit
-        )
-    return products
+    # Отзывы сбрасывают только кэш товаров, поэтому выборку по рейтингу не кэшируем
+    cache_key = None if filters.min_rating is not None else await catalog_cache.key(
+        "shop", shop_id, "products", skip=skip, limit=limit, cursor=cursor, **asdict(filters)
+    )
+    cached = await catalog_cache.get(cache_key, "products")
+    if cached:
+        return cached
+
+    products = await product_crud.get_by_shop(
+        db=db, shop_id=shop_id, skip=skip, limit=limit, cursor=cursor, filters=filters
+    )
+    return await catalog_cache.store(
+        cache_key, List[ProductWithImages], products,
+        next_cursor=product_crud.next_cursor(products, limit),
+    )
+
+@router.get("/shop/{shop_id}/facets", response_model=Dict[str, Dict[str, int]])
+async def read_product_facets(
+    shop_id: int,
+    filters: ProductFilters = Depends(),
+    db: AsyncSession = Depends(get_db),
+) -> Any:
+    return await product_facet_crud.get_counts(db=db, shop_id=shop_id, filters=filters)
 
 @router.post("/shop/{shop_id}", response_model=Product)
-def create_product(
+async def create_product(
     shop_id: int,
     product_in: ProductCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_manager),
 ) -> Any:
-    product = product_crud.create_with_shop(
+    product = await product_crud.create_with_shop(
         db=db, obj_in=product_in, shop_id=shop_id
     )
+    await catalog_cache.invalidate_shop(shop_id)
+    suggest_index.update_product(product)
     return product
 
 @router.get("/{product_id}", response_model=ProductWithCategory)
-def read_product(
+async def read_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
-    product = product_crud.get_with_images(db=db, id=product_id)
+    cache_key = await catalog_cache.key("product", product_id, "product")
+    cached = await catalog_cache.get(cache_key, "product")
+    if cached:
+        return cached
+
+    product = await product_crud.get_with_images(db=db, id=product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    return product
+    return await catalog_cache.store(cache_key, ProductWithCategory, product)
 
 @router.put("/{product_id}", response_model=Product)
-def update_product(
+async def update_product(
     product_id: int,
     product_in: ProductUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_manager),
 ) -> Any:
-    product = product_crud.get(db=db, id=product_id)
+    product = await product_crud.get(db=db, id=product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    product = product_crud.update(db=db, db_obj=product, obj_in=product_in)
+    product = await product_crud.update(db=db, db_obj=product, obj_in=product_in)
+    await catalog_cache.invalidate_shop(product.shop_id)
+    await catalog_cache.invalidate_products(product_id)
+    suggest_index.update_product(product)
     return product
 
 @router.delete("/{product_id}")
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_manager),
 ) -> Any:
-    product = product_crud.get(db=db, id=product_id)
+    product = await product_crud.get(db=db, id=product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    product = product_crud.remove(db=db, id=product_id)
+    product = await product_crud.remove(db=db, id=product_id)
+    await catalog_cache.invalidate_shop(product.shop_id)
+    await catalog_cache.invalidate_products(product_id)
+    suggest_index.remove_product(product.shop_id, product_id)
     return {"status": "success"}
 
 @router.get("/{product_id}/images", response_model=List[ProductImage])
-def read_product_images(
+async def read_product_images(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
-    images = product_image_crud.get_by_product(db=db, product_id=product_id)
+    images = await product_image_crud.get_by_product(db=db, product_id=product_id)
     return images
 
 @router.post("/{product_id}/images", response_model=ProductImage)
-def upload_product_image(
+async def upload_product_image(
     product_id: int,
     is_primary: bool = Form(False),
     order: int = Form(0),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_manager),
 ) -> Any:
-    product = product_crud.get(db=db, id=product_id)
+    product = await product_crud.get(db=db, id=product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
@@ -111,33 +144,55 @@ def upload_product_image(
         order=order
     )
     
-    image = product_image_crud.create_with_product(
+    image = await product_image_crud.create_with_product(
         db=db, obj_in=image_in, product_id=product_id
     )
+    # Тот же путь мог достаться новому файлу
+    await telegram_file_cache.invalidate(db, image_url)
+    await catalog_cache.invalidate_shop(product.shop_id)
+    await catalog_cache.invalidate_products(product_id)
     return image
 
 @router.delete("/images/{image_id}")
-def delete_product_image(
+async def delete_product_image(
     image_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_manager),
 ) -> Any:
-    image = product_image_crud.get(db=db, id=image_id)
+    image = await product_image_crud.get(db=db, id=image_id)
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
     
-    image = product_image_crud.remove(db=db, id=image_id)
+    product = await product_crud.get(db=db, id=image.product_id)
+    image = await product_image_crud.remove(db=db, id=image_id)
+    if product:
+        await catalog_cache.invalidate_shop(product.shop_id)
+        await catalog_cache.invalidate_products(product.id)
     return {"status": "success"}
 
 @router.get("/search/{shop_id}", response_model=List[ProductWithImages])
-def search_products(
+async def search_products(
+    response: Response,
     shop_id: int,
     query: str,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
-    products = product_crud.search(
-        db=db, shop_id=shop_id, query=query, skip=skip, limit=limit
+    products = await product_crud.search(
+        db=db, shop_id=shop_id, query=query, skip=skip, limit=limit, cursor=cursor
     )
+    next_cursor = product_crud.next_search_cursor(products, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return products
+
+@router.get("/suggest/{shop_id}", response_model=List[ProductSuggestion])
+async def suggest_products(
+    shop_id: int,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+) -> Any:
+    return await suggest_index.suggest(db, shop_id, q, limit)
@@ -1,9 +1,10 @@
-from typing import Any, List
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, get_current_active_user, get_shop_admin
+from app.core.cache import catalog_cache
 from backend.app.crud.review import review as review_crud
 from app.models.user import User
 from app.schemas.review import Review, ReviewCreate, ReviewUpdate, ReviewWithUser
@@ -11,21 +12,26 @@ from app.schemas.review import Review, ReviewCreate, ReviewUpdate, ReviewWithUse
 router = APIRouter()
 
 @router.get("/product/{product_id}", response_model=List[ReviewWithUser])
-def read_product_reviews(
+async def read_product_reviews(
+    response: Response,
     product_id: int,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
-    reviews = review_crud.get_by_product(
-        db=db, product_id=product_id, skip=skip, limit=limit
+    reviews = await review_crud.get_by_product(
+        db=db, product_id=product_id, skip=skip, limit=limit, cursor=cursor
     )
+    next_cursor = review_crud.next_cursor(reviews, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return reviews
 
 @router.post("/", response_model=Review)
-def create_review(
+async def create_review(
     review_in: ReviewCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     if review_in.user_id != current_user.id:
@@ -34,7 +40,7 @@ def create_review(
             detail="Cannot create review for another user",
         )
     
-    existing_review = review_crud.get_by_user_and_product(
+    existing_review = await review_crud.get_by_user_and_product(
         db=db, user_id=current_user.id, product_id=review_in.product_id
     )
     if existing_review:
@@ -43,17 +49,18 @@ def create_review(
             detail="You have already reviewed this product",
         )
     
-    review = review_crud.create(db=db, obj_in=review_in)
+    review = await review_crud.create(db=db, obj_in=review_in)
+    await catalog_cache.invalidate_products(review.product_id)
     return review
 
 @router.put("/{review_id}", response_model=Review)
-def update_review(
+async def update_review(
     review_id: int,
     review_in: ReviewUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    review = review_crud.get(db=db, id=review_id)
+    review = await review_crud.get(db=db, id=review_id)
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
     
@@ -63,16 +70,17 @@ def update_review(
             detail="Cannot update another user's review",
         )
     
-    review = review_crud.update(db=db, db_obj=review, obj_in=review_in)
+    review = await review_crud.update(db=db, db_obj=review, obj_in=review_in)
+    await catalog_cache.invalidate_products(review.product_id)
     return review
 
 @router.delete("/{review_id}")
-def delete_review(
+async def delete_review(
     review_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    review = review_crud.get(db=db, id=review_id)
+    review = await review_crud.get(db=db, id=review_id)
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
     
@@ -82,13 +90,19 @@ def delete_review(
             detail="Cannot delete another user's review",
         )
     
-    review_crud.remove(db=db, id=review_id)
+    await review_crud.remove(db=db, id=review_id)
+    await catalog_cache.invalidate_products(review.product_id)
     return {"status": "success"}
 
 @router.get("/product/{product_id}/rating")
-def get_product_rating(
+async def get_product_rating(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> Any:
-    rating = review_crud.get_product_rating(db=db, product_id=product_id)
-    return rating
+    cache_key = await catalog_cache.key("product", product_id, "rating")
+    cached = await catalog_cache.get(cache_key, "rating")
+    if cached:
+        return cached
+
+    rating = await review_crud.get_product_rating(db=db, product_id=product_id)
+    return await catalog_cache.store(cache_key, Dict[str, Any], rating)
@@ -1,21 +1,25 @@
-from typing import Any, Dict, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request, Body
-from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Body, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 import json
 
-from app.api.deps import get_db, get_shop_owner
+from app.api.deps import get_db, get_current_shop, get_shop_owner
 from app.core.config import settings
-from app.services.telegram_service import telegram_service, process_telegram_update
+from app.services.broadcast import broadcast_engine
+from app.services.telegram_service import telegram_service
+from app.services.telegram_updates import UpdateQueueFull, telegram_update_queue
+from app.crud.broadcast import broadcast as broadcast_crud
 from backend.app.crud.shop import shop as shop_crud
+from app.models.shop import Shop
 from app.models.user import User
+from app.models.broadcast import BroadcastAudience, BroadcastStatus
+from app.schemas.broadcast import BroadcastJob as BroadcastJobSchema
 
 router = APIRouter()
 
 @router.post("/webhook")
 async def telegram_webhook(
     request: Request,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
 ) -> Any:
     if settings.TELEGRAM_WEBHOOK_SECRET:
         secret_header = request.headers.get("X-Telegram-Bot-Api-Secret-Token")
@@ -31,11 +35,15 @@ async def telegram_webhook(
         import logging
         logging.debug(f"Received Telegram update: {json.dumps(update, indent=2)}")
     
-    background_tasks.add_task(
-        process_telegram_update,
-        update=update,
-        db=db
-    )
+    # Обработка - в обработчиках очереди со своими сессиями; повтор update_id просто подтверждается
+    try:
+        await telegram_update_queue.enqueue(update)
+    except UpdateQueueFull:
+        # Не 200 - Telegram переотправит апдейт позже
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Update queue is full"
+        )
     
     return {"status": "ok"}
 
@@ -44,13 +52,10 @@ async def send_message_to_user(
     shop_id: int,
     telegram_id: str,
     message: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_owner),
+    shop: Shop = Depends(get_current_shop),
 ) -> Any:
-    shop = shop_crud.get(db=db, id=shop_id)
-    if not shop:
-        raise HTTPException(status_code=404, detail="Shop not found")
-    
     result = await telegram_service.send_message(
         chat_id=telegram_id,
         text=message
@@ -58,30 +63,79 @@ async def send_message_to_user(
     
     return result
 
-@router.post("/broadcast/{shop_id}")
+@router.post("/broadcast/{shop_id}", response_model=BroadcastJobSchema, status_code=status.HTTP_202_ACCEPTED)
 async def broadcast_message(
     shop_id: int,
     message: str,
-    user_ids: Optional[list] = Body(None),
-    db: Session = Depends(get_db),
+    user_ids: Optional[List[str]] = Body(None),
+    audience: BroadcastAudience = BroadcastAudience.ALL_CUSTOMERS,
+    days: int = Query(30, ge=1),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_owner),
+    shop: Shop = Depends(get_current_shop),
 ) -> Any:
-    shop = shop_crud.get(db=db, id=shop_id)
-    if not shop:
-        raise HTTPException(status_code=404, detail="Shop not found")
-    
-    if not user_ids:
-        return {"status": "error", "message": "No users specified"}
-    
-    results = []
-    for telegram_id in user_ids:
-        result = await telegram_service.send_message(
-            chat_id=telegram_id,
-            text=message
-        )
-        results.append({"telegram_id": telegram_id, "result": result})
-    
-    return {"status": "ok", "results": results}
+    """
+    Ставит рассылку в очередь и сразу возвращает её; отправляет app/services/broadcast.py.
+    Без user_ids получатели - аудитория магазина (audience, days - период для
+    recent_buyers и abandoned_carts), она выбирается запросом в БД.
+    """
+    job = await broadcast_crud.create(
+        db, shop_id=shop_id, text=message, chat_ids=user_ids, audience=audience, days=days
+    )
+    broadcast_engine.notify()
+    return job
+
+@router.get("/broadcast/{shop_id}/{job_id}", response_model=BroadcastJobSchema)
+async def get_broadcast(
+    shop_id: int,
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_shop_owner),
+) -> Any:
+    job = await broadcast_crud.get(db, shop_id=shop_id, job_id=job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Broadcast not found")
+    return job
+
+async def _change_broadcast_status(db: AsyncSession, shop_id: int, job_id: int, new_status: BroadcastStatus) -> Any:
+    job = await broadcast_crud.set_status(db, shop_id=shop_id, job_id=job_id, status=new_status)
+    if job:
+        broadcast_engine.notify()
+        return job
+    job = await broadcast_crud.get(db, shop_id=shop_id, job_id=job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Broadcast not found")
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Broadcast is {job.status.value}",
+    )
+
+@router.post("/broadcast/{shop_id}/{job_id}/pause", response_model=BroadcastJobSchema)
+async def pause_broadcast(
+    shop_id: int,
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_shop_owner),
+) -> Any:
+    return await _change_broadcast_status(db, shop_id, job_id, BroadcastStatus.PAUSED)
+
+@router.post("/broadcast/{shop_id}/{job_id}/resume", response_model=BroadcastJobSchema)
+async def resume_broadcast(
+    shop_id: int,
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_shop_owner),
+) -> Any:
+    return await _change_broadcast_status(db, shop_id, job_id, BroadcastStatus.RUNNING)
+
+@router.post("/broadcast/{shop_id}/{job_id}/cancel", response_model=BroadcastJobSchema)
+async def cancel_broadcast(
+    shop_id: int,
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_shop_owner),
+) -> Any:
+    return await _change_broadcast_status(db, shop_id, job_id, BroadcastStatus.CANCELLED)
 
 @router.post("/set-webhook")
 async def set_telegram_webhook(
@@ -135,14 +189,11 @@ async def delete_telegram_webhook() -> Any:
 async def update_shop_welcome_message(
     shop_id: int,
     welcome_message: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_shop_owner),
+    shop: Shop = Depends(get_current_shop),
 ) -> Any:
-    shop = shop_crud.get(db=db, id=shop_id)
-    if not shop:
-        raise HTTPException(status_code=404, detail="Shop not found")
-    
-    shop = shop_crud.update(
+    shop = await shop_crud.update(
         db=db, 
         db_obj=shop, 
         obj_in={"welcome_message": welcome_message}
@@ -0,0 +1,133 @@
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import json
+import logging
+import time
+
+from redis.exceptions import RedisError
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis import get_redis
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "auth-cache:invalidate"
+
+
+class AuthCache:
+    """
+    Кэш аутентификации процесса: токен -> telegram_id, telegram_id -> снимок
+    пользователя, (user_id, shop_id) -> маска прав в магазине.
+    Инвалидация локальная, а при AUTH_CACHE_PUBSUB рассылается остальным
+    воркерам через Redis pub/sub.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.tokens: TTLCache[str, str] = TTLCache(max_size, ttl)
+        self.users: TTLCache[str, Dict[str, Any]] = TTLCache(max_size, ttl)
+        self.permissions: TTLCache[Tuple[int, int], int] = TTLCache(max_size, ttl)
+        self._listener: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _count(kind: str, value: Any) -> Any:
+        metrics.inc(f"auth_cache.{kind}.{'miss' if value is None else 'hit'}")
+        return value
+
+    def get_token_subject(self, token: str) -> Optional[str]:
+        return self._count("token", self.tokens.get(token))
+
+    def set_token_subject(self, token: str, subject: str, expires_at: float) -> None:
+        # Запись не должна пережить сам токен
+        ttl = min(self.tokens.ttl, expires_at - time.time())
+        if ttl > 0:
+            self.tokens.set(token, subject, ttl=ttl)
+
+    async def get_user(self, db: AsyncSession, telegram_id: str) -> Optional[User]:
+        """Восстанавливает пользователя из снимка и привязывает к сессии без запроса в БД"""
+        snapshot = self._count("user", self.users.get(telegram_id))
+        if snapshot is None:
+            return None
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+
+    def set_user(self, user: User) -> None:
+        self.users.set(
+            user.telegram_id,
+            {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs},
+        )
+
+    def get_permissions(self, user_id: int, shop_id: int) -> Optional[int]:
+        return self._count("permissions", self.permissions.get((user_id, shop_id)))
+
+    def set_permissions(self, user_id: int, shop_id: int, permissions: int) -> None:
+        self.permissions.set((user_id, shop_id), int(permissions))
+
+    async def invalidate_user(self, telegram_id: str) -> None:
+        await self._invalidate("user", telegram_id)
+
+    async def invalidate_roles(self, user_id: int) -> None:
+        await self._invalidate("roles", user_id)
+
+    async def invalidate_shop(self, shop_id: int) -> None:
+        await self._invalidate("shop", shop_id)
+
+    def clear(self) -> None:
+        for cache in (self.tokens, self.users, self.permissions):
+            cache.clear()
+
+    def _apply(self, kind: str, key: Any) -> None:
+        if kind == "user":
+            self.users.pop(key)
+        elif kind == "roles":
+            self.permissions.pop_where(lambda cache_key: cache_key[0] == key)
+        elif kind == "shop":
+            # Смена владельца или удаление магазина меняют права всех пользователей
+            self.permissions.pop_where(lambda cache_key: cache_key[1] == key)
+
+    async def _invalidate(self, kind: str, key: Any) -> None:
+        self._apply(kind, key)
+        if not settings.AUTH_CACHE_PUBSUB:
+            return
+        try:
+            await get_redis().publish(INVALIDATION_CHANNEL, json.dumps({"kind": kind, "key": key}))
+        except RedisError as e:
+            logger.error(f"Auth cache invalidation publish failed: {str(e)}")
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with get_redis().pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        data = json.loads(message["data"])
+                        self._apply(data["kind"], data["key"])
+            except RedisError as e:
+                # Пока подписка лежит, события могли потеряться - сбрасываем всё
+                logger.error(f"Auth cache subscription failed: {str(e)}")
+                self.clear()
+                await asyncio.sleep(1)
+
+    def start_listener(self) -> None:
+        if settings.AUTH_CACHE_PUBSUB and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+auth_cache = AuthCache(settings.AUTH_CACHE_MAX_SIZE, settings.AUTH_CACHE_TTL)
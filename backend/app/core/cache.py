@@ -0,0 +1,158 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Iterable, Optional, Tuple, TypeVar
+import hashlib
+import json
+import logging
+import time
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Ограниченный по размеру LRU-кэш процесса с временем жизни записей"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def pop_where(self, predicate: Callable[[K], bool]) -> None:
+        for key in [key for key in self._data if predicate(key)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CatalogCache:
+    """
+    Кэш готовых JSON-ответов публичного каталога в Redis.
+
+    Ключи живут в пространстве версии магазина или товара: инвалидация - это INCR
+    версии, старые записи просто перестают читаться и истекают по TTL. Недоступный
+    Redis не ломает запрос, а превращается в промах.
+    """
+
+    def __init__(self, prefix: str = "catalog"):
+        self.prefix = prefix
+        self._adapters: Dict[Any, TypeAdapter] = {}
+
+    def _version_key(self, scope: str, scope_id: int) -> str:
+        return f"{self.prefix}:{scope}:{scope_id}:version"
+
+    async def key(self, scope: str, scope_id: int, name: str, **params: Any) -> Optional[str]:
+        if not settings.CACHE_ENABLED:
+            return None
+        try:
+            version = await get_redis().get(self._version_key(scope, scope_id))
+        except RedisError as e:
+            logger.warning(f"Catalog cache unavailable: {str(e)}")
+            return None
+        params_hash = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+        return f"{self.prefix}:{scope}:{scope_id}:v{int(version or 0)}:{name}:{params_hash}"
+
+    async def get(self, key: Optional[str], name: str) -> Optional[Response]:
+        if key is None:
+            return None
+        try:
+            cached = await get_redis().hgetall(key)
+        except RedisError as e:
+            logger.warning(f"Catalog cache unavailable: {str(e)}")
+            return None
+        if not cached:
+            metrics.inc("cache.miss")
+            metrics.inc(f"cache.{name}.miss")
+            return None
+        metrics.inc("cache.hit")
+        metrics.inc(f"cache.{name}.hit")
+        return self._response(cached[b"body"], cached.get(b"next_cursor", b"").decode())
+
+    async def store(
+        self,
+        key: Optional[str],
+        response_type: Any,
+        data: Any,
+        *,
+        next_cursor: Optional[str] = None,
+        ttl: Optional[int] = None,
+    ) -> Response:
+        """Сериализует ответ по response_type, кладёт в кэш и возвращает готовый Response"""
+        adapter = self._adapters.get(response_type)
+        if adapter is None:
+            adapter = self._adapters[response_type] = TypeAdapter(response_type)
+        body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+        if key is not None:
+            mapping = {"body": body}
+            if next_cursor:
+                mapping["next_cursor"] = next_cursor
+            try:
+                async with get_redis().pipeline(transaction=True) as pipe:
+                    pipe.hset(key, mapping=mapping)
+                    pipe.expire(key, ttl or settings.CACHE_TTL)
+                    await pipe.execute()
+            except RedisError as e:
+                logger.warning(f"Catalog cache unavailable: {str(e)}")
+        return self._response(body, next_cursor)
+
+    async def invalidate(self, scope: str, scope_ids: Iterable[int]) -> None:
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for scope_id in scope_ids:
+                    pipe.incr(self._version_key(scope, scope_id))
+                await pipe.execute()
+        except RedisError as e:
+            logger.error(f"Catalog cache invalidation failed: {str(e)}")
+
+    async def invalidate_shop(self, shop_id: int) -> None:
+        await self.invalidate("shop", [shop_id])
+
+    async def invalidate_products(self, *product_ids: int) -> None:
+        await self.invalidate("product", product_ids)
+
+    async def invalidate_stock(self, shop_id: int, product_ids: Iterable[int]) -> None:
+        """Остатки меняются при оформлении и отмене заказов - они есть и в списках товаров"""
+        await self.invalidate_shop(shop_id)
+        await self.invalidate_products(*product_ids)
+
+    @staticmethod
+    def _response(body: bytes, next_cursor: Optional[str]) -> Response:
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+catalog_cache = CatalogCache()
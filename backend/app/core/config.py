@@ -33,11 +33,27 @@ class StorageSettings(BaseSettings):
     s3_secret_key: Optional[str] = None
 
 
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def _to_async_uri(uri: str) -> str:
+    scheme, sep, rest = uri.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Telegram Shop API"
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = "YOUR_SECRET_KEY_HERE"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    AUTH_CACHE_TTL: int = 60
+    AUTH_CACHE_MAX_SIZE: int = 10000
+    # Рассылать инвалидацию кэша аутентификации всем воркерам через Redis pub/sub
+    AUTH_CACHE_PUBSUB: bool = False
     
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
     
@@ -46,13 +62,95 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "telegram_shop"
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
+    SQLALCHEMY_ASYNC_DATABASE_URI: Optional[str] = None
+    SQLALCHEMY_READ_REPLICA_URIS: List[str] = []
+
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_PRE_PING: bool = False
     
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
+    REDIS_DB: int = 0
+    REDIS_URL: Optional[str] = None
+    REDIS_SOCKET_TIMEOUT: float = 0.5
+    # In-memory fakeredis вместо сервера, для тестов и локального запуска
+    REDIS_FAKE: bool = False
+
+    CACHE_ENABLED: bool = True
+    CACHE_TTL: int = 300
+
+    # Индекс подсказок в памяти воркера: магазинов, ключей на магазин, TTL перестроения
+    SUGGEST_MAX_SHOPS: int = 1000
+    SUGGEST_MAX_ENTRIES: int = 200000
+    SUGGEST_TTL: int = 600
+
+    # Удержание остатков под неоплаченные заказы: срок (с), период и размер пачки очистки
+    RESERVATION_TTL: int = 1800
+    RESERVATION_SWEEP_INTERVAL: int = 60
+    RESERVATION_SWEEP_BATCH: int = 500
+
+    # Исходящие запросы к Telegram и платёжным провайдерам: общий клиент на апстрим
+    HTTP_CLIENT_HTTP2: bool = True
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 5.0
+    HTTP_CLIENT_READ_TIMEOUT: float = 30.0
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 30.0
+
+    # OAuth-токен PayPal: обновление заранее (с) и общий кэш воркеров в Redis
+    PAYPAL_TOKEN_REFRESH_MARGIN: int = 300
+    PAYPAL_TOKEN_SHARED: bool = False
+    # Сертификаты подписи вебхуков PayPal: сколько держать в памяти и как долго (с)
+    PAYPAL_CERT_CACHE_SIZE: int = 100
+    PAYPAL_CERT_CACHE_TTL: int = 86400
+
+    # Очередь вебхуков платежей: воркеров на процесс, пачка, опрос (с), повторы с
+    # экспоненциальной задержкой (с), время захвата события воркером (с)
+    WEBHOOK_WORKERS: int = 4
+    WEBHOOK_BATCH_SIZE: int = 10
+    WEBHOOK_POLL_INTERVAL: int = 1
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_RETRY_BASE: int = 5
+    WEBHOOK_RETRY_MAX: int = 3600
+    WEBHOOK_LEASE: int = 300
+
+    # Рассылки в Telegram: сообщений в секунду на процесс (лимит Telegram ~30 на бота -
+    # при нескольких процессах делится между ними), интервал на чат (с), параллельных
+    # отправок, размер пачки, опрос (с), повторы при сбоях (с), захват пачки (с)
+    BROADCAST_RATE: float = 25.0
+    BROADCAST_CHAT_INTERVAL: float = 1.0
+    BROADCAST_CONCURRENCY: int = 20
+    BROADCAST_BATCH_SIZE: int = 100
+    BROADCAST_POLL_INTERVAL: int = 1
+    BROADCAST_MAX_ATTEMPTS: int = 5
+    BROADCAST_RETRY_BASE: int = 5
+    BROADCAST_RETRY_MAX: int = 600
+    BROADCAST_LEASE: int = 300
+    BROADCAST_INSERT_CHUNK: int = 1000
     
     TELEGRAM_BOT_TOKEN: str = "YOUR_BOT_TOKEN"
     TELEGRAM_WEBHOOK_URL: Optional[str] = None
     TELEGRAM_WEBHOOK_SECRET: Optional[str] = None
+    # Очередь апдейтов вебхука: обработчиков на процесс, размер очереди, окно
+    # дедупликации update_id (штук и секунд), общая дедупликация через Redis
+    TELEGRAM_UPDATE_CONSUMERS: int = 8
+    TELEGRAM_UPDATE_QUEUE_SIZE: int = 10000
+    TELEGRAM_UPDATE_DEDUP_WINDOW: int = 100000
+    TELEGRAM_UPDATE_DEDUP_TTL: int = 3600
+    TELEGRAM_UPDATE_DEDUP_SHARED: bool = False
+    # Long polling (scripts/run_polling.py): ожидание getUpdates (с), апдейтов за запрос,
+    # пауза после ошибки (с)
+    TELEGRAM_POLLING_TIMEOUT: int = 30
+    TELEGRAM_POLLING_LIMIT: int = 100
+    TELEGRAM_POLLING_RETRY: int = 5
+    # Изменения профиля Telegram (username, имя) пишутся в БД пачкой раз в столько секунд
+    TELEGRAM_USER_FLUSH_INTERVAL: float = 5.0
+    # file_id отправленных картинок (логотипы, фото товаров) в памяти процесса: записей и TTL (с)
+    TELEGRAM_FILE_CACHE_SIZE: int = 10000
+    TELEGRAM_FILE_CACHE_TTL: int = 300
     
     STRIPE: StripeSettings = StripeSettings()
     PAYPAL: PayPalSettings = PayPalSettings()
@@ -83,6 +181,11 @@ class Settings(BaseSettings):
                 f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@"
                 f"{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
             )
+        if not self.SQLALCHEMY_ASYNC_DATABASE_URI:
+            self.SQLALCHEMY_ASYNC_DATABASE_URI = _to_async_uri(self.SQLALCHEMY_DATABASE_URI)
+        if not self.REDIS_URL:
+            self.REDIS_URL = f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
+        self.SQLALCHEMY_READ_REPLICA_URIS = [_to_async_uri(uri) for uri in self.SQLALCHEMY_READ_REPLICA_URIS]
         
         self.PAYMENT_PROVIDERS = {
             "stripe": {
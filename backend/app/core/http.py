@@ -0,0 +1,47 @@
+from typing import Dict
+import importlib.util
+
+import httpx
+
+from app.core.config import settings
+
+# HTTP/2 требует пакет h2 (httpx[http2]); без него клиенты работают по HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Внешние API, клиенты которых создаются при старте приложения
+HTTP_UPSTREAMS = ("telegram", "stripe", "paypal", "yookassa")
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def get_http_client(upstream: str) -> httpx.AsyncClient:
+    """
+    Общий клиент процесса для внешнего API (telegram, stripe, ...): keep-alive
+    соединения переиспользуются между запросами, TLS-рукопожатие - один раз на
+    соединение. HTTP/2 согласуется через ALPN, если сервер его поддерживает.
+    """
+    client = _clients.get(upstream)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=settings.HTTP_CLIENT_HTTP2 and HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(settings.HTTP_CLIENT_READ_TIMEOUT, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _clients[upstream] = client
+    return client
+
+
+def open_http_clients(*upstreams: str) -> None:
+    """Создаёт клиенты заранее, чтобы первый запрос к внешнему API не ждал этого"""
+    for upstream in upstreams:
+        get_http_client(upstream)
+
+
+async def close_http_clients() -> None:
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
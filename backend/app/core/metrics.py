@@ -0,0 +1,34 @@
+from collections import defaultdict
+from typing import Callable, Dict, List
+import threading
+
+
+class Metrics:
+    """Простой in-process реестр счётчиков и gauge-метрик, отдаётся через /health/metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._collectors: List[Callable[[], Dict[str, float]]] = []
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self._gauges[name] = value
+
+    def register_collector(self, collector: Callable[[], Dict[str, float]]) -> None:
+        self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            data = dict(self._counters)
+        data.update(self._gauges)
+        for collector in self._collectors:
+            data.update(collector())
+        return data
+
+
+metrics = Metrics()
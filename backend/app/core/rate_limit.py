@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from typing import Hashable
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket для исходящих запросов процесса: rate токенов в секунду, не больше
+    capacity подряд. Токен резервируется сразу при вызове acquire, поэтому
+    конкурентные вызовы выстраиваются в очередь без блокировок.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        # Когда станет доступен следующий токен (с учётом уже зарезервированных)
+        self._next_at = 0.0
+
+    def reserve(self) -> float:
+        """Резервирует токен и возвращает, сколько секунд ждать до него"""
+        now = time.monotonic()
+        interval = 1 / self.rate
+        start = max(self._next_at, now - (self.capacity - 1) * interval)
+        self._next_at = start + interval
+        return max(start - now, 0.0)
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Ответ 429 с retry_after: новые токены не выдаются, пока не пройдёт пауза"""
+        self._next_at = max(self._next_at, time.monotonic() + seconds)
+
+
+class KeyedThrottle:
+    """
+    Не чаще одного события в interval секунд на ключ (например, на чат Telegram).
+    Ключи хранятся, пока действует их интервал, - память не растёт с числом ключей.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def reserve(self, key: Hashable) -> float:
+        now = time.monotonic()
+        while self._next and next(iter(self._next.values())) <= now:
+            self._next.popitem(last=False)
+        start = max(self._next.pop(key, now), now)
+        self._next[key] = start + self.interval
+        return start - now
+
+    async def acquire(self, key: Hashable) -> None:
+        delay = self.reserve(key)
+        if delay:
+            await asyncio.sleep(delay)
@@ -0,0 +1,31 @@
+from typing import Optional
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Общий клиент Redis процесса, пул соединений создаётся лениво"""
+    global _client
+    if _client is None:
+        if settings.REDIS_FAKE:
+            import fakeredis
+
+            _client = fakeredis.FakeAsyncRedis()
+        else:
+            _client = redis.Redis.from_url(
+                settings.REDIS_URL,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            )
+    return _client
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
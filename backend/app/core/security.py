@@ -1,17 +1,33 @@
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from enum import IntFlag
+from typing import Any, Iterable, Optional, Tuple, Union
 from jose import jwt
 import hashlib
 import hmac
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.auth_cache import auth_cache
 from app.core.config import settings
 from app.db.session import get_db
+from app.models.shop import Shop
 from app.models.user import User
+from backend.app.crud.shop import shop as shop_crud
 from backend.app.crud.user import user as user_crud
 
+class Permission(IntFlag):
+    NONE = 0
+    MANAGER = 1
+    ADMIN = 2
+    OWNER = 4
+
+
+ROLE_PERMISSIONS = {
+    "manager": Permission.MANAGER,
+    "admin": Permission.ADMIN,
+}
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token")
 
 def create_access_token(
@@ -43,36 +59,65 @@ def verify_telegram_auth(telegram_data: dict) -> bool:
     return hash_string == telegram_data.get('hash', '')
 
 async def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> User:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=["HS256"]
-        )
-        token_data = payload.get("sub")
-        if token_data is None:
+    token_data = auth_cache.get_token_subject(token)
+    if token_data is None:
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=["HS256"]
+            )
+            token_data = payload.get("sub")
+            if token_data is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Could not validate credentials",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+        except jwt.JWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-    except jwt.JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        auth_cache.set_token_subject(token, token_data, payload.get("exp", 0))
     
-    user = user_crud.get_by_telegram_id(db, telegram_id=token_data)
+    user = await auth_cache.get_user(db, token_data)
     if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+        user = await user_crud.get_by_telegram_id(db, telegram_id=token_data)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        auth_cache.set_user(user)
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
 
-def check_user_role(user: User, role_name: str, shop_id: Optional[int] = None, db: Session = None) -> bool:
-    if not db or not user:
+async def check_user_role(user: User, role_name: str, shop_id: Optional[int] = None, db: AsyncSession = None) -> bool:
+    """Есть ли у пользователя в магазине права роли role_name - по той же маске, что и в get_shop_access"""
+    if not db or not user or shop_id is None:
         return False
     
-    user_roles = user_crud.get_user_roles(db=db, user_id=user.id, shop_id=shop_id)
-    return any(ur.role.name == role_name for ur in user_roles)
+    permissions, _ = await get_shop_permissions(db, user, shop_id)
+    return bool(permissions and permissions & ROLE_PERMISSIONS.get(role_name, Permission.NONE))
+
+async def get_shop_permissions(db: AsyncSession, user: User, shop_id: int) -> Tuple[Optional[Permission], Optional[Shop]]:
+    """
+    Маска прав пользователя в магазине: из auth_cache или одним запросом к БД.
+    Магазин возвращается, если его пришлось загрузить; (None, None) - магазина нет.
+    """
+    permissions = auth_cache.get_permissions(user.id, shop_id)
+    if permissions is not None:
+        return Permission(permissions), None
+    
+    shop, role_names = await shop_crud.get_with_user_roles(db=db, shop_id=shop_id, user_id=user.id)
+    if not shop:
+        return None, None
+    permissions = resolve_permissions(user, shop, role_names)
+    auth_cache.set_permissions(user.id, shop_id, permissions)
+    return permissions, shop
+
+def resolve_permissions(user: User, shop: Shop, role_names: Iterable[str]) -> Permission:
+    permissions = Permission.OWNER if shop.owner_id == user.id else Permission.NONE
+    for name in role_names:
+        permissions |= ROLE_PERMISSIONS.get(name, Permission.NONE)
+    return permissions
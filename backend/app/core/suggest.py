@@ -0,0 +1,172 @@
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud.category import category as category_crud
+from app.crud.product import product as product_crud
+
+PRODUCT = "product"
+CATEGORY = "category"
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+class ShopSuggestIndex:
+    """
+    Подсказки одного магазина: отсортированный список (ключ, тип, id), префикс
+    ищется через bisect. Ключи - название целиком и хвосты с начала каждого
+    слова, чтобы "boo" находило и "Boots", и "Leather boots".
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: List[Tuple[str, str, int]] = []
+        self.labels: Dict[Tuple[str, int], str] = {}
+
+    @staticmethod
+    def _keys(label: str) -> List[str]:
+        words = _normalize(label).split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    def add(self, kind: str, id: int, label: str) -> None:
+        self.remove(kind, id)
+        keys = self._keys(label)
+        if not keys[0] or len(self.entries) >= self.max_entries:
+            return
+        self.labels[(kind, id)] = label
+        # Сверх лимита памяти индексируется только начало названия
+        for key in keys[:max(1, self.max_entries - len(self.entries))]:
+            insort(self.entries, (key, kind, id))
+
+    def remove(self, kind: str, id: int) -> None:
+        label = self.labels.pop((kind, id), None)
+        if label is None:
+            return
+        for key in self._keys(label):
+            i = bisect_left(self.entries, (key, kind, id))
+            if i < len(self.entries) and self.entries[i] == (key, kind, id):
+                del self.entries[i]
+
+    def lookup(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        prefix = _normalize(prefix)
+        found: List[Dict[str, Any]] = []
+        seen: Set[Tuple[str, int]] = set()
+        i = bisect_left(self.entries, (prefix,))
+        while i < len(self.entries) and len(found) < limit:
+            key, kind, id = self.entries[i]
+            if not key.startswith(prefix):
+                break
+            if (kind, id) not in seen:
+                seen.add((kind, id))
+                found.append({"text": self.labels[(kind, id)], "type": kind, "id": id})
+            i += 1
+        return found
+
+    @classmethod
+    def build(cls, max_entries: int, items: List[Tuple[str, int, str]]) -> "ShopSuggestIndex":
+        index = cls(max_entries)
+        # Сначала полные названия всех позиций, хвосты слов - пока хватает лимита
+        entries = []
+        for kind, id, label in items:
+            keys = cls._keys(label)
+            if keys[0]:
+                index.labels[(kind, id)] = label
+                entries.append((keys[0], kind, id))
+        for kind, id, label in items:
+            if len(entries) >= max_entries:
+                break
+            entries.extend((key, kind, id) for key in cls._keys(label)[1:])
+        index.entries = sorted(entries[:max_entries])
+        return index
+
+
+class SuggestIndex:
+    """
+    Индексы подсказок по магазинам в памяти процесса. Индекс строится при первом
+    запросе, дальше обновляется из обработчиков записи; TTL перестраивает его,
+    чтобы подтянуть изменения, сделанные другими воркерами.
+    """
+
+    def __init__(self, max_shops: int, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self._shops: TTLCache[int, ShopSuggestIndex] = TTLCache(max_shops, ttl)
+        self._building: Dict[int, asyncio.Future] = {}
+        # Магазины, изменённые во время построения индекса - результат устарел
+        self._stale: Set[int] = set()
+
+    async def suggest(self, db: AsyncSession, shop_id: int, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        index = self._shops.get(shop_id)
+        metrics.inc(f"suggest.index.{'miss' if index is None else 'hit'}")
+        if index is None:
+            index = await self._get_built(db, shop_id)
+        return index.lookup(prefix, limit)
+
+    async def _get_built(self, db: AsyncSession, shop_id: int) -> ShopSuggestIndex:
+        building = self._building.get(shop_id)
+        if building is not None:
+            return await asyncio.shield(building)
+
+        future = asyncio.get_running_loop().create_future()
+        # Ошибку построения читают ожидающие запросы, если их нет - не логировать её повторно
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._building[shop_id] = future
+        try:
+            products = await product_crud.get_names_by_shop(db=db, shop_id=shop_id)
+            categories = await category_crud.get_names_by_shop(db=db, shop_id=shop_id)
+            items = [(PRODUCT, id, name) for id, name in products]
+            items += [(CATEGORY, id, name) for id, name in categories]
+            index = ShopSuggestIndex.build(self.max_entries, items)
+            if shop_id not in self._stale:
+                self._shops.set(shop_id, index)
+            future.set_result(index)
+            return index
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            del self._building[shop_id]
+            self._stale.discard(shop_id)
+
+    def _touch(self, shop_id: int) -> Optional[ShopSuggestIndex]:
+        if shop_id in self._building:
+            self._stale.add(shop_id)
+        return self._shops.get(shop_id)
+
+    def update_product(self, product: Any) -> None:
+        index = self._touch(product.shop_id)
+        if index is None:
+            return
+        if product.is_available and product.name:
+            index.add(PRODUCT, product.id, product.name)
+        else:
+            index.remove(PRODUCT, product.id)
+
+    def remove_product(self, shop_id: int, product_id: int) -> None:
+        index = self._touch(shop_id)
+        if index is not None:
+            index.remove(PRODUCT, product_id)
+
+    def update_category(self, category: Any) -> None:
+        index = self._touch(category.shop_id)
+        if index is not None and category.name:
+            index.add(CATEGORY, category.id, category.name)
+
+    def remove_category(self, shop_id: int, category_id: int) -> None:
+        index = self._touch(shop_id)
+        if index is not None:
+            index.remove(CATEGORY, category_id)
+
+    def clear(self) -> None:
+        self._shops.clear()
+
+
+suggest_index = SuggestIndex(settings.SUGGEST_MAX_SHOPS, settings.SUGGEST_MAX_ENTRIES, settings.SUGGEST_TTL)
@@ -1,7 +1,13 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
+from datetime import datetime
+import base64
+import binascii
+import json
+
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import Base
 
@@ -10,29 +16,93 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+class InvalidCursorError(ValueError):
+    pass
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # Ключ сортировки списков и keyset-курсора, должен быть уникальным
+    cursor_columns: Tuple[str, ...] = ("id",)
+    cursor_descending: bool = False
+
     def __init__(self, model: Type[ModelType]):
         self.model = model
 
-    def get(self, db: Session, id: Any) -> Optional[ModelType]:
-        return db.query(self.model).filter(self.model.id == id).first()
+    @staticmethod
+    def pack_cursor(values: Sequence[Any]) -> str:
+        raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def unpack_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(types):
+                raise ValueError
+            return [
+                datetime.fromisoformat(value) if type_ is datetime else type_(value)
+                for type_, value in zip(types, values)
+            ]
+        except (ValueError, TypeError, binascii.Error):
+            raise InvalidCursorError(cursor)
+
+    def encode_cursor(self, obj: ModelType) -> str:
+        return self.pack_cursor([getattr(obj, name) for name in self.cursor_columns])
+
+    def decode_cursor(self, cursor: str) -> List[Any]:
+        columns = [getattr(self.model, name) for name in self.cursor_columns]
+        return self.unpack_cursor(cursor, [column.type.python_type for column in columns])
+
+    def next_cursor(self, items: Sequence[ModelType], limit: int) -> Optional[str]:
+        """Курсор следующей страницы, None если страница неполная"""
+        if not items or len(items) < limit:
+            return None
+        return self.encode_cursor(items[-1])
+
+    def paginate(
+        self, stmt: Select, *, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+    ) -> Select:
+        """Сортирует по cursor_columns; с курсором - keyset, без него - старый offset"""
+        columns = [getattr(self.model, name) for name in self.cursor_columns]
+        if cursor:
+            key = tuple_(*columns) if len(columns) > 1 else columns[0]
+            values = self.decode_cursor(cursor)
+            value = tuple_(*values) if len(values) > 1 else values[0]
+            stmt = stmt.where(key < value if self.cursor_descending else key > value)
+        else:
+            stmt = stmt.offset(skip)
+        order_by = [column.desc() if self.cursor_descending else column for column in columns]
+        return stmt.order_by(*order_by).limit(limit)
+
+    async def get(self, db: AsyncSession, id: Any, *, use_replica: bool = False) -> Optional[ModelType]:
+        """use_replica - только для чтения без последующей записи: реплика может отставать"""
+        result = await db.execute(
+            select(self.model).execution_options(use_replica=use_replica).where(self.model.id == id)
+        )
+        return result.scalars().first()
 
-    def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+    async def get_multi(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
     ) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        result = await db.execute(
+            self.paginate(
+                select(self.model).execution_options(use_replica=True),
+                skip=skip, limit=limit, cursor=cursor,
+            )
+        )
+        return result.scalars().all()
 
-    def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
+    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    def update(
+    async def update(
         self,
-        db: Session,
+        db: AsyncSession,
         *,
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
@@ -46,12 +116,12 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    def remove(self, db: Session, *, id: int) -> ModelType:
-        obj = db.query(self.model).get(id)
-        db.delete(obj)
-        db.commit()
+    async def remove(self, db: AsyncSession, *, id: int) -> ModelType:
+        obj = await db.get(self.model, id)
+        await db.delete(obj)
+        await db.commit()
         return obj
@@ -0,0 +1,229 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import Select, exists, insert, literal, select, true, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.broadcast import (
+    BroadcastAudience, BroadcastJob, BroadcastRecipient, BroadcastStatus, RecipientStatus
+)
+from app.models.cart import CartItem
+from app.models.order import Order, OrderStatus
+from app.models.product import Product
+from app.models.user import User
+
+# Из каких статусов допустим переход: пауза, продолжение, отмена
+TRANSITIONS = {
+    BroadcastStatus.PAUSED: (BroadcastStatus.RUNNING,),
+    BroadcastStatus.RUNNING: (BroadcastStatus.PAUSED,),
+    BroadcastStatus.CANCELLED: (BroadcastStatus.RUNNING, BroadcastStatus.PAUSED),
+}
+
+# Заказы, которые считаются покупкой
+PURCHASED = (OrderStatus.PAID, OrderStatus.PROCESSING, OrderStatus.SHIPPED, OrderStatus.DELIVERED)
+# Корзина брошена, если её не трогали столько времени и заказа после этого не было
+ABANDONED_CART_IDLE = timedelta(hours=24)
+
+
+def audience_query(shop_id: int, audience: BroadcastAudience, days: int = 30) -> Select:
+    """
+    telegram_id активных пользователей из аудитории магазина, по одному на пользователя:
+    ALL_CUSTOMERS - делали заказ в магазине, RECENT_BUYERS - оплатили заказ за
+    последние days дней, ABANDONED_CARTS - положили товар магазина в корзину за
+    последние days дней и не оформили заказ.
+    """
+    now = datetime.now()
+    ordered = select(Order.id).where(Order.user_id == User.id, Order.shop_id == shop_id)
+    if audience == BroadcastAudience.ALL_CUSTOMERS:
+        condition = ordered.exists()
+    elif audience == BroadcastAudience.RECENT_BUYERS:
+        condition = ordered.where(
+            Order.status.in_(PURCHASED), Order.created_at >= now - timedelta(days=days)
+        ).exists()
+    else:
+        condition = (
+            select(CartItem.id)
+            .join(Product, Product.id == CartItem.product_id)
+            .where(
+                CartItem.user_id == User.id,
+                Product.shop_id == shop_id,
+                CartItem.updated_at >= now - timedelta(days=days),
+                CartItem.updated_at <= now - ABANDONED_CART_IDLE,
+                ~select(Order.id).where(
+                    Order.user_id == CartItem.user_id,
+                    Order.shop_id == shop_id,
+                    Order.created_at >= CartItem.updated_at,
+                ).exists(),
+            )
+            .exists()
+        )
+    return select(User.telegram_id).where(User.telegram_id.isnot(None), User.is_active == true(), condition)
+
+
+class CRUDBroadcast:
+    """
+    Рассылки и их получатели в БД. Получатели - очередь, как у вебхуков: строка
+    захватывается на время lease, результат отправки пишется пачкой вместе со
+    счётчиками рассылки. В памяти держится только текущая пачка.
+    """
+
+    async def create(
+        self, db: AsyncSession, *, shop_id: int, text: str, chat_ids: Optional[Iterable[str]] = None,
+        audience: BroadcastAudience = BroadcastAudience.ALL_CUSTOMERS, days: int = 30
+    ) -> BroadcastJob:
+        """
+        Создаёт рассылку по списку chat_ids или, без него, по аудитории магазина.
+        Аудитория переносится в очередь одним INSERT ... SELECT - получатели
+        не проходят через приложение, сколько бы их ни было.
+        """
+        job = BroadcastJob(
+            shop_id=shop_id, text=text, status=BroadcastStatus.RUNNING, total=0, sent=0, failed=0,
+            audience=audience if chat_ids is None else None,
+        )
+        db.add(job)
+        await db.flush()
+
+        now = datetime.now()
+        if chat_ids is None:
+            recipients = audience_query(shop_id, audience, days).with_only_columns(
+                literal(job.id),
+                User.telegram_id,
+                literal(RecipientStatus.PENDING, BroadcastRecipient.status.type),
+                literal(0),
+                literal(now, BroadcastRecipient.next_attempt_at.type),
+            )
+            result = await db.execute(
+                insert(BroadcastRecipient).from_select(
+                    ["job_id", "chat_id", "status", "attempts", "next_attempt_at"], recipients
+                )
+            )
+            job.total = result.rowcount
+        else:
+            unique = list(dict.fromkeys(str(chat_id) for chat_id in chat_ids))
+            for start in range(0, len(unique), settings.BROADCAST_INSERT_CHUNK):
+                await db.execute(
+                    insert(BroadcastRecipient),
+                    [
+                        {
+                            "job_id": job.id,
+                            "chat_id": chat_id,
+                            "status": RecipientStatus.PENDING,
+                            "attempts": 0,
+                            "next_attempt_at": now,
+                        }
+                        for chat_id in unique[start:start + settings.BROADCAST_INSERT_CHUNK]
+                    ],
+                )
+            job.total = len(unique)
+        if not job.total:
+            job.status, job.finished_at = BroadcastStatus.COMPLETED, now
+        await db.commit()
+        return job
+
+    async def get(self, db: AsyncSession, *, shop_id: int, job_id: int) -> Optional[BroadcastJob]:
+        result = await db.execute(
+            select(BroadcastJob).where(BroadcastJob.id == job_id, BroadcastJob.shop_id == shop_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def set_status(
+        self, db: AsyncSession, *, shop_id: int, job_id: int, status: BroadcastStatus
+    ) -> Optional[BroadcastJob]:
+        """Пауза, продолжение или отмена. None - рассылки нет или переход из её статуса недопустим"""
+        values: Dict[str, Any] = {"status": status, "updated_at": datetime.now()}
+        if status == BroadcastStatus.CANCELLED:
+            values["finished_at"] = datetime.now()
+        result = await db.execute(
+            update(BroadcastJob)
+            .where(
+                BroadcastJob.id == job_id,
+                BroadcastJob.shop_id == shop_id,
+                BroadcastJob.status.in_(TRANSITIONS[status]),
+            )
+            .values(**values)
+            .returning(BroadcastJob)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        job = result.scalar_one_or_none()
+        await db.commit()
+        return job
+
+    async def running_ids(self, db: AsyncSession) -> List[int]:
+        result = await db.execute(
+            select(BroadcastJob.id).where(BroadcastJob.status == BroadcastStatus.RUNNING).order_by(BroadcastJob.id)
+        )
+        return list(result.scalars().all())
+
+    async def get_text(self, db: AsyncSession, *, job_id: int) -> Optional[str]:
+        """Текст рассылки, если она ещё выполняется"""
+        result = await db.execute(
+            select(BroadcastJob.text).where(BroadcastJob.id == job_id, BroadcastJob.status == BroadcastStatus.RUNNING)
+        )
+        return result.scalar_one_or_none()
+
+    async def claim(self, db: AsyncSession, *, job_id: int, limit: int, lease: float) -> List[Row]:
+        """
+        Захватывает пачку получателей, которым пора отправлять: переносит
+        next_attempt_at на время lease. SKIP LOCKED - несколько процессов
+        разбирают одну рассылку, не получая одних и тех же получателей.
+        """
+        now = datetime.now()
+        due = (
+            select(BroadcastRecipient.id)
+            .where(
+                BroadcastRecipient.job_id == job_id,
+                BroadcastRecipient.status == RecipientStatus.PENDING,
+                BroadcastRecipient.next_attempt_at <= now,
+            )
+            .order_by(BroadcastRecipient.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            update(BroadcastRecipient)
+            .where(BroadcastRecipient.id.in_(due.scalar_subquery()))
+            .values(next_attempt_at=now + timedelta(seconds=lease))
+            .returning(BroadcastRecipient.id, BroadcastRecipient.chat_id, BroadcastRecipient.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        recipients = result.all()
+        await db.commit()
+        return recipients
+
+    async def record(self, db: AsyncSession, *, job_id: int, outcomes: List[Dict[str, Any]]) -> None:
+        """
+        Результаты пачки одной транзакцией: executemany по первичному ключу
+        (id, status, attempts, next_attempt_at, error) и счётчики рассылки.
+        """
+        if not outcomes:
+            return
+        await db.execute(update(BroadcastRecipient), outcomes)
+        sent = sum(1 for outcome in outcomes if outcome["status"] == RecipientStatus.SENT)
+        failed = sum(1 for outcome in outcomes if outcome["status"] == RecipientStatus.FAILED)
+        if sent or failed:
+            await db.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == job_id)
+                .values(sent=BroadcastJob.sent + sent, failed=BroadcastJob.failed + failed, updated_at=datetime.now())
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+
+    async def complete_if_done(self, db: AsyncSession, *, job_id: int) -> bool:
+        """Завершает рассылку, если ожидающих получателей (в том числе отложенных) не осталось"""
+        pending = exists().where(
+            BroadcastRecipient.job_id == job_id, BroadcastRecipient.status == RecipientStatus.PENDING
+        )
+        result = await db.execute(
+            update(BroadcastJob)
+            .where(BroadcastJob.id == job_id, BroadcastJob.status == BroadcastStatus.RUNNING, ~pending)
+            .values(status=BroadcastStatus.COMPLETED, finished_at=datetime.now(), updated_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount > 0
+
+
+broadcast = CRUDBroadcast()
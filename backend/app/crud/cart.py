@@ -1,6 +1,7 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import delete, func, select
 
 from app.crud.base import CRUDBase
 from app.models.cart import CartItem
@@ -8,61 +9,62 @@ from app.schemas.cart import CartItemCreate, CartItemUpdate
 
 
 class CRUDCartItem(CRUDBase[CartItem, CartItemCreate, CartItemUpdate]):
-    def get_by_user(
-        self, db: Session, *, user_id: int
+    async def get_by_user(
+        self, db: AsyncSession, *, user_id: int
     ) -> List[CartItem]:
-        return (
-            db.query(self.model)
-            .filter(CartItem.user_id == user_id)
-            .all()
+        result = await db.execute(
+            select(self.model)
+            .options(joinedload(CartItem.product))
+            .where(CartItem.user_id == user_id)
         )
+        return result.scalars().all()
 
-    def get_by_user_and_product(
-        self, db: Session, *, user_id: int, product_id: int
+    async def get_by_user_and_product(
+        self, db: AsyncSession, *, user_id: int, product_id: int
     ) -> Optional[CartItem]:
-        return (
-            db.query(self.model)
-            .filter(CartItem.user_id == user_id, CartItem.product_id == product_id)
-            .first()
+        result = await db.execute(
+            select(self.model)
+            .where(CartItem.user_id == user_id, CartItem.product_id == product_id)
         )
+        return result.scalars().first()
 
-    def create_or_update(
-        self, db: Session, *, obj_in: CartItemCreate
+    async def create_or_update(
+        self, db: AsyncSession, *, obj_in: CartItemCreate
     ) -> CartItem:
-        existing_item = self.get_by_user_and_product(
+        existing_item = await self.get_by_user_and_product(
             db=db, user_id=obj_in.user_id, product_id=obj_in.product_id
         )
         
         if existing_item:
             existing_item.quantity += obj_in.quantity
             db.add(existing_item)
-            db.commit()
-            db.refresh(existing_item)
+            await db.commit()
+            await db.refresh(existing_item)
             return existing_item
         else:
-            return self.create(db=db, obj_in=obj_in)
+            return await self.create(db=db, obj_in=obj_in)
 
-    def get_cart_totals(
-        self, db: Session, *, user_id: int
+    async def get_cart_totals(
+        self, db: AsyncSession, *, user_id: int
     ) -> dict:
-        total_items = db.query(func.sum(CartItem.quantity)).filter(
-            CartItem.user_id == user_id
-        ).scalar() or 0
-        
-        total_price = db.query(func.sum(CartItem.price * CartItem.quantity)).filter(
-            CartItem.user_id == user_id
-        ).scalar() or 0
+        result = await db.execute(
+            select(
+                func.sum(CartItem.quantity),
+                func.sum(CartItem.price * CartItem.quantity)
+            ).where(CartItem.user_id == user_id)
+        )
+        total_items, total_price = result.one()
         
         return {
-            "total_items": total_items,
-            "total_price": total_price
+            "total_items": total_items or 0,
+            "total_price": total_price or 0
         }
 
-    def clear_cart(
-        self, db: Session, *, user_id: int
+    async def clear_cart(
+        self, db: AsyncSession, *, user_id: int
     ) -> None:
-        db.query(self.model).filter(CartItem.user_id == user_id).delete()
-        db.commit()
+        await db.execute(delete(self.model).where(CartItem.user_id == user_id))
+        await db.commit()
 
 
 cart_item = CRUDCartItem(CartItem)
@@ -1,5 +1,8 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.crud.base import CRUDBase
 from app.models.category import Category
@@ -7,37 +10,66 @@ from app.schemas.category import CategoryCreate, CategoryUpdate
 
 
 class CRUDCategory(CRUDBase[Category, CategoryCreate, CategoryUpdate]):
-    def get_by_shop(
-        self, db: Session, *, shop_id: int, skip: int = 0, limit: int = 100
+    async def get_by_shop(
+        self, db: AsyncSession, *, shop_id: int, skip: int = 0, limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Category]:
-        return (
-            db.query(self.model)
-            .filter(Category.shop_id == shop_id, Category.parent_id == None)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        stmt = (
+            select(self.model).execution_options(use_replica=True)
+            .where(Category.shop_id == shop_id, Category.parent_id == None)
         )
+        result = await db.execute(self.paginate(stmt, skip=skip, limit=limit, cursor=cursor))
+        roots = result.scalars().all()
+        await self._attach_subtrees(db, shop_id=shop_id, roots=roots)
+        return roots
 
-    def get_subcategories(
-        self, db: Session, *, parent_id: int, skip: int = 0, limit: int = 100
+    async def _attach_subtrees(
+        self, db: AsyncSession, *, shop_id: int, roots: List[Category]
+    ) -> None:
+        """
+        Собирает дерево подкатегорий любой глубины одним запросом: все вложенные
+        категории магазина раскладываются по parent_id в памяти.
+        """
+        if not roots:
+            return
+        result = await db.execute(
+            select(self.model).execution_options(use_replica=True)
+            .where(Category.shop_id == shop_id, Category.parent_id != None)
+        )
+        children: Dict[int, List[Category]] = defaultdict(list)
+        nested = sorted(result.scalars().all(), key=lambda category: category.id)
+        for category in nested:
+            children[category.parent_id].append(category)
+        for category in [*roots, *nested]:
+            set_committed_value(category, "subcategories", children.get(category.id, []))
+
+    async def get_subcategories(
+        self, db: AsyncSession, *, parent_id: int, skip: int = 0, limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Category]:
-        return (
-            db.query(self.model)
-            .filter(Category.parent_id == parent_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        stmt = (
+            select(self.model)
+            .where(Category.parent_id == parent_id)
+        )
+        result = await db.execute(self.paginate(stmt, skip=skip, limit=limit, cursor=cursor))
+        return result.scalars().all()
+
+    async def get_names_by_shop(self, db: AsyncSession, *, shop_id: int) -> List[Tuple[int, str]]:
+        result = await db.execute(
+            select(Category.id, Category.name).execution_options(use_replica=True)
+            .where(Category.shop_id == shop_id)
         )
+        return result.all()
 
-    def create_with_shop(
-        self, db: Session, *, obj_in: CategoryCreate, shop_id: int
+    async def create_with_shop(
+        self, db: AsyncSession, *, obj_in: CategoryCreate, shop_id: int
     ) -> Category:
         obj_in_data = obj_in.model_dump()
         obj_in_data["shop_id"] = shop_id
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
 
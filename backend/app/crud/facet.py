@@ -0,0 +1,306 @@
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import (
+    ColumnElement, Connection, String, and_, case, cast, delete, event, func, inspect, literal,
+    not_, select, union_all,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.category import Category
+from app.models.facet import ProductFacetCount
+from app.models.product import Product
+from app.models.review import Review
+
+FacetCounts = Dict[str, Dict[str, int]]
+
+# Верхние границы ценовых корзин по цене со скидкой: 0-10, 10-50, ..., 1000+
+PRICE_BUCKETS = (10, 50, 100, 500, 1000)
+# Корзина рейтинга - нижняя граница среднего: "4" значит 4 <= avg < 5
+RATING_BUCKETS = (5, 4, 3, 2, 1)
+
+effective_price = func.coalesce(Product.discount_price, Product.price)
+in_stock = and_(Product.is_available == True, Product.stock > 0)
+discounted = and_(Product.discount_price != None, Product.discount_price < Product.price)
+
+
+@dataclass
+class ProductFilters:
+    category_id: Optional[int] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    in_stock: Optional[bool] = None
+    has_discount: Optional[bool] = None
+    min_rating: Optional[float] = None
+
+    def is_empty(self) -> bool:
+        return all(value is None for value in asdict(self).values())
+
+
+def price_bucket(price: Optional[float]) -> str:
+    if price is None:
+        return "none"
+    lower = 0
+    for upper in PRICE_BUCKETS:
+        if price < upper:
+            return f"{lower}-{upper}"
+        lower = upper
+    return f"{lower}+"
+
+
+def rating_bucket(average: Optional[float]) -> str:
+    if average is None:
+        return "none"
+    return next((str(bucket) for bucket in RATING_BUCKETS if average >= bucket), "0")
+
+
+def _price_bucket_expr() -> ColumnElement:
+    whens, lower = [(effective_price == None, "none")], 0
+    for upper in PRICE_BUCKETS:
+        whens.append((effective_price < upper, f"{lower}-{upper}"))
+        lower = upper
+    return case(*whens, else_=f"{lower}+")
+
+
+def _rating_bucket_expr(average: ColumnElement) -> ColumnElement:
+    whens = [(average == None, "none")] + [(average >= bucket, str(bucket)) for bucket in RATING_BUCKETS]
+    return case(*whens, else_="0")
+
+
+def shop_ratings(shop_id: int):
+    """Средний рейтинг товаров магазина, для фильтра и фасета по рейтингу"""
+    return (
+        select(Review.product_id, func.avg(Review.rating).label("average"))
+        .join(Product, Product.id == Review.product_id)
+        .where(Product.shop_id == shop_id)
+        .group_by(Review.product_id)
+        .subquery()
+    )
+
+
+def filter_conditions(filters: ProductFilters, ratings) -> Dict[str, List[ColumnElement]]:
+    """Условия фильтров, сгруппированные по фасету, к которому они относятся"""
+    conditions: Dict[str, List[ColumnElement]] = defaultdict(list)
+    if filters.category_id is not None:
+        # Категория вместе со всеми вложенными
+        tree = select(Category.id).where(Category.id == filters.category_id).cte(recursive=True)
+        tree = tree.union_all(select(Category.id).where(Category.parent_id == tree.c.id))
+        conditions["category"].append(Product.category_id.in_(select(tree.c.id)))
+    if filters.min_price is not None:
+        conditions["price"].append(effective_price >= filters.min_price)
+    if filters.max_price is not None:
+        conditions["price"].append(effective_price <= filters.max_price)
+    if filters.in_stock is not None:
+        conditions["availability"].append(in_stock if filters.in_stock else not_(in_stock))
+    if filters.has_discount is not None:
+        conditions["discount"].append(discounted if filters.has_discount else not_(discounted))
+    if filters.min_rating is not None:
+        conditions["rating"].append(ratings.c.average >= filters.min_rating)
+    return conditions
+
+
+def product_facets(values: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Значения фасетов товара (кроме рейтинга) - то же, что считают SQL-выражения выше"""
+    price, discount_price = values["price"], values["discount_price"]
+    return [
+        ("category", "none" if values["category_id"] is None else str(values["category_id"])),
+        ("price", price_bucket(discount_price if discount_price is not None else price)),
+        ("availability", "in_stock" if values["is_available"] and (values["stock"] or 0) > 0 else "out_of_stock"),
+        ("discount", "yes" if discount_price is not None and price is not None and discount_price < price else "no"),
+    ]
+
+
+class CRUDProductFacet:
+    async def get_counts(self, db: AsyncSession, *, shop_id: int, filters: ProductFilters) -> FacetCounts:
+        """Без фильтров - готовая сводка магазина, с фильтрами - один сгруппированный запрос"""
+        if filters.is_empty():
+            return await self.get_summary(db, shop_id=shop_id)
+        return await self.count_filtered(db, shop_id=shop_id, filters=filters)
+
+    async def get_summary(self, db: AsyncSession, *, shop_id: int) -> FacetCounts:
+        result = await db.execute(
+            select(ProductFacetCount.facet, ProductFacetCount.value, ProductFacetCount.count)
+            .execution_options(use_replica=True)
+            .where(ProductFacetCount.shop_id == shop_id, ProductFacetCount.count > 0)
+        )
+        return self._group(result.all())
+
+    async def count_filtered(self, db: AsyncSession, *, shop_id: int, filters: ProductFilters) -> FacetCounts:
+        """
+        Счётчик фасета учитывает все фильтры, кроме своего собственного, чтобы
+        покупатель видел, сколько товаров даст другое значение этого фасета.
+        """
+        ratings = shop_ratings(shop_id)
+        conditions = filter_conditions(filters, ratings)
+        values = {
+            "category": func.coalesce(cast(Product.category_id, String), "none"),
+            "price": _price_bucket_expr(),
+            "availability": case((in_stock, "in_stock"), else_="out_of_stock"),
+            "discount": case((discounted, "yes"), else_="no"),
+            "rating": _rating_bucket_expr(ratings.c.average),
+        }
+        parts = []
+        for facet, value in values.items():
+            where = [Product.shop_id == shop_id]
+            where += [c for other, conds in conditions.items() if other != facet for c in conds]
+            parts.append(
+                select(literal(facet).label("facet"), value.label("value"), func.count().label("count"))
+                .select_from(Product)
+                .outerjoin(ratings, ratings.c.product_id == Product.id)
+                .where(*where)
+                .group_by(value)
+            )
+        result = await db.execute(union_all(*parts).execution_options(use_replica=True))
+        return self._group(result.all())
+
+    async def rebuild(self, db: AsyncSession, *, shop_id: int) -> None:
+        """Пересчёт сводки с нуля - после массовой загрузки товаров в обход ORM"""
+        counts = await self.count_filtered(db, shop_id=shop_id, filters=ProductFilters())
+        await db.execute(delete(ProductFacetCount).where(ProductFacetCount.shop_id == shop_id))
+        db.add_all([
+            ProductFacetCount(shop_id=shop_id, facet=facet, value=value, count=count)
+            for facet, values in counts.items()
+            for value, count in values.items()
+        ])
+        await db.commit()
+
+    async def apply_deltas(self, db: AsyncSession, *, deltas: Counter) -> None:
+        """Изменения товаров в обход ORM (массовый UPDATE) сводка сама не видит"""
+        stmt = _upsert_deltas(db.get_bind().dialect.name, deltas)
+        if stmt is not None:
+            await db.execute(stmt)
+
+    @staticmethod
+    def _group(rows: Iterable[Tuple[str, str, int]]) -> FacetCounts:
+        counts: FacetCounts = defaultdict(dict)
+        for facet, value, count in rows:
+            counts[facet][value] = count
+        return dict(counts)
+
+
+product_facet = CRUDProductFacet()
+
+
+# Сводка правится в той же транзакции, что и товары с отзывами: before_flush
+# собирает изменения (старые значения ещё в истории атрибутов и в БД),
+# after_flush применяет дельты upsert'ом.
+
+_PRODUCT_FIELDS = ("category_id", "price", "discount_price", "is_available", "stock")
+
+
+def _product_values(obj: Product, old: bool) -> Dict[str, Any]:
+    state = inspect(obj)
+    values = {}
+    for name in _PRODUCT_FIELDS:
+        history = state.attrs[name].history
+        if old and (history.deleted or history.unchanged):
+            values[name] = (history.deleted or history.unchanged)[0]
+        elif name in state.dict or Product.__table__.c[name].default is None:
+            values[name] = getattr(obj, name)
+        else:
+            # Значение по умолчанию колонки подставится только в INSERT
+            values[name] = Product.__table__.c[name].default.arg
+    return values
+
+
+def _rating_buckets(conn: Connection, product_ids: Set[int]) -> Dict[int, Tuple[int, str]]:
+    if not product_ids:
+        return {}
+    rows = conn.execute(
+        select(Product.id, Product.shop_id, func.avg(Review.rating))
+        .outerjoin(Review, Review.product_id == Product.id)
+        .where(Product.id.in_(product_ids))
+        .group_by(Product.id, Product.shop_id)
+    )
+    return {id: (shop_id, rating_bucket(average)) for id, shop_id, average in rows}
+
+
+def _collect_facet_changes(session: Session, flush_context: Any, instances: Any) -> None:
+    deltas: Counter = Counter()
+    rated: Set[int] = set()
+    deleted_products: Set[int] = set()
+
+    for obj in session.new:
+        if isinstance(obj, Product):
+            for facet, value in product_facets(_product_values(obj, old=False)) + [("rating", "none")]:
+                deltas[(obj.shop_id, facet, value)] += 1
+        elif isinstance(obj, Review):
+            rated.add(obj.product_id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            for facet, value in product_facets(_product_values(obj, old=True)):
+                deltas[(obj.shop_id, facet, value)] -= 1
+            deleted_products.add(obj.id)
+        elif isinstance(obj, Review):
+            rated.add(obj.product_id)
+
+    for obj in session.dirty:
+        if not session.is_modified(obj):
+            continue
+        if isinstance(obj, Product):
+            for facet, value in product_facets(_product_values(obj, old=True)):
+                deltas[(obj.shop_id, facet, value)] -= 1
+            for facet, value in product_facets(_product_values(obj, old=False)):
+                deltas[(obj.shop_id, facet, value)] += 1
+        elif isinstance(obj, Review):
+            history = inspect(obj).attrs.product_id.history
+            rated.update(history.deleted or [])
+            rated.add(obj.product_id)
+
+    rated.discard(None)
+    if not deltas and not rated and not deleted_products:
+        return
+
+    before = _rating_buckets(session.connection(), rated | deleted_products)
+    for product_id in deleted_products:
+        if product_id in before:
+            shop_id, bucket = before[product_id]
+            deltas[(shop_id, "rating", bucket)] -= 1
+    session.info["facet_deltas"] = deltas
+    session.info["facet_rated"] = {id: before.get(id) for id in rated - deleted_products}
+
+
+def _upsert_deltas(dialect_name: str, deltas: Counter):
+    # Строки счётчиков магазина общие для всех транзакций - блокируем их в одном
+    # порядке, иначе два параллельных upsert на PostgreSQL могут взаимно заблокироваться
+    rows = [
+        {"shop_id": shop_id, "facet": facet, "value": value, "count": delta}
+        for (shop_id, facet, value), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return None
+    insert = pg_insert if dialect_name == "postgresql" else sqlite_insert
+    stmt = insert(ProductFacetCount).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=["shop_id", "facet", "value"],
+        set_={"count": ProductFacetCount.count + stmt.excluded["count"]},
+    )
+
+
+def _apply_facet_changes(session: Session, flush_context: Any) -> None:
+    deltas: Optional[Counter] = session.info.pop("facet_deltas", None)
+    rated: Dict[int, Optional[Tuple[int, str]]] = session.info.pop("facet_rated", {})
+    if deltas is None:
+        return
+
+    conn = session.connection()
+    for product_id, (shop_id, bucket) in _rating_buckets(conn, set(rated)).items():
+        # Товар, созданный в этом же flush, до него был без рейтинга
+        old_bucket = rated[product_id][1] if rated[product_id] else "none"
+        if old_bucket != bucket:
+            deltas[(shop_id, "rating", old_bucket)] -= 1
+            deltas[(shop_id, "rating", bucket)] += 1
+
+    stmt = _upsert_deltas(conn.dialect.name, deltas)
+    if stmt is not None:
+        conn.execute(stmt)
+
+
+event.listen(Session, "before_flush", _collect_facet_changes)
+event.listen(Session, "after_flush", _apply_facet_changes)
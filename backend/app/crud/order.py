@@ -1,77 +1,136 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 import uuid
 
 from app.crud.base import CRUDBase
+from app.crud.facet import product_facet as product_facet_crud
+from app.crud.reservation import stock_reservation as stock_reservation_crud
+from app.models.cart import CartItem
 from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product
+from app.models.shop import Shop
 from app.schemas.order import OrderCreate, OrderUpdate, OrderItemCreate
 
 
+class CheckoutError(Exception):
+    """Позиции, которые нельзя оформить: [{"product_id": ..., "reason": ...}]"""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class OrderStatusConflict(Exception):
+    """Переход заказа из текущего статуса недопустим или его опередил другой процесс"""
+
+    def __init__(self, order_id: int, current: OrderStatus, status: OrderStatus):
+        super().__init__(f"Order {order_id}: {current.value} -> {status.value}")
+        self.current = current
+        self.status = status
+
+
+# Допустимые переходы статуса заказа. Оплата и отмена возможны только из
+# PENDING - пока остаток удержан; возврат - только для оплаченного заказа
+ORDER_TRANSITIONS = {
+    OrderStatus.PENDING: (OrderStatus.PAID, OrderStatus.CANCELLED),
+    OrderStatus.PAID: (OrderStatus.REFUNDED, OrderStatus.PROCESSING),
+    OrderStatus.PROCESSING: (OrderStatus.SHIPPED,),
+    OrderStatus.SHIPPED: (OrderStatus.DELIVERED,),
+}
+
+
 class CRUDOrderItem(CRUDBase[OrderItem, OrderItemCreate, any]):
-    def get_by_order(
-        self, db: Session, *, order_id: int
+    async def get_by_order(
+        self, db: AsyncSession, *, order_id: int
     ) -> List[OrderItem]:
-        return (
-            db.query(self.model)
-            .filter(OrderItem.order_id == order_id)
-            .all()
+        result = await db.execute(
+            select(self.model)
+            .where(OrderItem.order_id == order_id)
         )
+        return result.scalars().all()
 
-    def create_with_order(
-        self, db: Session, *, obj_in: OrderItemCreate, order_id: int
+    async def create_with_order(
+        self, db: AsyncSession, *, obj_in: OrderItemCreate, order_id: int
     ) -> OrderItem:
         obj_in_data = obj_in.model_dump()
         obj_in_data["order_id"] = order_id
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
 
 class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
-    def get_by_user(
-        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
+    cursor_columns = ("created_at", "id")
+    cursor_descending = True
+
+    async def get(self, db: AsyncSession, id: Any, *, use_replica: bool = False) -> Optional[Order]:
+        # populate_existing: статус мог смениться UPDATE'ом мимо сессии (release_expired)
+        result = await db.execute(
+            select(self.model).execution_options(use_replica=use_replica, populate_existing=True)
+            .options(
+                selectinload(Order.items).joinedload(OrderItem.product),
+                joinedload(Order.shop).joinedload(Shop.settings),
+            )
+            .where(Order.id == id)
+        )
+        return result.scalars().first()
+
+    async def get_by_user(
+        self, db: AsyncSession, *, user_id: int, skip: int = 0, limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Order]:
-        return (
-            db.query(self.model)
-            .filter(Order.user_id == user_id)
-            .order_by(Order.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+        stmt = (
+            select(self.model)
+            .where(Order.user_id == user_id)
         )
+        result = await db.execute(self.paginate(stmt, skip=skip, limit=limit, cursor=cursor))
+        return result.scalars().all()
 
-    def get_by_shop(
-        self, db: Session, *, shop_id: int, skip: int = 0, limit: int = 100
+    async def get_by_shop(
+        self, db: AsyncSession, *, shop_id: int, skip: int = 0, limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Order]:
-        return (
-            db.query(self.model)
-            .filter(Order.shop_id == shop_id)
-            .order_by(Order.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+        stmt = (
+            select(self.model).execution_options(use_replica=True)
+            .where(Order.shop_id == shop_id)
         )
+        result = await db.execute(self.paginate(stmt, skip=skip, limit=limit, cursor=cursor))
+        return result.scalars().all()
 
-    def get_by_shop_and_status(
-        self, db: Session, *, shop_id: int, status: OrderStatus, skip: int = 0, limit: int = 100
+    async def get_by_shop_and_status(
+        self, db: AsyncSession, *, shop_id: int, status: OrderStatus, skip: int = 0, limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Order]:
-        return (
-            db.query(self.model)
-            .filter(Order.shop_id == shop_id, Order.status == status)
-            .order_by(Order.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+        stmt = (
+            select(self.model)
+            .where(Order.shop_id == shop_id, Order.status == status)
         )
+        result = await db.execute(self.paginate(stmt, skip=skip, limit=limit, cursor=cursor))
+        return result.scalars().all()
 
-    def create_with_items(
-        self, db: Session, *, obj_in: OrderCreate
+    async def create_with_items(
+        self, db: AsyncSession, *, obj_in: OrderCreate, clear_cart: bool = False
     ) -> Order:
+        """
+        Заказ, его позиции, списание и удержание остатков, очистка корзины
+        покупателя - одна транзакция с одним commit. Цены берутся из товаров,
+        а не из запроса.
+        Если какую-то позицию оформить нельзя, транзакция откатывается и
+        поднимается CheckoutError со списком причин по позициям.
+        """
+        quantities: Dict[int, int] = defaultdict(int)
+        for item in obj_in.items:
+            quantities[item.product_id] += item.quantity
+        prices = await self._reserve_stock(db, shop_id=obj_in.shop_id, quantities=quantities)
+
         order_number = f"ORD-{uuid.uuid4().hex[:8].upper()}"
         
-        total_amount = sum(item.price * item.quantity for item in obj_in.items)
+        total_amount = sum(prices[item.product_id] * item.quantity for item in obj_in.items)
         
         db_obj = Order(
             user_id=obj_in.user_id,
@@ -84,32 +143,133 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
             status=OrderStatus.PENDING
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        # flush получает id заказа, не завершая транзакцию
+        await db.flush()
         
-        for item in obj_in.items:
-            order_item = OrderItem(
-                order_id=db_obj.id,
-                product_id=item.product_id,
-                quantity=item.quantity,
-                price=item.price
+        if obj_in.items:
+            await db.execute(
+                insert(OrderItem).values([
+                    {
+                        "order_id": db_obj.id,
+                        "product_id": item.product_id,
+                        "quantity": item.quantity,
+                        "price": prices[item.product_id],
+                    }
+                    for item in obj_in.items
+                ])
             )
-            db.add(order_item)
+        await stock_reservation_crud.reserve(db, order_id=db_obj.id, quantities=quantities)
+        if clear_cart:
+            await db.execute(delete(CartItem).where(CartItem.user_id == obj_in.user_id))
         
-        db.commit()
+        await db.commit()
         return db_obj
 
-    def update_status(
-        self, db: Session, *, order_id: int, status: OrderStatus
-    ) -> Order:
-        db_obj = self.get(db=db, id=order_id)
-        if db_obj:
-            db_obj.status = status
-            db.add(db_obj)
-            db.commit()
-            db.refresh(db_obj)
-        return db_obj
+    async def _reserve_stock(
+        self, db: AsyncSession, *, shop_id: int, quantities: Dict[int, int]
+    ) -> Dict[int, float]:
+        """
+        Блокирует товары SELECT ... FOR UPDATE в порядке id - все оформления берут
+        блокировки в одном порядке и не упираются друг в друга взаимно - и списывает
+        остатки одним условным UPDATE. Возвращает цены товаров с учётом скидки.
+        """
+        if not quantities:
+            return {}
+        result = await db.execute(
+            select(Product.id, Product.shop_id, Product.price, Product.discount_price,
+                   Product.stock, Product.is_available)
+            .where(Product.id.in_(quantities))
+            .order_by(Product.id)
+            .with_for_update()
+        )
+        products = {row.id: row for row in result.all()}
+
+        errors = []
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if product is None or product.shop_id != shop_id:
+                errors.append({"product_id": product_id, "reason": "not_found"})
+            elif not product.is_available:
+                errors.append({"product_id": product_id, "reason": "unavailable"})
+            elif quantity <= 0:
+                errors.append({"product_id": product_id, "reason": "invalid_quantity"})
+            elif (product.stock or 0) < quantity:
+                errors.append({"product_id": product_id, "reason": "insufficient_stock", "available": product.stock or 0})
+        if errors:
+            await db.rollback()
+            raise CheckoutError(errors)
 
+        # Условие на остаток страхует и там, где FOR UPDATE не поддерживается (SQLite)
+        requested = case(quantities, value=Product.id)
+        result = await db.execute(
+            update(Product)
+            .where(Product.id.in_(quantities), Product.stock >= requested)
+            .values(stock=Product.stock - requested)
+            .returning(Product.id, Product.stock)
+            .execution_options(synchronize_session=False)
+        )
+        remaining = dict(result.all())
+        if len(remaining) < len(quantities):
+            await db.rollback()
+            raise CheckoutError([
+                {"product_id": product_id, "reason": "insufficient_stock"}
+                for product_id in quantities if product_id not in remaining
+            ])
+
+        # Распроданные товары переходят в фасете наличия в "out_of_stock"
+        deltas: Counter = Counter()
+        for product_id, stock in remaining.items():
+            if stock <= 0:
+                deltas[(shop_id, "availability", "in_stock")] -= 1
+                deltas[(shop_id, "availability", "out_of_stock")] += 1
+        await product_facet_crud.apply_deltas(db, deltas=deltas)
+
+        return {
+            product.id: product.discount_price if product.discount_price is not None else product.price
+            for product in products.values()
+        }
+
+    async def update_status(
+        self, db: AsyncSession, *, order_id: int, status: OrderStatus
+    ) -> Optional[Order]:
+        """
+        Переводит заказ в status вместе с его удержаниями остатков. Повтор текущего
+        статуса ничего не меняет; недопустимый переход, оплата заказа, чьи
+        удержания уже сняты, или статус, изменённый параллельно (например,
+        истечением удержания), - OrderStatusConflict, транзакция откатывается.
+        Заказ без удержаний (оформлен до их появления) оплачивается как есть.
+        """
+        db_obj = await self.get(db=db, id=order_id)
+        if not db_obj or db_obj.status == status:
+            return db_obj
+        current = db_obj.status
+        if status not in ORDER_TRANSITIONS.get(current, ()):
+            raise OrderStatusConflict(order_id, current, status)
+
+        # Удержания блокируются раньше заказа - в том же порядке, что и в release_expired
+        if status == OrderStatus.PAID:
+            # Нечего фиксировать можно только у заказа совсем без удержаний; если
+            # они были, но уже сняты, остаток вернулся на склад - оплата конфликтует
+            if (
+                not await stock_reservation_crud.commit(db, order_id=order_id)
+                and await stock_reservation_crud.exists(db, order_id=order_id)
+            ):
+                await db.rollback()
+                raise OrderStatusConflict(order_id, current, status)
+        elif status == OrderStatus.CANCELLED:
+            await stock_reservation_crud.release(db, order_id=order_id)
+        result = await db.execute(
+            update(Order)
+            .where(Order.id == order_id, Order.status == current)
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            await db.rollback()
+            raise OrderStatusConflict(order_id, current, status)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
 
 order = CRUDOrder(Order)
 order_item = CRUDOrderItem(OrderItem)
@@ -1,5 +1,6 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
 from app.models.payment import Payment, PaymentStatus
@@ -7,35 +8,40 @@ from app.schemas.payment import PaymentCreate, PaymentUpdate
 
 
 class CRUDPayment(CRUDBase[Payment, PaymentCreate, PaymentUpdate]):
-    def get_by_order(
-        self, db: Session, *, order_id: int
+    async def get_by_order(
+        self, db: AsyncSession, *, order_id: int
     ) -> Optional[Payment]:
-        return (
-            db.query(self.model)
-            .filter(Payment.order_id == order_id)
-            .first()
+        result = await db.execute(
+            select(self.model)
+            .where(Payment.order_id == order_id)
         )
+        return result.scalars().first()
 
-    def get_by_provider_payment_id(
-        self, db: Session, *, provider_payment_id: str
+    async def get_by_provider_payment_id(
+        self, db: AsyncSession, *, provider_payment_id: str
     ) -> Optional[Payment]:
-        return (
-            db.query(self.model)
-            .filter(Payment.provider_payment_id == provider_payment_id)
-            .first()
+        result = await db.execute(
+            select(self.model)
+            .where(Payment.provider_payment_id == provider_payment_id)
         )
+        return result.scalars().first()
 
-    def update_status(
-        self, db: Session, *, payment_id: int, status: PaymentStatus, details: Optional[str] = None
+    async def update_status(
+        self, db: AsyncSession, *, payment_id: int, status: PaymentStatus, details: Optional[str] = None,
+        refund_required: bool = False
     ) -> Payment:
-        db_obj = self.get(db=db, id=payment_id)
+        db_obj = await self.get(db=db, id=payment_id)
         if db_obj:
             db_obj.status = status
             if details:
                 db_obj.details = details
+            if status == PaymentStatus.COMPLETED and refund_required:
+                db_obj.refund_required = True
+            elif status == PaymentStatus.REFUNDED:
+                db_obj.refund_required = False
             db.add(db_obj)
-            db.commit()
-            db.refresh(db_obj)
+            await db.commit()
+            await db.refresh(db_obj)
         return db_obj
 
 
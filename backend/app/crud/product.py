@@ -1,100 +1,173 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from functools import reduce
+from typing import List, Optional, Dict, Any, Tuple
+import operator
+
+from sqlalchemy import ColumnElement, Float, case, cast, desc, func, literal_column, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.crud.base import CRUDBase
+from app.crud.facet import ProductFilters, filter_conditions, shop_ratings
 from app.models.product import Product, ProductImage
 from app.schemas.product import ProductCreate, ProductUpdate, ProductImageCreate, ProductImageUpdate
 
 
 class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
-    def get_by_shop(
-        self, db: Session, *, shop_id: int, skip: int = 0, limit: int = 100
+    async def get_by_shop(
+        self, db: AsyncSession, *, shop_id: int, skip: int = 0, limit: int = 100,
+        cursor: Optional[str] = None, filters: Optional[ProductFilters] = None
     ) -> List[Product]:
-        return (
-            db.query(self.model)
-            .filter(Product.shop_id == shop_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        stmt = (
+            select(self.model).execution_options(use_replica=True)
+            .options(selectinload(Product.images))
+            .where(Product.shop_id == shop_id)
         )
+        if filters and not filters.is_empty():
+            ratings = shop_ratings(shop_id)
+            if filters.min_rating is not None:
+                stmt = stmt.join(ratings, ratings.c.product_id == Product.id)
+            for conditions in filter_conditions(filters, ratings).values():
+                stmt = stmt.where(*conditions)
+        result = await db.execute(self.paginate(stmt, skip=skip, limit=limit, cursor=cursor))
+        return result.scalars().all()
 
-    def get_by_category(
-        self, db: Session, *, category_id: int, skip: int = 0, limit: int = 100
+    async def get_by_category(
+        self, db: AsyncSession, *, category_id: int, skip: int = 0, limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Product]:
-        return (
-            db.query(self.model)
-            .filter(Product.category_id == category_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        stmt = (
+            select(self.model)
+            .options(selectinload(Product.images))
+            .where(Product.category_id == category_id)
         )
+        result = await db.execute(self.paginate(stmt, skip=skip, limit=limit, cursor=cursor))
+        return result.scalars().all()
 
-    def search(
-        self, db: Session, *, shop_id: int, query: str, skip: int = 0, limit: int = 100
+    async def search(
+        self, db: AsyncSession, *, shop_id: int, query: str, skip: int = 0, limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Product]:
-        return (
-            db.query(self.model)
-            .filter(
-                Product.shop_id == shop_id,
-                Product.name.ilike(f"%{query}%")
-            )
-            .offset(skip)
-            .limit(limit)
-            .all()
+        """
+        Поиск по названию, SKU и описанию с сортировкой по релевантности.
+        В PostgreSQL - tsvector и pg_trgm (опечатки в названии), иначе - LIKE с весами полей.
+        Найденным товарам проставляется search_rank для next_search_cursor.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            rank, condition = self._fulltext_search(query)
+        else:
+            rank, condition = self._like_search(query)
+        ranked = (
+            select(Product.id, cast(rank, Float).label("rank"))
+            .where(Product.shop_id == shop_id, condition)
+            .subquery()
+        )
+        stmt = (
+            select(self.model, ranked.c.rank).execution_options(use_replica=True)
+            .join(ranked, ranked.c.id == Product.id)
+            .options(selectinload(Product.images))
         )
+        if cursor:
+            values = self.unpack_cursor(cursor, (float, int))
+            stmt = stmt.where(tuple_(ranked.c.rank, ranked.c.id) < tuple_(*values))
+        else:
+            stmt = stmt.offset(skip)
+        result = await db.execute(stmt.order_by(ranked.c.rank.desc(), ranked.c.id.desc()).limit(limit))
+
+        products = []
+        for product, search_rank in result.all():
+            product.search_rank = search_rank
+            products.append(product)
+        return products
+
+    def next_search_cursor(self, items: List[Product], limit: int) -> Optional[str]:
+        if not items or len(items) < limit:
+            return None
+        return self.pack_cursor([items[-1].search_rank, items[-1].id])
+
+    @staticmethod
+    def _fulltext_search(query: str) -> Tuple[ColumnElement, ColumnElement]:
+        # Колонка генерируется в БД и в модели не описана, см. PRODUCT_SEARCH_VECTOR
+        search_vector = literal_column("products.search_vector")
+        tsquery = func.websearch_to_tsquery("simple", query)
+        rank = func.ts_rank_cd(search_vector, tsquery) + func.similarity(Product.name, query)
+        condition = or_(search_vector.op("@@")(tsquery), Product.name.op("%")(query))
+        return rank, condition
 
-    def create_with_shop(
-        self, db: Session, *, obj_in: ProductCreate, shop_id: int
+    @staticmethod
+    def _like_search(query: str) -> Tuple[ColumnElement, ColumnElement]:
+        pattern = f"%{query}%"
+        weights = ((Product.name, 4.0), (Product.sku, 2.0), (Product.description, 1.0))
+        rank = reduce(operator.add, (case((column.ilike(pattern), weight), else_=0.0) for column, weight in weights))
+        condition = or_(*(column.ilike(pattern) for column, _ in weights))
+        return rank, condition
+
+    async def create_with_shop(
+        self, db: AsyncSession, *, obj_in: ProductCreate, shop_id: int
     ) -> Product:
         obj_in_data = obj_in.model_dump()
         obj_in_data["shop_id"] = shop_id
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    def get_with_images(self, db: Session, *, id: int) -> Optional[Product]:
-        return db.query(Product).filter(Product.id == id).first()
+    async def get_names_by_shop(self, db: AsyncSession, *, shop_id: int) -> List[Tuple[int, str]]:
+        result = await db.execute(
+            select(Product.id, Product.name).execution_options(use_replica=True)
+            .where(Product.shop_id == shop_id, Product.is_available == True)
+        )
+        return result.all()
+
+    async def get_ids_by_category(self, db: AsyncSession, *, category_id: int) -> List[int]:
+        result = await db.execute(select(Product.id).where(Product.category_id == category_id))
+        return result.scalars().all()
+
+    async def get_with_images(self, db: AsyncSession, *, id: int) -> Optional[Product]:
+        result = await db.execute(
+            select(Product)
+            .options(selectinload(Product.images), joinedload(Product.category))
+            .where(Product.id == id)
+        )
+        return result.scalars().first()
 
 
 class CRUDProductImage(CRUDBase[ProductImage, ProductImageCreate, ProductImageUpdate]):
-    def get_by_product(
-        self, db: Session, *, product_id: int
+    async def get_by_product(
+        self, db: AsyncSession, *, product_id: int
     ) -> List[ProductImage]:
-        return (
-            db.query(self.model)
-            .filter(ProductImage.product_id == product_id)
+        result = await db.execute(
+            select(self.model).execution_options(use_replica=True)
+            .where(ProductImage.product_id == product_id)
             .order_by(ProductImage.order)
-            .all()
         )
+        return result.scalars().all()
 
-    def get_primary(
-        self, db: Session, *, product_id: int
+    async def get_primary(
+        self, db: AsyncSession, *, product_id: int
     ) -> Optional[ProductImage]:
-        return (
-            db.query(self.model)
-            .filter(ProductImage.product_id == product_id, ProductImage.is_primary == True)
-            .first()
+        result = await db.execute(
+            select(self.model)
+            .where(ProductImage.product_id == product_id, ProductImage.is_primary == True)
         )
+        return result.scalars().first()
 
-    def create_with_product(
-        self, db: Session, *, obj_in: ProductImageCreate, product_id: int
+    async def create_with_product(
+        self, db: AsyncSession, *, obj_in: ProductImageCreate, product_id: int
     ) -> ProductImage:
         obj_in_data = obj_in.model_dump()
         obj_in_data["product_id"] = product_id
         
         if obj_in_data.get("is_primary"):
-            existing_primary = self.get_primary(db=db, product_id=product_id)
+            existing_primary = await self.get_primary(db=db, product_id=product_id)
             if existing_primary:
                 existing_primary.is_primary = False
                 db.add(existing_primary)
         
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
 
@@ -0,0 +1,138 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.facet import product_facet as product_facet_crud
+from app.models.order import Order, OrderStatus
+from app.models.product import Product
+from app.models.reservation import ReservationStatus, StockReservation
+
+# (shop_id, product_id) товаров, которым вернули остаток - для сброса кэша каталога
+Restocked = Set[Tuple[int, int]]
+
+
+class CRUDStockReservation:
+    """
+    Журнал удержаний остатков. Остаток списывается с товара при оформлении
+    заказа (CRUDOrder._reserve_stock), удержание фиксирует, сколько и до какого
+    времени: оплата делает его окончательным (commit), отмена или истечение
+    срока возвращает остаток товару (release).
+    """
+
+    async def reserve(
+        self, db: AsyncSession, *, order_id: int, quantities: Dict[int, int],
+        expires_at: Optional[datetime] = None
+    ) -> None:
+        if not quantities:
+            return
+        expires_at = expires_at or datetime.now() + timedelta(seconds=settings.RESERVATION_TTL)
+        await db.execute(
+            insert(StockReservation).values([
+                {
+                    "order_id": order_id,
+                    "product_id": product_id,
+                    "quantity": quantity,
+                    "status": ReservationStatus.HELD,
+                    "expires_at": expires_at,
+                }
+                for product_id, quantity in quantities.items()
+            ])
+        )
+
+    async def commit(self, db: AsyncSession, *, order_id: int) -> int:
+        result = await db.execute(
+            update(StockReservation)
+            .where(StockReservation.order_id == order_id, StockReservation.status == ReservationStatus.HELD)
+            .values(status=ReservationStatus.COMMITTED)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    async def exists(self, db: AsyncSession, *, order_id: int) -> bool:
+        """Есть ли у заказа удержания: у заказов до их появления и без позиций их нет"""
+        result = await db.execute(
+            select(StockReservation.id).where(StockReservation.order_id == order_id).limit(1)
+        )
+        return result.first() is not None
+
+    async def release(self, db: AsyncSession, *, order_id: int) -> Restocked:
+        result = await db.execute(
+            update(StockReservation)
+            .where(StockReservation.order_id == order_id, StockReservation.status == ReservationStatus.HELD)
+            .values(status=ReservationStatus.RELEASED)
+            .returning(StockReservation.product_id, StockReservation.quantity)
+            .execution_options(synchronize_session=False)
+        )
+        return await self._restock(db, result.all())
+
+    async def release_expired(self, db: AsyncSession, *, limit: int) -> Tuple[int, Restocked]:
+        """
+        Пачка просроченных удержаний: возвращает остатки, отменяет неоплаченные
+        заказы и коммитит. SKIP LOCKED позволяет нескольким воркерам разбирать
+        очередь параллельно, не ожидая строк друг друга.
+        """
+        result = await db.execute(
+            select(StockReservation.id, StockReservation.order_id,
+                   StockReservation.product_id, StockReservation.quantity)
+            .where(StockReservation.status == ReservationStatus.HELD, StockReservation.expires_at < datetime.now())
+            .order_by(StockReservation.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.all()
+        if not rows:
+            await db.rollback()
+            return 0, set()
+
+        await db.execute(
+            update(StockReservation)
+            .where(StockReservation.id.in_([row.id for row in rows]))
+            .values(status=ReservationStatus.RELEASED)
+            .execution_options(synchronize_session=False)
+        )
+        restocked = await self._restock(db, [(row.product_id, row.quantity) for row in rows])
+        await db.execute(
+            update(Order)
+            .where(Order.id.in_({row.order_id for row in rows}), Order.status == OrderStatus.PENDING)
+            .values(status=OrderStatus.CANCELLED)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return len(rows), restocked
+
+    async def _restock(self, db: AsyncSession, rows: Iterable[Tuple[int, int]]) -> Restocked:
+        quantities: Dict[int, int] = defaultdict(int)
+        for product_id, quantity in rows:
+            quantities[product_id] += quantity
+        if not quantities:
+            return set()
+
+        # Блокировки в том же порядке, что и при оформлении заказа
+        await db.execute(
+            select(Product.id).where(Product.id.in_(quantities)).order_by(Product.id).with_for_update()
+        )
+        returned = case(quantities, value=Product.id)
+        result = await db.execute(
+            update(Product)
+            .where(Product.id.in_(quantities))
+            .values(stock=Product.stock + returned)
+            .returning(Product.id, Product.shop_id, Product.stock, Product.is_available)
+            .execution_options(synchronize_session=False)
+        )
+        restocked: Restocked = set()
+        deltas: Counter = Counter()
+        for product_id, shop_id, stock, is_available in result.all():
+            restocked.add((shop_id, product_id))
+            # Товар снова в наличии - обратный переход фасета наличия
+            if is_available and stock > 0 and stock - quantities[product_id] <= 0:
+                deltas[(shop_id, "availability", "out_of_stock")] -= 1
+                deltas[(shop_id, "availability", "in_stock")] += 1
+        await product_facet_crud.apply_deltas(db, deltas=deltas)
+        return restocked
+
+
+stock_reservation = CRUDStockReservation()
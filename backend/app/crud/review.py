@@ -1,6 +1,7 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from app.crud.base import CRUDBase
 from app.models.review import Review
@@ -8,41 +9,42 @@ from app.schemas.review import ReviewCreate, ReviewUpdate
 
 
 class CRUDReview(CRUDBase[Review, ReviewCreate, ReviewUpdate]):
-    def get_by_product(
-        self, db: Session, *, product_id: int, skip: int = 0, limit: int = 100
+    cursor_columns = ("created_at", "id")
+    cursor_descending = True
+
+    async def get_by_product(
+        self, db: AsyncSession, *, product_id: int, skip: int = 0, limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Review]:
-        return (
-            db.query(self.model)
-            .filter(Review.product_id == product_id)
-            .order_by(Review.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+        stmt = (
+            select(self.model).execution_options(use_replica=True)
+            .options(joinedload(Review.user))
+            .where(Review.product_id == product_id)
         )
+        result = await db.execute(self.paginate(stmt, skip=skip, limit=limit, cursor=cursor))
+        return result.scalars().all()
 
-    def get_by_user_and_product(
-        self, db: Session, *, user_id: int, product_id: int
+    async def get_by_user_and_product(
+        self, db: AsyncSession, *, user_id: int, product_id: int
     ) -> Optional[Review]:
-        return (
-            db.query(self.model)
-            .filter(Review.user_id == user_id, Review.product_id == product_id)
-            .first()
+        result = await db.execute(
+            select(self.model)
+            .where(Review.user_id == user_id, Review.product_id == product_id)
         )
+        return result.scalars().first()
 
-    def get_product_rating(
-        self, db: Session, *, product_id: int
+    async def get_product_rating(
+        self, db: AsyncSession, *, product_id: int
     ) -> dict:
-        avg_rating = db.query(func.avg(Review.rating)).filter(
-            Review.product_id == product_id
-        ).scalar() or 0
-        
-        count = db.query(func.count(Review.id)).filter(
-            Review.product_id == product_id
-        ).scalar() or 0
+        result = await db.execute(
+            select(func.avg(Review.rating), func.count(Review.id))
+            .where(Review.product_id == product_id)
+        )
+        avg_rating, count = result.one()
         
         return {
-            "average": float(avg_rating),
-            "count": count
+            "average": float(avg_rating or 0),
+            "count": count or 0
         }
 
 
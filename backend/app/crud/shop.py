@@ -1,49 +1,71 @@
-from typing import Any, Dict, Optional, Union, List
-from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional, Set, Tuple, Union, List
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from app.crud.base import CRUDBase
 from app.models.shop import Shop, ShopSettings
+from app.models.user import Role, UserRole
 from app.schemas.shop import ShopCreate, ShopUpdate, ShopSettingsCreate, ShopSettingsUpdate
 
 
 class CRUDShop(CRUDBase[Shop, ShopCreate, ShopUpdate]):
-    def get_multi_by_owner(
-        self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100
+    async def get_multi_by_owner(
+        self, db: AsyncSession, *, owner_id: int, skip: int = 0, limit: int = 100
     ) -> List[Shop]:
-        return (
-            db.query(self.model)
-            .filter(Shop.owner_id == owner_id)
+        result = await db.execute(
+            select(self.model)
+            .where(Shop.owner_id == owner_id)
             .offset(skip)
             .limit(limit)
-            .all()
         )
+        return result.scalars().all()
 
-    def create_with_owner(
-        self, db: Session, *, obj_in: ShopCreate, owner_id: int
+    async def create_with_owner(
+        self, db: AsyncSession, *, obj_in: ShopCreate, owner_id: int
     ) -> Shop:
         obj_in_data = obj_in.model_dump()
         obj_in_data["owner_id"] = owner_id
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         
         settings = ShopSettings(shop_id=db_obj.id)
         db.add(settings)
-        db.commit()
+        await db.commit()
         
         return db_obj
 
-    def get_shop_with_settings(self, db: Session, *, shop_id: int) -> Optional[Shop]:
-        return db.query(Shop).filter(Shop.id == shop_id).first()
+    async def get_shop_with_settings(self, db: AsyncSession, *, shop_id: int) -> Optional[Shop]:
+        result = await db.execute(
+            select(Shop).options(joinedload(Shop.settings)).where(Shop.id == shop_id)
+        )
+        return result.scalars().first()
+
+    async def get_with_user_roles(
+        self, db: AsyncSession, *, shop_id: int, user_id: int
+    ) -> Tuple[Optional[Shop], Set[str]]:
+        """Магазин и имена ролей пользователя в нём одним запросом"""
+        result = await db.execute(
+            select(Shop, Role.name)
+            .outerjoin(UserRole, and_(UserRole.shop_id == Shop.id, UserRole.user_id == user_id))
+            .outerjoin(Role, Role.id == UserRole.role_id)
+            .where(Shop.id == shop_id)
+        )
+        rows = result.all()
+        if not rows:
+            return None, set()
+        return rows[0][0], {name for _, name in rows if name is not None}
 
 
 class CRUDShopSettings(CRUDBase[ShopSettings, ShopSettingsCreate, ShopSettingsUpdate]):
-    def get_by_shop_id(self, db: Session, *, shop_id: int) -> Optional[ShopSettings]:
-        return db.query(ShopSettings).filter(ShopSettings.shop_id == shop_id).first()
+    async def get_by_shop_id(self, db: AsyncSession, *, shop_id: int) -> Optional[ShopSettings]:
+        result = await db.execute(select(ShopSettings).where(ShopSettings.shop_id == shop_id))
+        return result.scalars().first()
 
-    def update_features(
-        self, db: Session, *, db_obj: ShopSettings, features: Dict[str, bool]
+    async def update_features(
+        self, db: AsyncSession, *, db_obj: ShopSettings, features: Dict[str, bool]
     ) -> ShopSettings:
         current_features = db_obj.features
         if isinstance(current_features, str):
@@ -53,12 +75,12 @@ class CRUDShopSettings(CRUDBase[ShopSettings, ShopSettingsCreate, ShopSettingsUp
         current_features.update(features)
         db_obj.features = current_features
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    def update_payment_providers(
-        self, db: Session, *, db_obj: ShopSettings, providers: Dict[str, bool]
+    async def update_payment_providers(
+        self, db: AsyncSession, *, db_obj: ShopSettings, providers: Dict[str, bool]
     ) -> ShopSettings:
         current_providers = db_obj.payment_providers
         if isinstance(current_providers, str):
@@ -68,8 +90,8 @@ class CRUDShopSettings(CRUDBase[ShopSettings, ShopSettingsCreate, ShopSettingsUp
         current_providers.update(providers)
         db_obj.payment_providers = current_providers
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
 
@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.telegram import TelegramFile
+
+
+class CRUDTelegramFile:
+    async def get_file_id(self, db: AsyncSession, *, bot_id: str, url: str) -> Optional[str]:
+        result = await db.execute(
+            select(TelegramFile.file_id).where(TelegramFile.bot_id == bot_id, TelegramFile.url == url)
+        )
+        return result.scalar_one_or_none()
+
+    async def save(self, db: AsyncSession, *, bot_id: str, url: str, file_id: str) -> None:
+        insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        stmt = insert(TelegramFile).values(bot_id=bot_id, url=url, file_id=file_id, created_at=datetime.now())
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["bot_id", "url"],
+                set_={"file_id": stmt.excluded.file_id, "created_at": stmt.excluded.created_at},
+            )
+        )
+        await db.commit()
+
+    async def remove_urls(self, db: AsyncSession, *, urls: Iterable[str]) -> None:
+        """Забывает file_id этих URL для всех ботов: по URL загружен другой файл"""
+        await db.execute(delete(TelegramFile).where(TelegramFile.url.in_(list(urls))))
+        await db.commit()
+
+
+telegram_file = CRUDTelegramFile()
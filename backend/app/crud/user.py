@@ -1,19 +1,29 @@
+from datetime import datetime
 from typing import Any, Dict, Optional, Union, List
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.crud.base import CRUDBase
 from app.models.user import User, Role, UserRole
 from app.schemas.user import UserCreate, UserUpdate
 
+# Строк в одном INSERT при записи профилей - с запасом до лимита параметров SQLite
+PROFILE_UPSERT_CHUNK = 500
+
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
-    def get_by_telegram_id(self, db: Session, *, telegram_id: str) -> Optional[User]:
-        return db.query(User).filter(User.telegram_id == telegram_id).first()
+    async def get_by_telegram_id(self, db: AsyncSession, *, telegram_id: str) -> Optional[User]:
+        result = await db.execute(select(User).where(User.telegram_id == telegram_id))
+        return result.scalars().first()
 
-    def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
-        return db.query(User).filter(User.email == email).first()
+    async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
 
-    def create(self, db: Session, *, obj_in: UserCreate) -> User:
+    async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
         db_obj = User(
             telegram_id=obj_in.telegram_id,
             username=obj_in.username,
@@ -24,44 +34,77 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             is_active=True,
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    def get_user_roles(self, db: Session, *, user_id: int, shop_id: Optional[int] = None) -> List[UserRole]:
-        query = db.query(UserRole).filter(UserRole.user_id == user_id)
+    async def upsert_profiles(self, db: AsyncSession, *, profiles: Dict[str, Dict[str, Optional[str]]]) -> None:
+        """
+        Профили Telegram (telegram_id -> username, first_name, last_name) одной
+        транзакцией: INSERT ... ON CONFLICT (telegram_id) DO UPDATE.
+        """
+        insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        now = datetime.now()
+        rows = [
+            {"telegram_id": telegram_id, **fields, "is_active": True, "created_at": now, "updated_at": now}
+            for telegram_id, fields in profiles.items()
+        ]
+        for start in range(0, len(rows), PROFILE_UPSERT_CHUNK):
+            stmt = insert(User).values(rows[start:start + PROFILE_UPSERT_CHUNK])
+            await db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["telegram_id"],
+                    set_={
+                        "username": stmt.excluded.username,
+                        "first_name": stmt.excluded.first_name,
+                        "last_name": stmt.excluded.last_name,
+                        "updated_at": stmt.excluded.updated_at,
+                    },
+                )
+            )
+        await db.commit()
+
+    async def get_user_roles(self, db: AsyncSession, *, user_id: int, shop_id: Optional[int] = None) -> List[UserRole]:
+        query = (
+            select(UserRole)
+            .options(selectinload(UserRole.role))
+            .where(UserRole.user_id == user_id)
+        )
         if shop_id:
-            query = query.filter(UserRole.shop_id == shop_id)
-        return query.all()
+            query = query.where(UserRole.shop_id == shop_id)
+        result = await db.execute(query)
+        return result.scalars().all()
 
-    def add_role_to_user(
-        self, db: Session, *, user_id: int, role_id: int, shop_id: Optional[int] = None
+    async def add_role_to_user(
+        self, db: AsyncSession, *, user_id: int, role_id: int, shop_id: Optional[int] = None
     ) -> UserRole:
         db_obj = UserRole(user_id=user_id, role_id=role_id, shop_id=shop_id)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj, attribute_names=["role"])
         return db_obj
 
-    def remove_role_from_user(
-        self, db: Session, *, user_id: int, role_id: int, shop_id: Optional[int] = None
+    async def remove_role_from_user(
+        self, db: AsyncSession, *, user_id: int, role_id: int, shop_id: Optional[int] = None
     ) -> None:
-        query = db.query(UserRole).filter(
+        query = select(UserRole).where(
             UserRole.user_id == user_id, 
             UserRole.role_id == role_id
         )
         if shop_id:
-            query = query.filter(UserRole.shop_id == shop_id)
+            query = query.where(UserRole.shop_id == shop_id)
         
-        user_role = query.first()
+        result = await db.execute(query)
+        user_role = result.scalars().first()
         if user_role:
-            db.delete(user_role)
-            db.commit()
+            await db.delete(user_role)
+            await db.commit()
 
 
 class CRUDRole(CRUDBase[Role, Any, Any]):
-    def get_by_name(self, db: Session, *, name: str) -> Optional[Role]:
-        return db.query(Role).filter(Role.name == name).first()
+    async def get_by_name(self, db: AsyncSession, *, name: str) -> Optional[Role]:
+        result = await db.execute(select(Role).where(Role.name == name))
+        return result.scalars().first()
 
 
 user = CRUDUser(User)
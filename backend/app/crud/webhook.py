@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import json
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.payment import PaymentProvider, WebhookEvent, WebhookStatus
+
+
+class CRUDWebhookEvent:
+    """
+    Очередь входящих вебхуков в БД. Событие захватывается на время lease: если
+    воркер упал, не успев записать результат, событие снова станет доступно.
+    """
+
+    async def enqueue(
+        self, db: AsyncSession, *, provider: PaymentProvider, event_id: str,
+        payload: bytes, headers: Dict[str, str]
+    ) -> bool:
+        """Сохраняет вебхук; повтор того же события провайдера игнорируется. True - если новый"""
+        insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        result = await db.execute(
+            insert(WebhookEvent)
+            .values(
+                provider=provider,
+                event_id=event_id,
+                payload=payload,
+                headers=json.dumps(headers),
+                status=WebhookStatus.PENDING,
+                attempts=0,
+                next_attempt_at=datetime.now(),
+                created_at=datetime.now(),
+            )
+            .on_conflict_do_nothing(index_elements=["provider", "event_id"])
+        )
+        await db.commit()
+        return result.rowcount > 0
+
+    async def claim(self, db: AsyncSession, *, limit: int, lease: float) -> List[WebhookEvent]:
+        """
+        Захватывает пачку готовых к обработке событий: переносит next_attempt_at
+        на время lease и увеличивает attempts. SKIP LOCKED - параллельные
+        воркеры получают разные события, не дожидаясь друг друга.
+        """
+        now = datetime.now()
+        due = (
+            select(WebhookEvent.id)
+            .where(WebhookEvent.status == WebhookStatus.PENDING, WebhookEvent.next_attempt_at <= now)
+            .order_by(WebhookEvent.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id.in_(due.scalar_subquery()))
+            .values(attempts=WebhookEvent.attempts + 1, next_attempt_at=now + timedelta(seconds=lease))
+            .returning(WebhookEvent)
+            .execution_options(synchronize_session=False)
+        )
+        events = result.scalars().all()
+        await db.commit()
+        return events
+
+    async def mark_done(self, db: AsyncSession, *, event_id: int, error: Optional[str] = None) -> None:
+        """Завершает событие; error - причина, по которой оно пропущено без повторов"""
+        await db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id == event_id)
+            .values(status=WebhookStatus.DONE, processed_at=datetime.now(), last_error=error)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    async def mark_failed(
+        self, db: AsyncSession, *, event_id: int, error: str, retry_in: float, give_up: bool
+    ) -> None:
+        values = {"last_error": error, "next_attempt_at": datetime.now() + timedelta(seconds=retry_in)}
+        if give_up:
+            values = {"last_error": error, "status": WebhookStatus.FAILED, "processed_at": datetime.now()}
+        await db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id == event_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+
+webhook_event = CRUDWebhookEvent()
@@ -4,7 +4,11 @@ from app.models.user import User, Role, UserRole
 from app.models.shop import Shop, ShopSettings
 from app.models.category import Category
 from app.models.product import Product, ProductImage
+from app.models.facet import ProductFacetCount
 from app.models.cart import CartItem
 from app.models.order import Order, OrderItem, OrderStatus
-from app.models.payment import Payment, PaymentStatus, PaymentProvider
+from app.models.reservation import StockReservation, ReservationStatus
+from app.models.payment import Payment, PaymentStatus, PaymentProvider, WebhookEvent, WebhookStatus
 from app.models.review import Review
+from app.models.broadcast import BroadcastJob, BroadcastStatus, BroadcastAudience, BroadcastRecipient, RecipientStatus
+from app.models.telegram import TelegramFile
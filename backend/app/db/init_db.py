@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 
-from app.db.session import Base, engine
+from app.db.session import Base, engine, async_engine, AsyncSessionLocal
 from app.core.config import settings
 from app.db.init_roles import init_roles
 
@@ -18,3 +18,11 @@ def init_db(db: Session) -> None:
     Base.metadata.create_all(bind=engine)
     
     init_roles(db)
+
+
+async def init_db_async() -> None:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(init_roles)
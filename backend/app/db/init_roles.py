@@ -1,6 +1,5 @@
 from sqlalchemy.orm import Session
 
-from backend.app.crud.user import role as role_crud
 from app.models.user import Role
 
 def init_roles(db: Session) -> None:
@@ -11,7 +10,7 @@ def init_roles(db: Session) -> None:
     ]
     
     for role_data in roles:
-        role = role_crud.get_by_name(db=db, name=role_data["name"])
+        role = db.query(Role).filter(Role.name == role_data["name"]).first()
         if not role:
             role = Role(**role_data)
             db.add(role)
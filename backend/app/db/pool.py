@@ -0,0 +1,44 @@
+from typing import Dict
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """QueuePool, который считает время ожидания свободного соединения"""
+
+    def __init__(self, *args, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_count += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool.wait_count, pool.wait_total, pool.wait_max = self.wait_count, self.wait_total, self.wait_max
+        return pool
+
+
+def pool_stats(pool: InstrumentedQueuePool, prefix: str) -> Dict[str, float]:
+    capacity = pool.size() + pool.max_overflow
+    checked_out = pool.checkedout()
+    return {
+        f"{prefix}.size": pool.size(),
+        f"{prefix}.checked_out": checked_out,
+        f"{prefix}.overflow": pool.overflow(),
+        f"{prefix}.utilisation": checked_out / capacity if capacity > 0 else 0.0,
+        f"{prefix}.checkout_wait_count": pool.wait_count,
+        f"{prefix}.checkout_wait_avg_ms": pool.wait_total / pool.wait_count * 1000 if pool.wait_count else 0.0,
+        f"{prefix}.checkout_wait_max_ms": pool.wait_max * 1000,
+    }
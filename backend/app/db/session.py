@@ -1,18 +1,75 @@
+from typing import AsyncGenerator, Dict
+import random
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.pool import InstrumentedQueuePool, pool_stats
+
+
+def _create_async_engine(uri: str) -> AsyncEngine:
+    return create_async_engine(
+        uri,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
+
+async_engine = _create_async_engine(settings.SQLALCHEMY_ASYNC_DATABASE_URI)
+replica_engines = [_create_async_engine(uri) for uri in settings.SQLALCHEMY_READ_REPLICA_URIS]
+
+
+class RoutingSession(Session):
+    """
+    Запросы с execution_options(use_replica=True) уходят на случайную реплику, всё остальное - на primary.
+    После первой записи сессия до конца живёт на primary, чтобы читать свои же изменения.
+    """
+
+    _stick_to_primary = False
 
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self._stick_to_primary = True
+        if (
+            replica_engines
+            and not self._stick_to_primary
+            and clause is not None
+            and clause.get_execution_options().get("use_replica")
+        ):
+            return random.choice(replica_engines).sync_engine
+        return async_engine.sync_engine
+
+
+AsyncSessionLocal = async_sessionmaker(
+    class_=AsyncSession, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False
+)
+
+# Синхронный движок оставлен только для scripts/init_db.py и alembic
 engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+def _collect_pool_stats() -> Dict[str, float]:
+    stats = pool_stats(async_engine.pool, "db.pool.primary")
+    for index, replica in enumerate(replica_engines):
+        stats.update(pool_stats(replica.pool, f"db.pool.replica_{index}"))
+    return stats
+
+
+metrics.register_collector(_collect_pool_stats)
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
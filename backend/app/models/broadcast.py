@@ -0,0 +1,64 @@
+from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, DateTime, Index
+from datetime import datetime
+import enum
+
+from app.db.session import Base
+
+
+class BroadcastStatus(str, enum.Enum):
+    RUNNING = "running"
+    PAUSED = "paused"
+    CANCELLED = "cancelled"
+    COMPLETED = "completed"
+
+
+class BroadcastAudience(str, enum.Enum):
+    """Аудитории рассылки, собираются SQL-запросом (app/crud/broadcast.py, audience_query)"""
+    ALL_CUSTOMERS = "all_customers"
+    RECENT_BUYERS = "recent_buyers"
+    ABANDONED_CARTS = "abandoned_carts"
+
+
+class RecipientStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class BroadcastJob(Base):
+    """Рассылка сообщения покупателям магазина, отправляется в фоне (app/services/broadcast.py)"""
+    __tablename__ = "broadcast_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    shop_id = Column(Integer, ForeignKey("shops.id"), nullable=False, index=True)
+    text = Column(Text, nullable=False)
+    # NULL - получатели переданы списком
+    audience = Column(Enum(BroadcastAudience), nullable=True)
+    status = Column(Enum(BroadcastStatus), nullable=False, default=BroadcastStatus.RUNNING)
+    # Счётчики обновляются вместе со статусами получателей - прогресс без COUNT по миллиону строк
+    total = Column(Integer, nullable=False, default=0)
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+
+    @property
+    def pending(self) -> int:
+        return self.total - self.sent - self.failed
+
+
+class BroadcastRecipient(Base):
+    __tablename__ = "broadcast_recipients"
+    __table_args__ = (
+        # Выборка очереди рассылки: WHERE job_id = ? AND status = 'PENDING' AND next_attempt_at <= now
+        Index("ix_broadcast_recipients_job_id_status_next_attempt_at", "job_id", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("broadcast_jobs.id"), nullable=False)
+    chat_id = Column(String, nullable=False)
+    status = Column(Enum(RecipientStatus), nullable=False, default=RecipientStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    error = Column(Text, nullable=True)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+
+from app.db.session import Base
+
+
+class ProductFacetCount(Base):
+    """Сводка фасетов каталога магазина, обновляется при flush товаров и отзывов (app/crud/facet.py)"""
+    __tablename__ = "product_facet_counts"
+
+    shop_id = Column(Integer, ForeignKey("shops.id"), primary_key=True)
+    facet = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
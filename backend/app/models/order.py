@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -18,6 +18,10 @@ class OrderStatus(str, enum.Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_shop_id_status_created_at", "shop_id", "status", "created_at", "id"),
+        Index("ix_orders_user_id_created_at", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -39,11 +43,15 @@ class Order(Base):
     payment = relationship("Payment", back_populates="order", uselist=False)
 
 
+# CRUDOrder.get_by_shop: WHERE shop_id = ? ORDER BY created_at DESC, id DESC
+Index("ix_orders_shop_id_created_at", Order.shop_id, Order.created_at.desc(), Order.id.desc())
+
+
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer)
     price = Column(Float)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey, DateTime, Text
+from sqlalchemy import Boolean, Column, Integer, String, Float, Enum, ForeignKey, DateTime, Text, LargeBinary, Index, UniqueConstraint, false
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -23,14 +23,45 @@ class Payment(Base):
     __tablename__ = "payments"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
     provider = Column(Enum(PaymentProvider))
-    provider_payment_id = Column(String, nullable=True)
+    provider_payment_id = Column(String, nullable=True, index=True)
     amount = Column(Float)
     currency = Column(String, default="RUB")
     status = Column(Enum(PaymentStatus), default=PaymentStatus.PENDING)
     details = Column(Text, nullable=True)
+    # Оплата пришла после отмены заказа (удержание истекло) - деньги нужно вернуть
+    refund_required = Column(Boolean, nullable=False, default=False, server_default=false())
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
     order = relationship("Order", back_populates="payment")
+
+
+class WebhookStatus(str, enum.Enum):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class WebhookEvent(Base):
+    """Входящий вебхук платёжного провайдера, разбирается воркерами (app/services/webhook_inbox.py)"""
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        UniqueConstraint("provider", "event_id", name="uq_webhook_events_provider_event_id"),
+        # Выборка очереди: WHERE status = 'PENDING' AND next_attempt_at <= now
+        Index("ix_webhook_events_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    provider = Column(Enum(PaymentProvider), nullable=False)
+    event_id = Column(String, nullable=False)
+    # Тело как пришло - подпись проверяется по исходным байтам
+    payload = Column(LargeBinary, nullable=False)
+    headers = Column(Text, nullable=False)
+    status = Column(Enum(WebhookStatus), nullable=False, default=WebhookStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    processed_at = Column(DateTime, nullable=True)
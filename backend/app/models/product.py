@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, DDL, Integer, String, Text, Float, Boolean, ForeignKey, DateTime, Index, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -7,6 +7,9 @@ from app.db.session import Base
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_shop_id_id", "shop_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -17,7 +20,7 @@ class Product(Base):
     stock = Column(Integer, default=0)
     is_available = Column(Boolean, default=True)
     shop_id = Column(Integer, ForeignKey("shops.id"))
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
@@ -31,6 +34,9 @@ class Product(Base):
 
 class ProductImage(Base):
     __tablename__ = "product_images"
+    __table_args__ = (
+        Index("ix_product_images_product_id_order", "product_id", "order"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
@@ -39,3 +45,23 @@ class ProductImage(Base):
     order = Column(Integer, default=0)
     
     product = relationship("Product", back_populates="images")
+
+
+# Полнотекстовый поиск есть только в PostgreSQL: генерируемый tsvector и GIN-индексы
+# живут в БД, а не в модели, иначе create_all на SQLite в тестах не отработает.
+# Конфигурация 'simple' - каталоги магазинов смешивают русский и английский.
+PRODUCT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(sku, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+# Имена объектов поиска - alembic не должен предлагать их удалить
+PRODUCT_SEARCH_OBJECTS = {"search_vector", "ix_products_search_vector", "ix_products_name_trgm"}
+
+for statement in (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({PRODUCT_SEARCH_VECTOR}) STORED",
+    "CREATE INDEX ix_products_search_vector ON products USING gin (search_vector)",
+    "CREATE INDEX ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+):
+    event.listen(Product.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
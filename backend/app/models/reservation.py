@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, Enum, ForeignKey, DateTime, Index
+from datetime import datetime
+import enum
+
+from app.db.session import Base
+
+
+class ReservationStatus(str, enum.Enum):
+    HELD = "held"
+    COMMITTED = "committed"
+    RELEASED = "released"
+
+
+class StockReservation(Base):
+    """Остаток, удержанный под неоплаченный заказ (app/crud/reservation.py)"""
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # Поиск просроченных удержаний: WHERE status = 'HELD' AND expires_at < now
+        Index("ix_stock_reservations_status_expires_at", "status", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    status = Column(Enum(ReservationStatus), nullable=False, default=ReservationStatus.HELD)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
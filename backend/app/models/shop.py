@@ -12,7 +12,7 @@ class Shop(Base):
     name = Column(String, index=True)
     description = Column(Text, nullable=True)
     welcome_message = Column(Text, nullable=True)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
     logo_url = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.now)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from datetime import datetime
+
+from app.db.session import Base
+
+
+class TelegramFile(Base):
+    """file_id, который Telegram выдал при первой отправке файла по URL (app/services/telegram_files.py)"""
+    __tablename__ = "telegram_files"
+    __table_args__ = (
+        # file_id действителен только для бота, который его получил
+        UniqueConstraint("bot_id", "url", name="uq_telegram_files_bot_id_url"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    bot_id = Column(String, nullable=False)
+    url = Column(String, nullable=False, index=True)
+    file_id = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
@@ -0,0 +1,19 @@
+from typing import Optional
+from datetime import datetime
+
+from app.schemas.base import BaseSchema
+from app.models.broadcast import BroadcastAudience, BroadcastStatus
+
+
+class BroadcastJob(BaseSchema):
+    id: int
+    shop_id: int
+    status: BroadcastStatus
+    audience: Optional[BroadcastAudience] = None
+    total: int
+    sent: int
+    failed: int
+    pending: int
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
@@ -14,8 +14,11 @@ class OrderItemBase(BaseSchema):
     price: float
 
 
-class OrderItemCreate(OrderItemBase):
-    pass
+class OrderItemCreate(BaseSchema):
+    product_id: int
+    quantity: int
+    # Игнорируется: цена позиции берётся из товара при оформлении
+    price: Optional[float] = None
 
 
 class OrderItem(OrderItemBase):
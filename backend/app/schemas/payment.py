@@ -30,6 +30,7 @@ class Payment(PaymentBase):
     order_id: int
     provider_payment_id: Optional[str] = None
     status: PaymentStatus
+    refund_required: bool = False
     created_at: datetime
     updated_at: datetime
 
@@ -71,3 +71,9 @@ class ProductWithImages(Product):
 
 class ProductWithCategory(ProductWithImages):
     category: Optional[Category] = None
+
+
+class ProductSuggestion(BaseSchema):
+    text: str
+    type: str
+    id: int
@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import logging
+
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.rate_limit import KeyedThrottle, TokenBucket
+from app.crud.broadcast import broadcast as broadcast_crud
+from app.db.session import AsyncSessionLocal
+from app.models.broadcast import RecipientStatus
+from app.services.telegram_service import TelegramService, telegram_service
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts: int) -> float:
+    """Экспоненциальная задержка перед повторной отправкой: base, 2*base, 4*base, ... до max"""
+    return min(settings.BROADCAST_RETRY_BASE * 2 ** (attempts - 1), settings.BROADCAST_RETRY_MAX)
+
+
+class BroadcastEngine:
+    """
+    Фоновая отправка рассылок. Получатели выбираются из БД пачками, внутри пачки
+    сообщения уходят параллельно (не больше concurrency) через общий HTTP-клиент
+    с ограничением скорости: общий token bucket на бота и не чаще раза в
+    chat_interval на чат. Ответ 429 приостанавливает bucket на retry_after и
+    откладывает получателя, не расходуя его попытки. Пауза и отмена вступают в
+    силу со следующей пачки.
+    """
+
+    def __init__(
+        self, rate: float, chat_interval: float, concurrency: int, batch_size: int, poll_interval: float,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        service: TelegramService = telegram_service,
+    ):
+        self.bucket = TokenBucket(rate)
+        self.chats = KeyedThrottle(chat_interval)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.session_factory = session_factory
+        self.service = service
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _send(self, semaphore: asyncio.Semaphore, text: str, recipient: Row) -> Dict[str, Any]:
+        async with semaphore:
+            await self.chats.acquire(recipient.chat_id)
+            await self.bucket.acquire()
+            result = await self.service.send_message(chat_id=recipient.chat_id, text=text)
+
+        outcome = {
+            "id": recipient.id,
+            "status": RecipientStatus.PENDING,
+            "attempts": recipient.attempts + 1,
+            "next_attempt_at": datetime.now(),
+            "error": None,
+        }
+        if result.get("ok"):
+            outcome["status"] = RecipientStatus.SENT
+            metrics.inc("broadcast.sent")
+            return outcome
+
+        outcome["error"] = result.get("description")
+        error_code = result.get("error_code")
+        retry_after = (result.get("parameters") or {}).get("retry_after")
+        if error_code == 429 and retry_after:
+            self.bucket.pause(retry_after)
+            outcome["attempts"] = recipient.attempts
+            outcome["next_attempt_at"] += timedelta(seconds=retry_after)
+            metrics.inc("broadcast.throttled")
+        elif (error_code is None or error_code >= 500) and outcome["attempts"] < settings.BROADCAST_MAX_ATTEMPTS:
+            # Сетевая ошибка или сбой на стороне Telegram - повторим позже
+            outcome["next_attempt_at"] += timedelta(seconds=retry_delay(outcome["attempts"]))
+            metrics.inc("broadcast.retried")
+        else:
+            # Бот заблокирован, чат не найден и т.п. - повтор не поможет
+            outcome["status"] = RecipientStatus.FAILED
+            metrics.inc("broadcast.failed")
+        return outcome
+
+    async def run_batch(self, job_id: int) -> int:
+        """Отправляет одну пачку рассылки; возвращает число обработанных получателей"""
+        async with self.session_factory() as db:
+            text = await broadcast_crud.get_text(db, job_id=job_id)
+            if text is None:
+                return 0
+            recipients = await broadcast_crud.claim(
+                db, job_id=job_id, limit=self.batch_size, lease=settings.BROADCAST_LEASE
+            )
+            if not recipients:
+                if await broadcast_crud.complete_if_done(db, job_id=job_id):
+                    metrics.inc("broadcast.completed")
+                    logger.info(f"Broadcast {job_id} completed")
+                return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        outcomes = await asyncio.gather(*(self._send(semaphore, text, recipient) for recipient in recipients))
+        async with self.session_factory() as db:
+            await broadcast_crud.record(db, job_id=job_id, outcomes=list(outcomes))
+        return len(recipients)
+
+    async def drain(self) -> int:
+        """Отправляет пачки активных рассылок по очереди, пока есть готовые получатели"""
+        handled = 0
+        while True:
+            async with self.session_factory() as db:
+                job_ids = await broadcast_crud.running_ids(db)
+            batch = 0
+            for job_id in job_ids:
+                batch += await self.run_batch(job_id)
+            handled += batch
+            if not batch:
+                return handled
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.drain()
+            except Exception as e:
+                logger.error(f"Broadcast drain failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+
+
+broadcast_engine = BroadcastEngine(
+    settings.BROADCAST_RATE,
+    settings.BROADCAST_CHAT_INTERVAL,
+    settings.BROADCAST_CONCURRENCY,
+    settings.BROADCAST_BATCH_SIZE,
+    settings.BROADCAST_POLL_INTERVAL,
+)
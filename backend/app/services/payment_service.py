@@ -1,22 +1,36 @@
 from typing import Any, Dict, Optional, List, Tuple
+import asyncio
 import json
 import hmac
 import hashlib
 import uuid
-import httpx
 import logging
+import time
 from datetime import datetime
-from sqlalchemy.orm import Session
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import catalog_cache
 from app.core.config import settings
+from app.core.http import get_http_client
+from app.core.metrics import metrics
+from app.core.redis import get_redis
+from app.services.paypal_signature import verify_locally as verify_paypal_signature
 from app.models.payment import PaymentProvider, PaymentStatus
 from app.models.order import Order, OrderStatus
 from app.schemas.payment import PaymentCreate, PaymentUpdate
 from backend.app.crud.payment import payment as payment_crud
-from backend.app.crud.order import order as order_crud
+from backend.app.crud.order import OrderStatusConflict, order as order_crud
 
 logger = logging.getLogger(__name__)
 
+# Статус заказа, в который его переводит событие оплаты
+ORDER_STATUS_BY_PAYMENT = {
+    PaymentStatus.COMPLETED: OrderStatus.PAID,
+    PaymentStatus.FAILED: OrderStatus.CANCELLED,
+    PaymentStatus.REFUNDED: OrderStatus.REFUNDED,
+}
+
 class StripePaymentService:
     def __init__(self, api_key: str):
         self.api_key = api_key
@@ -46,30 +60,30 @@ class StripePaymentService:
                 payload[f"line_items[{i}][price_data][product_data][name]"] = item.product.name
                 payload[f"line_items[{i}][quantity]"] = item.quantity
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/checkout/sessions",
-                    headers=self.headers,
-                    data=payload
-                )
-                
-                if response.status_code != 200:
-                    logger.error(f"Stripe error: {response.text}")
-                    return {
-                        "id": None,
-                        "url": None,
-                        "status": "error",
-                        "error": response.text
-                    }
-                
-                data = response.json()
+            client = get_http_client("stripe")
+            response = await client.post(
+                f"{self.base_url}/checkout/sessions",
+                headers=self.headers,
+                data=payload
+            )
+            
+            if response.status_code != 200:
+                logger.error(f"Stripe error: {response.text}")
                 return {
-                    "id": data["id"],
-                    "url": data["url"],
-                    "status": data["status"],
-                    "provider_data": data
+                    "id": None,
+                    "url": None,
+                    "status": "error",
+                    "error": response.text
                 }
-        
+            
+            data = response.json()
+            return {
+                "id": data["id"],
+                "url": data["url"],
+                "status": data["status"],
+                "provider_data": data
+            }
+
         except Exception as e:
             logger.error(f"Error creating Stripe payment: {str(e)}")
             return {
@@ -79,21 +93,24 @@ class StripePaymentService:
                 "error": str(e)
             }
     
-    async def verify_webhook(self, payload: bytes, signature: str) -> bool:
-        """Проверяет подпись вебхука от Stripe"""
+    async def verify_webhook(self, payload: bytes, headers: Dict[str, str]) -> bool:
+        """Проверяет подпись вебхука от Stripe (заголовок Stripe-Signature: t=...,v1=...)"""
         try:
             webhook_secret = settings.PAYMENT_PROVIDERS.get("stripe", {}).get("webhook_secret")
             if not webhook_secret:
                 logger.warning("Stripe webhook secret not configured")
                 return False
             
+            signature = dict(
+                part.split("=", 1) for part in headers.get("stripe-signature", "").split(",") if "=" in part
+            )
             expected_sig = hmac.new(
                 webhook_secret.encode(),
-                payload,
+                f"{signature.get('t', '')}.".encode() + payload,
                 hashlib.sha256
             ).hexdigest()
             
-            return hmac.compare_digest(expected_sig, signature)
+            return hmac.compare_digest(expected_sig, signature.get("v1", ""))
         
         except Exception as e:
             logger.error(f"Error verifying Stripe webhook: {str(e)}")
@@ -142,28 +159,28 @@ class StripePaymentService:
             if amount:
                 payload["amount"] = int(amount * 100)
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/refunds",
-                    headers=self.headers,
-                    data=payload
-                )
-                
-                if response.status_code != 200:
-                    logger.error(f"Stripe refund error: {response.text}")
-                    return {
-                        "success": False,
-                        "error": response.text
-                    }
-                
-                data = response.json()
+            client = get_http_client("stripe")
+            response = await client.post(
+                f"{self.base_url}/refunds",
+                headers=self.headers,
+                data=payload
+            )
+            
+            if response.status_code != 200:
+                logger.error(f"Stripe refund error: {response.text}")
                 return {
-                    "success": True,
-                    "refund_id": data["id"],
-                    "status": data["status"],
-                    "provider_data": data
+                    "success": False,
+                    "error": response.text
                 }
-        
+            
+            data = response.json()
+            return {
+                "success": True,
+                "refund_id": data["id"],
+                "status": data["status"],
+                "provider_data": data
+            }
+
         except Exception as e:
             logger.error(f"Error refunding Stripe payment: {str(e)}")
             return {
@@ -172,6 +189,99 @@ class StripePaymentService:
             }
 
 
+class PayPalTokenCache:
+    """
+    OAuth-токены PayPal по учётным данным. Токен живёт expires_in секунд; за
+    PAYPAL_TOKEN_REFRESH_MARGIN до истечения он обновляется в фоне, а запросы
+    продолжают использовать текущий. Обновление одно на ключ (lock), опционально
+    токен делится между воркерами через Redis.
+    """
+
+    def __init__(self):
+        # ключ -> (токен, когда обновлять, когда истекает)
+        self._tokens: Dict[str, Tuple[str, float, float]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._background: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _key(service: "PayPalPaymentService") -> str:
+        digest = hashlib.sha256(f"{service.base_url}:{service.client_id}".encode()).hexdigest()[:16]
+        return f"paypal:token:{digest}"
+
+    @staticmethod
+    def _entry(token: str, expires_in: float) -> Tuple[str, float, float]:
+        now = time.time()
+        # Короткоживущий токен обновляется с середины срока, а не сразу
+        margin = min(settings.PAYPAL_TOKEN_REFRESH_MARGIN, expires_in / 2)
+        return token, now + expires_in - margin, now + expires_in
+
+    async def get(self, service: "PayPalPaymentService") -> Optional[str]:
+        key = self._key(service)
+        cached = self._tokens.get(key)
+        now = time.time()
+        if cached and now < cached[1]:
+            metrics.inc("paypal.token.hit")
+            return cached[0]
+        if cached and now < cached[2]:
+            # Токен ещё действует - обновляем заранее, не задерживая запрос
+            if key not in self._background:
+                task = asyncio.create_task(self._refresh(key, service))
+                self._background[key] = task
+                task.add_done_callback(lambda _: self._background.pop(key, None))
+            metrics.inc("paypal.token.hit")
+            return cached[0]
+        return await self._refresh(key, service)
+
+    def clear(self) -> None:
+        self._tokens.clear()
+
+    async def _refresh(self, key: str, service: "PayPalPaymentService") -> Optional[str]:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Пока ждали блокировку, токен мог обновить другой запрос
+            cached = self._tokens.get(key)
+            if cached and time.time() < cached[1]:
+                return cached[0]
+
+            shared = await self._get_shared(key)
+            if shared:
+                self._tokens[key] = shared
+                return shared[0]
+
+            metrics.inc("paypal.token.fetch")
+            token, expires_in = await service._fetch_access_token()
+            if token is None:
+                # Не удалось обновить - старый токен годится до своего истечения
+                return cached[0] if cached and time.time() < cached[2] else None
+            self._tokens[key] = entry = self._entry(token, expires_in)
+            await self._set_shared(key, entry)
+            return token
+
+    async def _get_shared(self, key: str) -> Optional[Tuple[str, float, float]]:
+        if not settings.PAYPAL_TOKEN_SHARED:
+            return None
+        try:
+            data = await get_redis().get(key)
+        except RedisError as e:
+            logger.error(f"PayPal token cache read failed: {str(e)}")
+            return None
+        if data is None:
+            return None
+        entry = tuple(json.loads(data))
+        return entry if time.time() < entry[1] else None
+
+    async def _set_shared(self, key: str, entry: Tuple[str, float, float]) -> None:
+        if not settings.PAYPAL_TOKEN_SHARED:
+            return
+        try:
+            await get_redis().set(key, json.dumps(entry), ex=max(1, int(entry[2] - time.time())))
+        except RedisError as e:
+            logger.error(f"PayPal token cache write failed: {str(e)}")
+
+
+paypal_token_cache = PayPalTokenCache()
+
+
 class PayPalPaymentService:
     def __init__(self, client_id: str, client_secret: str, sandbox: bool = True):
         self.client_id = client_id
@@ -180,25 +290,29 @@ class PayPalPaymentService:
         self.sandbox = sandbox
     
     async def _get_access_token(self) -> Optional[str]:
-        """Получает access token от PayPal"""
+        """Access token PayPal из кэша, новый запрашивается только при истечении"""
+        return await paypal_token_cache.get(self)
+    
+    async def _fetch_access_token(self) -> Tuple[Optional[str], float]:
+        """Получает access token от PayPal: (токен, срок жизни в секундах)"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/v1/oauth2/token",
-                    auth=(self.client_id, self.client_secret),
-                    data={"grant_type": "client_credentials"}
-                )
-                
-                if response.status_code != 200:
-                    logger.error(f"PayPal auth error: {response.text}")
-                    return None
-                
-                data = response.json()
-                return data.get("access_token")
-        
+            client = get_http_client("paypal")
+            response = await client.post(
+                f"{self.base_url}/v1/oauth2/token",
+                auth=(self.client_id, self.client_secret),
+                data={"grant_type": "client_credentials"}
+            )
+            
+            if response.status_code != 200:
+                logger.error(f"PayPal auth error: {response.text}")
+                return None, 0
+            
+            data = response.json()
+            return data.get("access_token"), float(data.get("expires_in", 0))
+
         except Exception as e:
             logger.error(f"Error getting PayPal access token: {str(e)}")
-            return None
+            return None, 0
     
     async def create_payment(self, order: Order, return_url: str) -> Dict[str, Any]:
         """Создает платеж в PayPal"""
@@ -258,37 +372,37 @@ class PayPalPaymentService:
                     "value": str(order.shipping_cost)
                 }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/v2/checkout/orders",
-                    headers=headers,
-                    json=payload
-                )
-                
-                if response.status_code not in (200, 201):
-                    logger.error(f"PayPal error: {response.text}")
-                    return {
-                        "id": None,
-                        "url": None,
-                        "status": "error",
-                        "error": response.text
-                    }
-                
-                data = response.json()
-                
-                approval_url = next(
-                    (link["href"] for link in data.get("links", []) 
-                     if link["rel"] == "approve"),
-                    None
-                )
-                
+            client = get_http_client("paypal")
+            response = await client.post(
+                f"{self.base_url}/v2/checkout/orders",
+                headers=headers,
+                json=payload
+            )
+            
+            if response.status_code not in (200, 201):
+                logger.error(f"PayPal error: {response.text}")
                 return {
-                    "id": data["id"],
-                    "url": approval_url,
-                    "status": data["status"],
-                    "provider_data": data
+                    "id": None,
+                    "url": None,
+                    "status": "error",
+                    "error": response.text
                 }
-        
+            
+            data = response.json()
+            
+            approval_url = next(
+                (link["href"] for link in data.get("links", []) 
+                 if link["rel"] == "approve"),
+                None
+            )
+            
+            return {
+                "id": data["id"],
+                "url": approval_url,
+                "status": data["status"],
+                "provider_data": data
+            }
+
         except Exception as e:
             logger.error(f"Error creating PayPal payment: {str(e)}")
             return {
@@ -299,13 +413,20 @@ class PayPalPaymentService:
             }
     
     async def verify_webhook(self, payload: bytes, headers: Dict[str, str]) -> bool:
-        """Проверяет подпись вебхука от PayPal"""
+        """Проверяет подпись вебхука от PayPal: локально по сертификату, запрос к PayPal - запасной путь"""
+        webhook_id = settings.PAYMENT_PROVIDERS.get("paypal", {}).get("webhook_id")
+        if not webhook_id:
+            logger.warning("PayPal webhook ID not configured")
+            return False
+        
+        verified = await verify_paypal_signature(headers, webhook_id, payload)
+        if verified is not None:
+            return verified
+        metrics.inc("paypal.signature.remote")
+        return await self._verify_webhook_remotely(payload, headers, webhook_id)
+    
+    async def _verify_webhook_remotely(self, payload: bytes, headers: Dict[str, str], webhook_id: str) -> bool:
         try:
-            webhook_id = settings.PAYMENT_PROVIDERS.get("paypal", {}).get("webhook_id")
-            if not webhook_id:
-                logger.warning("PayPal webhook ID not configured")
-                return False
-            
             access_token = await self._get_access_token()
             if not access_token:
                 return False
@@ -320,20 +441,20 @@ class PayPalPaymentService:
                 "webhook_event": json.loads(payload)
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/v1/notifications/verify-webhook-signature",
-                    headers={"Authorization": f"Bearer {access_token}"},
-                    json=verify_data
-                )
-                
-                if response.status_code != 200:
-                    logger.error(f"PayPal webhook verification error: {response.text}")
-                    return False
-                
-                data = response.json()
-                return data.get("verification_status") == "SUCCESS"
-        
+            client = get_http_client("paypal")
+            response = await client.post(
+                f"{self.base_url}/v1/notifications/verify-webhook-signature",
+                headers={"Authorization": f"Bearer {access_token}"},
+                json=verify_data
+            )
+            
+            if response.status_code != 200:
+                logger.error(f"PayPal webhook verification error: {response.text}")
+                return False
+            
+            data = response.json()
+            return data.get("verification_status") == "SUCCESS"
+
         except Exception as e:
             logger.error(f"Error verifying PayPal webhook: {str(e)}")
             return False
@@ -390,28 +511,28 @@ class PayPalPaymentService:
                     "currency_code": "USD"
                 }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/v2/payments/captures/{payment_id}/refund",
-                    headers=headers,
-                    json=payload
-                )
-                
-                if response.status_code not in (200, 201):
-                    logger.error(f"PayPal refund error: {response.text}")
-                    return {
-                        "success": False,
-                        "error": response.text
-                    }
-                
-                data = response.json()
+            client = get_http_client("paypal")
+            response = await client.post(
+                f"{self.base_url}/v2/payments/captures/{payment_id}/refund",
+                headers=headers,
+                json=payload
+            )
+            
+            if response.status_code not in (200, 201):
+                logger.error(f"PayPal refund error: {response.text}")
                 return {
-                    "success": True,
-                    "refund_id": data["id"],
-                    "status": data["status"],
-                    "provider_data": data
+                    "success": False,
+                    "error": response.text
                 }
-        
+            
+            data = response.json()
+            return {
+                "success": True,
+                "refund_id": data["id"],
+                "status": data["status"],
+                "provider_data": data
+            }
+
         except Exception as e:
             logger.error(f"Error refunding PayPal payment: {str(e)}")
             return {
@@ -456,33 +577,33 @@ class YooKassaPaymentService:
                 }
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/payments",
-                    headers=headers,
-                    json=payload,
-                    auth=auth
-                )
-                
-                if response.status_code not in (200, 201):
-                    logger.error(f"YooKassa error: {response.text}")
-                    return {
-                        "id": None,
-                        "url": None,
-                        "status": "error",
-                        "error": response.text
-                    }
-                
-                data = response.json()
-                confirmation_url = data.get("confirmation", {}).get("confirmation_url")
-                
+            client = get_http_client("yookassa")
+            response = await client.post(
+                f"{self.base_url}/payments",
+                headers=headers,
+                json=payload,
+                auth=auth
+            )
+            
+            if response.status_code not in (200, 201):
+                logger.error(f"YooKassa error: {response.text}")
                 return {
-                    "id": data["id"],
-                    "url": confirmation_url,
-                    "status": data["status"],
-                    "provider_data": data
+                    "id": None,
+                    "url": None,
+                    "status": "error",
+                    "error": response.text
                 }
-        
+            
+            data = response.json()
+            confirmation_url = data.get("confirmation", {}).get("confirmation_url")
+            
+            return {
+                "id": data["id"],
+                "url": confirmation_url,
+                "status": data["status"],
+                "provider_data": data
+            }
+
         except Exception as e:
             logger.error(f"Error creating YooKassa payment: {str(e)}")
             return {
@@ -542,29 +663,29 @@ class YooKassaPaymentService:
                     "currency": "RUB"
                 }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/refunds",
-                    headers=headers,
-                    json=payload,
-                    auth=auth
-                )
-                
-                if response.status_code not in (200, 201):
-                    logger.error(f"YooKassa refund error: {response.text}")
-                    return {
-                        "success": False,
-                        "error": response.text
-                    }
-                
-                data = response.json()
+            client = get_http_client("yookassa")
+            response = await client.post(
+                f"{self.base_url}/refunds",
+                headers=headers,
+                json=payload,
+                auth=auth
+            )
+            
+            if response.status_code not in (200, 201):
+                logger.error(f"YooKassa refund error: {response.text}")
                 return {
-                    "success": True,
-                    "refund_id": data["id"],
-                    "status": data["status"],
-                    "provider_data": data
+                    "success": False,
+                    "error": response.text
                 }
-        
+            
+            data = response.json()
+            return {
+                "success": True,
+                "refund_id": data["id"],
+                "status": data["status"],
+                "provider_data": data
+            }
+
         except Exception as e:
             logger.error(f"Error refunding YooKassa payment: {str(e)}")
             return {
@@ -572,6 +693,16 @@ class YooKassaPaymentService:
                 "error": str(e)
             }
 
+def webhook_event_id(provider: PaymentProvider, payload: Dict[str, Any], raw_payload: bytes) -> str:
+    """Идентификатор события провайдера для дедупликации повторных доставок вебхука"""
+    if provider in (PaymentProvider.STRIPE, PaymentProvider.PAYPAL) and payload.get("id"):
+        return str(payload["id"])
+    if provider == PaymentProvider.YOOKASSA and payload.get("object", {}).get("id"):
+        # У ЮKassa нет id уведомления: событие однозначно задаётся типом и платежом
+        return f"{payload.get('event')}:{payload['object']['id']}"
+    return hashlib.sha256(raw_payload).hexdigest()
+
+
 def get_payment_service(provider: PaymentProvider) -> Any:
     """Возвращает экземпляр сервиса для указанного провайдера"""
     if provider == PaymentProvider.STRIPE:
@@ -595,7 +726,7 @@ def get_payment_service(provider: PaymentProvider) -> Any:
 async def create_payment(
     order: Order,
     provider: PaymentProvider,
-    db: Session
+    db: AsyncSession
 ) -> Dict[str, Any]:
     shop_settings = order.shop.settings
     payment_providers = shop_settings.payment_providers
@@ -640,7 +771,7 @@ async def create_payment(
         details=json.dumps(result.get("provider_data", {}))
     )
     
-    payment = payment_crud.create(db=db, obj_in=payment_in)
+    payment = await payment_crud.create(db=db, obj_in=payment_in)
     
     return {
         "success": True,
@@ -657,73 +788,80 @@ async def process_payment_callback(
     payload: Dict[str, Any],
     headers: Dict[str, str],
     raw_payload: bytes,
-    db: Session
+    db: AsyncSession
 ) -> bool:
+    """
+    Применяет событие провайдера к платежу и заказу. Подпись уже проверена при
+    приёме вебхука (payment_webhook). True - событие обработано, False - оно
+    неприменимо окончательно (неизвестный тип события или заказ) и повтор ничего
+    не изменит. Временные ошибки (БД и т.п.) поднимаются исключением -
+    вызывающий повторит обработку позже.
+    """
     service = get_payment_service(provider)
     if not service:
         logger.error(f"Payment provider {provider.value} is not configured")
         return False
     
-    is_valid = await service.verify_webhook(raw_payload, headers)
-    if not is_valid:
-        logger.error(f"Invalid webhook signature for {provider.value}")
-        return False
-    
     success, status, order_id = await service.process_webhook(payload)
-    if not success or not status or not order_id:
+    if not success or not status or not str(order_id or "").isdigit():
         logger.error(f"Failed to process webhook for {provider.value}")
         return False
     
-    try:
-        order = order_crud.get(db=db, id=int(order_id))
-        if not order:
-            logger.error(f"Order {order_id} not found")
-            return False
-        
-        payment = payment_crud.get_by_order(db=db, order_id=order.id)
-        if not payment:
-            logger.error(f"Payment for order {order_id} not found")
-            return False
-        
-        payment = payment_crud.update_status(
-            db=db, 
-            payment_id=payment.id, 
-            status=status,
-            details=json.dumps(payload)
-        )
-        
-        if status == PaymentStatus.COMPLETED:
-            order_crud.update_status(
-                db=db, 
-                order_id=order.id, 
-                status=OrderStatus.PAID
-            )
-        elif status == PaymentStatus.FAILED:
-            order_crud.update_status(
-                db=db, 
-                order_id=order.id, 
-                status=OrderStatus.PENDING
-            )
-        elif status == PaymentStatus.REFUNDED:
-            order_crud.update_status(
-                db=db, 
-                order_id=order.id, 
-                status=OrderStatus.REFUNDED
-            )
-        
-        return True
+    order = await order_crud.get(db=db, id=int(order_id))
+    if not order:
+        logger.error(f"Order {order_id} not found")
+        return False
     
-    except Exception as e:
-        logger.error(f"Error processing payment callback: {str(e)}")
+    payment = await payment_crud.get_by_order(db=db, order_id=order.id)
+    if not payment:
+        logger.error(f"Payment for order {order_id} not found")
         return False
+    
+    # После отката в update_status объекты сессии истекают - значения берутся заранее
+    payment_id, paid_before = payment.id, payment.status == PaymentStatus.COMPLETED
+    order_status = ORDER_STATUS_BY_PAYMENT.get(status)
+    if order_status:
+        try:
+            order = await order_crud.update_status(db=db, order_id=order.id, status=order_status)
+        except OrderStatusConflict as e:
+            if status == PaymentStatus.COMPLETED and not paid_before:
+                # Деньги списаны, а заказ оплатить нельзя (отменён, удержание истекло):
+                # платёж сохраняется с пометкой - оплату нужно вернуть
+                logger.error(f"Payment completed for order {order_id} that cannot be paid ({str(e)}), flagged for refund")
+                metrics.inc("payments.refund_required")
+                await payment_crud.update_status(
+                    db=db,
+                    payment_id=payment_id,
+                    status=status,
+                    details=json.dumps(payload),
+                    refund_required=True
+                )
+                return True
+            # Например, FAILED после COMPLETED: оплаченный заказ не отменяется.
+            # Возврат денег записывается в платёж в любом случае
+            logger.warning(f"Order not updated by {status.value} payment event: {str(e)}")
+            if status != PaymentStatus.REFUNDED:
+                return True
+        else:
+            if order_status == OrderStatus.CANCELLED:
+                await catalog_cache.invalidate_stock(order.shop_id, {item.product_id for item in order.items})
+    
+    await payment_crud.update_status(
+        db=db, 
+        payment_id=payment_id, 
+        status=status,
+        details=json.dumps(payload)
+    )
+    
+    return True
 
 
 async def refund_payment(
     payment_id: int,
-    amount: Optional[float] = None,
-    db: Session
+    db: AsyncSession,
+    amount: Optional[float] = None
 ) -> Dict[str, Any]:
-    payment = payment_crud.get(db=db, id=payment_id)
+    payment = await payment_crud.get(db=db, id=payment_id)
     if not payment:
         return {
             "success": False,
@@ -750,20 +888,22 @@ async def refund_payment(
             "success": False,
             "message": f"Failed to refund payment: {result.get('error')}"
         }
-    payment = payment_crud.update_status(
+    payment = await payment_crud.update_status(
         db=db, 
         payment_id=payment.id, 
         status=PaymentStatus.REFUNDED,
         details=json.dumps(result.get("provider_data", {}))
     )
     
-    order = order_crud.get(db=db, id=payment.order_id)
-    if order:
-        order_crud.update_status(
+    try:
+        await order_crud.update_status(
             db=db, 
-            order_id=order.id, 
+            order_id=payment.order_id, 
             status=OrderStatus.REFUNDED
         )
+    except OrderStatusConflict as e:
+        # Например, возврат оплаты, пришедшей после отмены заказа
+        logger.warning(f"Order not refunded: {str(e)}")
     
     return {
         "success": True,
@@ -774,9 +914,9 @@ async def refund_payment(
 
 async def get_payment_status(
     payment_id: int,
-    db: Session
+    db: AsyncSession
 ) -> Dict[str, Any]:
-    payment = payment_crud.get(db=db, id=payment_id)
+    payment = await payment_crud.get(db=db, id=payment_id)
     if not payment:
         return {
             "success": False,
@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlparse
+import asyncio
+import base64
+import logging
+import zlib
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.http import get_http_client
+from app.core.metrics import metrics
+
+try:
+    from cryptography import x509
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+except ImportError:
+    # Без cryptography вебхуки проверяются только запросом к PayPal
+    x509 = None
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_ALGORITHM = "SHA256withRSA"
+
+
+def is_trusted_cert_url(url: str) -> bool:
+    """Сертификат берётся только с доменов PayPal по HTTPS - иначе подпись подделает кто угодно"""
+    parsed = urlparse(url)
+    host = parsed.hostname or ""
+    return (
+        parsed.scheme == "https"
+        and (host == "paypal.com" or host.endswith(".paypal.com"))
+        and parsed.path.startswith("/v1/notifications/certs/")
+    )
+
+
+def signed_message(headers: Mapping[str, str], webhook_id: str, payload: bytes) -> bytes:
+    """Подписываемая строка: transmission_id|transmission_time|webhook_id|crc32(тело)"""
+    crc = zlib.crc32(payload) & 0xFFFFFFFF
+    return (
+        f"{headers.get('PAYPAL-TRANSMISSION-ID')}|{headers.get('PAYPAL-TRANSMISSION-TIME')}"
+        f"|{webhook_id}|{crc}"
+    ).encode()
+
+
+class PayPalCertCache:
+    """Публичные ключи сертификатов PayPal по URL; срок - TTL, но не дольше срока сертификата"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self._certs: TTLCache[str, Any] = TTLCache(max_size, ttl)
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get(self, url: str) -> Optional[Any]:
+        cert = self._valid(self._certs.get(url))
+        if cert is not None:
+            metrics.inc("paypal.cert.hit")
+            return cert
+        async with self._locks.setdefault(url, asyncio.Lock()):
+            cert = self._valid(self._certs.get(url))
+            if cert is not None:
+                return cert
+            metrics.inc("paypal.cert.fetch")
+            try:
+                response = await get_http_client("paypal").get(url)
+                response.raise_for_status()
+                cert = x509.load_pem_x509_certificate(response.content)
+            except Exception as e:
+                logger.error(f"Failed to load PayPal certificate {url}: {str(e)}")
+                return None
+            if self._valid(cert) is None:
+                logger.error(f"PayPal certificate {url} is expired or not yet valid")
+                return None
+            self._certs.set(url, cert)
+            return cert
+
+    @staticmethod
+    def _valid(cert: Optional[Any]) -> Optional[Any]:
+        if cert is None:
+            return None
+        now = datetime.now(timezone.utc)
+        if not cert.not_valid_before_utc <= now <= cert.not_valid_after_utc:
+            return None
+        return cert
+
+    def clear(self) -> None:
+        self._certs.clear()
+
+
+paypal_cert_cache = PayPalCertCache(settings.PAYPAL_CERT_CACHE_SIZE, settings.PAYPAL_CERT_CACHE_TTL)
+
+
+async def verify_locally(headers: Mapping[str, str], webhook_id: str, payload: bytes) -> Optional[bool]:
+    """
+    Проверка подписи вебхука по сертификату без запроса к PayPal. None - проверить
+    локально нельзя (нет cryptography, другой алгоритм, сертификат недоступен),
+    решает запасной запрос verify-webhook-signature.
+    """
+    cert_url = headers.get("PAYPAL-CERT-URL") or ""
+    if x509 is None or headers.get("PAYPAL-AUTH-ALGO") != SUPPORTED_ALGORITHM or not is_trusted_cert_url(cert_url):
+        return None
+    cert = await paypal_cert_cache.get(cert_url)
+    if cert is None:
+        return None
+    try:
+        signature = base64.b64decode(headers.get("PAYPAL-TRANSMISSION-SIG") or "", validate=True)
+        cert.public_key().verify(
+            signature, signed_message(headers, webhook_id, payload), padding.PKCS1v15(), hashes.SHA256()
+        )
+    except (InvalidSignature, ValueError):
+        metrics.inc("paypal.signature.invalid")
+        return False
+    return True
@@ -0,0 +1,66 @@
+from collections import defaultdict
+from typing import Dict, Optional, Set
+import asyncio
+import logging
+
+from app.core.cache import catalog_cache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud.reservation import stock_reservation as stock_reservation_crud
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationSweeper:
+    """
+    Фоновая задача воркера: периодически снимает просроченные удержания остатков
+    пачками, пока очередь не опустеет. Может работать в нескольких воркерах
+    одновременно - пачки не пересекаются благодаря SKIP LOCKED.
+    """
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep(self) -> int:
+        released = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                count, restocked = await stock_reservation_crud.release_expired(db, limit=self.batch_size)
+            released += count
+            products: Dict[int, Set[int]] = defaultdict(set)
+            for shop_id, product_id in restocked:
+                products[shop_id].add(product_id)
+            for shop_id, product_ids in products.items():
+                await catalog_cache.invalidate_stock(shop_id, product_ids)
+            if count < self.batch_size:
+                break
+        if released:
+            metrics.inc("reservations.released", released)
+        return released
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Reservation sweep failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+reservation_sweeper = ReservationSweeper(settings.RESERVATION_SWEEP_INTERVAL, settings.RESERVATION_SWEEP_BATCH)
@@ -0,0 +1,80 @@
+from typing import Any, Dict, Optional, Tuple, Union
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud.telegram_file import telegram_file as telegram_file_crud
+
+logger = logging.getLogger(__name__)
+
+
+def bot_id(service: Any) -> str:
+    """Идентификатор бота - часть токена до ":"; file_id одного бота другому не подходит"""
+    return service.bot_token.split(":", 1)[0]
+
+
+def sent_file_id(result: Dict[str, Any]) -> Optional[str]:
+    # Telegram возвращает несколько размеров фото, последний - оригинал
+    photos = (result.get("result") or {}).get("photo") or []
+    return photos[-1].get("file_id") if photos else None
+
+
+class TelegramFileCache:
+    """
+    file_id картинок, уже отправленных ботом по URL: повторная отправка по
+    file_id не заставляет Telegram заново скачивать файл с нашего сервера.
+    Хранятся в БД по (бот, URL), в процессе - TTL-кэш поверх неё. Загрузка
+    нового файла по URL удаляет записи (invalidate); в других процессах
+    старый file_id живёт не дольше TTL.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._file_ids: TTLCache[Tuple[str, str], str] = TTLCache(max_size, ttl)
+
+    async def get_file_id(self, db: AsyncSession, bot: str, url: str) -> Optional[str]:
+        file_id = self._file_ids.get((bot, url))
+        if file_id is None:
+            file_id = await telegram_file_crud.get_file_id(db, bot_id=bot, url=url)
+            if file_id is not None:
+                self._file_ids.set((bot, url), file_id)
+        return file_id
+
+    async def send_photo(
+        self, db: AsyncSession, service: Any, chat_id: Union[str, int], url: str, **kwargs: Any
+    ) -> Dict[str, Any]:
+        """send_photo по сохранённому file_id, а если его нет или Telegram его не принял - по URL"""
+        bot = bot_id(service)
+        file_id = await self.get_file_id(db, bot, url)
+        if file_id is not None:
+            result = await service.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+            if result.get("error_code") != 400:
+                metrics.inc("telegram.files.hit")
+                return result
+            # file_id больше не действителен - отправим по URL и запомним новый
+            self._file_ids.pop((bot, url))
+        metrics.inc("telegram.files.miss")
+
+        result = await service.send_photo(chat_id=chat_id, photo=url, **kwargs)
+        file_id = sent_file_id(result) if result.get("ok") else None
+        if file_id is not None:
+            try:
+                await telegram_file_crud.save(db, bot_id=bot, url=url, file_id=file_id)
+                self._file_ids.set((bot, url), file_id)
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Failed to save Telegram file_id for {url}: {str(e)}")
+        return result
+
+    async def invalidate(self, db: AsyncSession, *urls: Optional[str]) -> None:
+        """По этим URL теперь другие файлы: file_id всех ботов больше не использовать"""
+        urls = tuple(url for url in urls if url)
+        if not urls:
+            return
+        self._file_ids.pop_where(lambda key: key[1] in urls)
+        await telegram_file_crud.remove_urls(db, urls=urls)
+
+
+telegram_file_cache = TelegramFileCache(settings.TELEGRAM_FILE_CACHE_SIZE, settings.TELEGRAM_FILE_CACHE_TTL)
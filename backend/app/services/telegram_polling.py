@@ -0,0 +1,87 @@
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis import get_redis
+from app.services.telegram_service import TelegramService, telegram_service
+from app.services.telegram_updates import TelegramUpdateQueue, UpdateQueueFull
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramPoller:
+    """
+    Получение апдейтов через getUpdates (long polling) вместо вебхука - для
+    стендов без публичного адреса. Апдейты идут в тот же process_telegram_update
+    через TelegramUpdateQueue. offset сохраняется в Redis только после обработки
+    пачки: после перезапуска необработанные апдейты будут запрошены снова.
+    """
+
+    def __init__(
+        self, queue: TelegramUpdateQueue, service: TelegramService = telegram_service,
+        timeout: int = settings.TELEGRAM_POLLING_TIMEOUT, limit: int = settings.TELEGRAM_POLLING_LIMIT,
+        offset_key: str = "telegram:polling:offset",
+    ):
+        self.queue = queue
+        self.service = service
+        self.timeout = timeout
+        self.limit = limit
+        self.offset_key = offset_key
+        self.offset: Optional[int] = None
+
+    async def load_offset(self) -> Optional[int]:
+        value = await get_redis().get(self.offset_key)
+        self.offset = int(value) if value is not None else None
+        return self.offset
+
+    async def _save_offset(self) -> None:
+        await get_redis().set(self.offset_key, self.offset)
+
+    async def _enqueue(self, update: Dict[str, Any]) -> None:
+        while True:
+            try:
+                await self.queue.enqueue(update)
+                return
+            except UpdateQueueFull:
+                # Очередь чата заполнена - ждём, пока обработчики её разберут
+                await self.queue.join()
+
+    async def poll_once(self) -> int:
+        """Одна итерация: getUpdates, обработка пачки, сохранение offset. Возвращает число апдейтов"""
+        result = await self.service.get_updates(offset=self.offset, timeout=self.timeout, limit=self.limit)
+        if not result.get("ok"):
+            metrics.inc("telegram.polling.errors")
+            retry_after = (result.get("parameters") or {}).get("retry_after")
+            logger.error(f"getUpdates failed: {result.get('description')}")
+            await asyncio.sleep(retry_after or settings.TELEGRAM_POLLING_RETRY)
+            return 0
+
+        updates: List[Dict[str, Any]] = result.get("result") or []
+        if not updates:
+            return 0
+        for update in updates:
+            await self._enqueue(update)
+        await self.queue.join()
+        # Следующий запрос с этим offset подтверждает Telegram обработку пачки
+        self.offset = max(update["update_id"] for update in updates) + 1
+        await self._save_offset()
+        metrics.inc("telegram.polling.updates", len(updates))
+        return len(updates)
+
+    async def run(self) -> None:
+        if self.offset is None:
+            await self.load_offset()
+        self.queue.start()
+        try:
+            while True:
+                try:
+                    await self.poll_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Telegram polling failed: {str(e)}")
+                    await asyncio.sleep(settings.TELEGRAM_POLLING_RETRY)
+        finally:
+            await self.queue.stop()
@@ -1,13 +1,18 @@
-from typing import Any, Dict, List, Optional, Union
-import httpx
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
 import json
 import logging
-from sqlalchemy.orm import Session
+import time
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from backend.app.crud.user import user as user_crud
+from app.core.http import get_http_client
+from app.core.metrics import metrics
 from backend.app.crud.shop import shop as shop_crud
-from app.schemas.user import UserCreate
+from app.services.telegram_files import telegram_file_cache
+from app.services.telegram_users import telegram_user_sync
 
 logger = logging.getLogger(__name__)
 
@@ -37,14 +42,14 @@ class TelegramService:
             payload["reply_markup"] = json.dumps(reply_markup)
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload)
-                result = response.json()
-                
-                if not result.get("ok"):
-                    logger.error(f"Failed to send message: {result.get('description')}")
-                
-                return result
+            client = get_http_client("telegram")
+            response = await client.post(url, json=payload)
+            result = response.json()
+            
+            if not result.get("ok"):
+                logger.error(f"Failed to send message: {result.get('description')}")
+            
+            return result
         except Exception as e:
             logger.error(f"Error sending message: {e}")
             return {"ok": False, "description": str(e)}
@@ -72,14 +77,14 @@ class TelegramService:
             payload["reply_markup"] = json.dumps(reply_markup)
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload)
-                result = response.json()
-                
-                if not result.get("ok"):
-                    logger.error(f"Failed to send photo: {result.get('description')}")
-                
-                return result
+            client = get_http_client("telegram")
+            response = await client.post(url, json=payload)
+            result = response.json()
+            
+            if not result.get("ok"):
+                logger.error(f"Failed to send photo: {result.get('description')}")
+            
+            return result
         except Exception as e:
             logger.error(f"Error sending photo: {e}")
             return {"ok": False, "description": str(e)}
@@ -88,14 +93,14 @@ class TelegramService:
         webhook_url = f"{self.api_url}/setWebhook"
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(webhook_url, params={"url": url})
-                result = response.json()
-                
-                if not result.get("ok"):
-                    logger.error(f"Failed to set webhook: {result.get('description')}")
-                
-                return result
+            client = get_http_client("telegram")
+            response = await client.post(webhook_url, params={"url": url})
+            result = response.json()
+            
+            if not result.get("ok"):
+                logger.error(f"Failed to set webhook: {result.get('description')}")
+            
+            return result
         except Exception as e:
             logger.error(f"Error setting webhook: {e}")
             return {"ok": False, "description": str(e)}
@@ -104,20 +109,50 @@ class TelegramService:
         url = f"{self.api_url}/deleteWebhook"
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                return response.json()
+            client = get_http_client("telegram")
+            response = await client.get(url)
+            return response.json()
         except Exception as e:
             logger.error(f"Error deleting webhook: {e}")
             return {"ok": False, "description": str(e)}
     
+    async def get_updates(
+        self,
+        offset: Optional[int] = None,
+        timeout: int = 0,
+        limit: int = 100,
+        allowed_updates: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        url = f"{self.api_url}/getUpdates"
+        
+        payload: Dict[str, Any] = {"timeout": timeout, "limit": limit}
+        if offset is not None:
+            payload["offset"] = offset
+        if allowed_updates is not None:
+            payload["allowed_updates"] = allowed_updates
+        
+        try:
+            client = get_http_client("telegram")
+            # Long polling: Telegram держит запрос до timeout секунд, пока нет апдейтов
+            response = await client.post(
+                url,
+                json=payload,
+                timeout=httpx.Timeout(
+                    settings.HTTP_CLIENT_READ_TIMEOUT + timeout, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT
+                )
+            )
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error getting updates: {e}")
+            return {"ok": False, "description": str(e)}
+    
     async def get_webhook_info(self) -> Dict[str, Any]:
         url = f"{self.api_url}/getWebhookInfo"
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                return response.json()
+            client = get_http_client("telegram")
+            response = await client.get(url)
+            return response.json()
         except Exception as e:
             logger.error(f"Error getting webhook info: {e}")
             return {"ok": False, "description": str(e)}
@@ -135,83 +170,200 @@ class TelegramService:
         return {"keyboard": buttons, "resize_keyboard": True}
 
 
+@dataclass
+class BotContext:
+    """Апдейт, разобранный роутером; его получают middleware и хендлеры"""
+    update: Dict[str, Any]
+    db: AsyncSession
+    # Тип апдейта (message, callback_query, ...) и его объект
+    kind: str
+    payload: Dict[str, Any]
+    chat_id: Optional[int] = None
+    from_user: Optional[Dict[str, Any]] = None
+    # Найденный маршрут (command.start, callback.shop, ...) и остаток текста после него
+    route: Optional[str] = None
+    args: str = ""
+    user: Any = None
+
+
+Handler = Callable[[BotContext], Awaitable[None]]
+Middleware = Callable[[BotContext, Handler], Awaitable[None]]
+
+
+class BotRouter:
+    """
+    Таблица маршрутов бота: команда, префикс callback_data до первого "_" и
+    префикс deep-link payload в /start ищутся в словаре, без перебора условий.
+    Middleware оборачивают найденный хендлер в порядке регистрации; апдейт без
+    маршрута до них не доходит и не обращается к БД.
+    """
+
+    def __init__(self):
+        self._commands: Dict[str, Handler] = {}
+        self._callbacks: Dict[str, Handler] = {}
+        self._deep_links: Dict[str, Handler] = {}
+        self._updates: Dict[str, Handler] = {}
+        self._middleware: List[Middleware] = []
+
+    @staticmethod
+    def _register(table: Dict[str, Handler], key: str) -> Callable[[Handler], Handler]:
+        def decorator(handler: Handler) -> Handler:
+            table[key] = handler
+            return handler
+        return decorator
+
+    def command(self, name: str) -> Callable[[Handler], Handler]:
+        return self._register(self._commands, name)
+
+    def callback(self, prefix: str) -> Callable[[Handler], Handler]:
+        return self._register(self._callbacks, prefix)
+
+    def deep_link(self, prefix: str) -> Callable[[Handler], Handler]:
+        """/start <prefix>_<args> - ссылка вида t.me/bot?start=<prefix>_<args>"""
+        return self._register(self._deep_links, prefix)
+
+    def update(self, kind: str) -> Callable[[Handler], Handler]:
+        """Апдейты без команд и кнопок: my_chat_member и т.п."""
+        return self._register(self._updates, kind)
+
+    def middleware(self, middleware: Middleware) -> Middleware:
+        self._middleware.append(middleware)
+        return middleware
+
+    def _match(self, table: Dict[str, Handler], route: str, key: str, ctx: BotContext) -> Optional[Handler]:
+        handler = table.get(key)
+        if handler is not None:
+            ctx.route = f"{route}.{key}"
+        return handler
+
+    def resolve(self, ctx: BotContext) -> Optional[Handler]:
+        if ctx.kind == "message":
+            text = ctx.payload.get("text") or ""
+            if not text.startswith("/") or not ctx.from_user or not ctx.chat_id:
+                return None
+            command, _, args = text[1:].partition(" ")
+            ctx.args = args.strip()
+            # В группах команда приходит как /start@bot_username
+            command = command.split("@", 1)[0]
+            if command == "start" and ctx.args:
+                prefix, _, args = ctx.args.partition("_")
+                handler = self._match(self._deep_links, "deep_link", prefix, ctx)
+                if handler is not None:
+                    ctx.args = args
+                    return handler
+            return self._match(self._commands, "command", command, ctx)
+        if ctx.kind == "callback_query":
+            if not ctx.payload.get("id") or not ctx.from_user or not ctx.chat_id:
+                return None
+            prefix, _, ctx.args = (ctx.payload.get("data") or "").partition("_")
+            return self._match(self._callbacks, "callback", prefix, ctx)
+        handler = self._updates.get(ctx.kind)
+        if handler is not None:
+            ctx.route = ctx.kind
+        return handler
+
+    async def dispatch(self, update: Dict[str, Any], db: AsyncSession) -> bool:
+        """Передаёт апдейт хендлеру через middleware; False - подходящего маршрута нет"""
+        kind = next((key for key in update if key != "update_id"), None)
+        payload = update.get(kind) if kind else None
+        if not isinstance(payload, dict):
+            return False
+        chat = payload.get("chat") or (payload.get("message") or {}).get("chat") or {}
+        ctx = BotContext(
+            update=update, db=db, kind=kind, payload=payload,
+            chat_id=chat.get("id"), from_user=payload.get("from"),
+        )
+        handler = self.resolve(ctx)
+        if handler is None:
+            metrics.inc("telegram.bot.unhandled")
+            return False
+        for middleware in reversed(self._middleware):
+            handler = partial(middleware, call_next=handler)
+        await handler(ctx)
+        return True
+
+
 telegram_service = TelegramService(settings.TELEGRAM_BOT_TOKEN)
+bot_router = BotRouter()
+
+
+async def process_telegram_update(update: Dict[str, Any], db: AsyncSession) -> None:
+    await bot_router.dispatch(update, db)
+
+
+async def process_message(message: Dict[str, Any], db: AsyncSession) -> None:
+    await bot_router.dispatch({"message": message}, db)
+
 
+async def process_callback_query(callback_query: Dict[str, Any], db: AsyncSession) -> None:
+    await bot_router.dispatch({"callback_query": callback_query}, db)
 
-async def process_telegram_update(update: Dict[str, Any], db: Session) -> None:
+
+@bot_router.middleware
+async def capture_errors(ctx: BotContext, call_next: Handler) -> None:
     try:
-        if "message" in update:
-            await process_message(update["message"], db)
-        elif "callback_query" in update:
-            await process_callback_query(update["callback_query"], db)
-        elif "my_chat_member" in update:
-            await process_chat_member_update(update["my_chat_member"], db)
+        await call_next(ctx)
     except Exception as e:
-        logger.error(f"Error processing Telegram update: {e}")
+        metrics.inc("telegram.bot.errors")
+        logger.error(f"Error processing Telegram update ({ctx.route}): {e}")
 
 
-async def process_message(message: Dict[str, Any], db: Session) -> None:
-    from_user = message.get("from")
-    if not from_user:
-        return
-    
-    chat_id = message.get("chat", {}).get("id")
-    if not chat_id:
-        return
+@bot_router.middleware
+async def measure_time(ctx: BotContext, call_next: Handler) -> None:
+    started = time.perf_counter()
+    try:
+        await call_next(ctx)
+    finally:
+        metrics.inc(f"telegram.bot.{ctx.route}.calls")
+        metrics.inc(f"telegram.bot.{ctx.route}.seconds", time.perf_counter() - started)
 
-    telegram_id = str(from_user.get("id"))
-    user = user_crud.get_by_telegram_id(db=db, telegram_id=telegram_id)
-    
-    if not user:
-        user_in = UserCreate(
-            telegram_id=telegram_id,
-            username=from_user.get("username"),
-            first_name=from_user.get("first_name"),
-            last_name=from_user.get("last_name")
-        )
-        user = user_crud.create(db=db, obj_in=user_in)
-    
-    text = message.get("text", "")
-    
-    if text.startswith("/start"):
-        params = text.split(" ", 1)
-        shop_id = None
-        
-        if len(params) > 1:
-            try:
-                shop_id = int(params[1])
-            except ValueError:
-                pass
-        
-        await handle_start_command(chat_id, user, shop_id, db)
-    elif text.startswith("/help"):
-        await handle_help_command(chat_id)
-    elif text.startswith("/settings"):
-        await handle_settings_command(chat_id, user)
-
-
-async def process_callback_query(callback_query: Dict[str, Any], db: Session) -> None:
-    query_id = callback_query.get("id")
-    from_user = callback_query.get("from")
-    message = callback_query.get("message")
-    data = callback_query.get("data")
-    
-    if not query_id or not from_user or not message or not data:
-        return
-    
-    chat_id = message.get("chat", {}).get("id")
-    telegram_id = str(from_user.get("id"))
-    
-    user = user_crud.get_by_telegram_id(db=db, telegram_id=telegram_id)
-    if not user:
-        return
-    
-    if data.startswith("shop_"):
-        shop_id = int(data.split("_")[1])
-        await handle_shop_selection(chat_id, user, shop_id, db)
+
+@bot_router.middleware
+async def upsert_user(ctx: BotContext, call_next: Handler) -> None:
+    """Пользователь, от которого пришло сообщение или нажатие кнопки; при первом обращении создаётся"""
+    if ctx.kind in ("message", "callback_query"):
+        ctx.user = await telegram_user_sync.upsert(ctx.db, ctx.from_user)
+    await call_next(ctx)
+
+
+def parse_id(value: str) -> Optional[int]:
+    return int(value) if value.isdigit() else None
+
+
+@bot_router.command("start")
+async def start_command(ctx: BotContext) -> None:
+    # Старые ссылки вида t.me/bot?start=<shop_id>
+    await handle_start_command(ctx.chat_id, ctx.user, parse_id(ctx.args), ctx.db)
+
+
+@bot_router.deep_link("shop")
+async def shop_deep_link(ctx: BotContext) -> None:
+    await handle_start_command(ctx.chat_id, ctx.user, parse_id(ctx.args), ctx.db)
+
+
+@bot_router.command("help")
+async def help_command(ctx: BotContext) -> None:
+    await handle_help_command(ctx.chat_id)
+
+
+@bot_router.command("settings")
+async def settings_command(ctx: BotContext) -> None:
+    await handle_settings_command(ctx.chat_id, ctx.user)
+
+
+@bot_router.callback("shop")
+async def shop_callback(ctx: BotContext) -> None:
+    shop_id = parse_id(ctx.args)
+    if shop_id is not None:
+        await handle_shop_selection(ctx.chat_id, ctx.user, shop_id, ctx.db)
+
+
+@bot_router.update("my_chat_member")
+async def chat_member_update(ctx: BotContext) -> None:
+    await process_chat_member_update(ctx.payload, ctx.db)
 
 
-async def process_chat_member_update(chat_member: Dict[str, Any], db: Session) -> None:
+async def process_chat_member_update(chat_member: Dict[str, Any], db: AsyncSession) -> None:
     chat = chat_member.get("chat")
     new_chat_member = chat_member.get("new_chat_member")
     
@@ -232,11 +384,11 @@ async def process_chat_member_update(chat_member: Dict[str, Any], db: Session) -
         )
 
 
-async def handle_start_command(chat_id: int, user: Any, shop_id: Optional[int], db: Session) -> None:
+async def handle_start_command(chat_id: int, user: Any, shop_id: Optional[int], db: AsyncSession) -> None:
     if shop_id:
-        shop = shop_crud.get(db=db, id=shop_id)
+        shop = await shop_crud.get(db=db, id=shop_id, use_replica=True)
         if shop:
-            await show_shop(chat_id, user, shop)
+            await show_shop(chat_id, user, shop, db)
         else:
             await telegram_service.send_message(
                 chat_id=chat_id,
@@ -299,8 +451,8 @@ async def handle_settings_command(chat_id: int, user: Any) -> None:
     )
 
 
-async def show_shop_list(chat_id: int, db: Session) -> None:
-    shops = shop_crud.get_multi(db=db, skip=0, limit=10)
+async def show_shop_list(chat_id: int, db: AsyncSession) -> None:
+    shops = await shop_crud.get_multi(db=db, skip=0, limit=10)
     
     if not shops:
         await telegram_service.send_message(
@@ -327,8 +479,8 @@ async def show_shop_list(chat_id: int, db: Session) -> None:
     )
 
 
-async def handle_shop_selection(chat_id: int, user: Any, shop_id: int, db: Session) -> None:
-    shop = shop_crud.get(db=db, id=shop_id)
+async def handle_shop_selection(chat_id: int, user: Any, shop_id: int, db: AsyncSession) -> None:
+    shop = await shop_crud.get(db=db, id=shop_id, use_replica=True)
     if not shop:
         await telegram_service.send_message(
             chat_id=chat_id,
@@ -337,10 +489,10 @@ async def handle_shop_selection(chat_id: int, user: Any, shop_id: int, db: Sessi
         await show_shop_list(chat_id, db)
         return
     
-    await show_shop(chat_id, user, shop)
+    await show_shop(chat_id, user, shop, db)
 
 
-async def show_shop(chat_id: int, user: Any, shop: Any) -> None:
+async def show_shop(chat_id: int, user: Any, shop: Any, db: AsyncSession) -> None:
     welcome_message = shop.welcome_message or f"Добро пожаловать в {shop.name}!"
     
     shop_info = (
@@ -367,9 +519,11 @@ async def show_shop(chat_id: int, user: Any, shop: Any) -> None:
     keyboard = telegram_service.create_inline_keyboard(shop_buttons)
     
     if shop.logo_url:
-        await telegram_service.send_photo(
+        await telegram_file_cache.send_photo(
+            db,
+            telegram_service,
             chat_id=chat_id,
-            photo=shop.logo_url,
+            url=shop.logo_url,
             caption=shop_info,
             reply_markup=keyboard
         )
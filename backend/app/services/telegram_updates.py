@@ -0,0 +1,148 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis import get_redis
+from app.db.session import AsyncSessionLocal
+from app.services.telegram_service import process_telegram_update
+
+logger = logging.getLogger(__name__)
+
+
+def update_chat_id(update: Dict[str, Any]) -> Optional[int]:
+    """Чат, к которому относится апдейт, - по нему апдейты одного чата попадают в один обработчик"""
+    for key in ("message", "edited_message", "channel_post", "my_chat_member", "chat_member"):
+        chat = (update.get(key) or {}).get("chat")
+        if chat:
+            return chat.get("id")
+    callback_query = update.get("callback_query")
+    if callback_query:
+        chat = (callback_query.get("message") or {}).get("chat") or callback_query.get("from") or {}
+        return chat.get("id")
+    return None
+
+
+class UpdateQueueFull(Exception):
+    pass
+
+
+class TelegramUpdateQueue:
+    """
+    Очередь апдейтов Telegram: вебхук только кладёт апдейт и сразу отвечает,
+    обрабатывают его consumers задач, каждая в своей сессии БД. У каждой задачи
+    своя ограниченная очередь, чат закреплён за задачей по chat_id - апдейты
+    одного чата обрабатываются по порядку. Повторы одного update_id (Telegram
+    переотправляет неподтверждённые апдейты) отбрасываются в пределах окна.
+    """
+
+    def __init__(
+        self, consumers: int, max_size: int, dedup_window: int, dedup_ttl: float,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.consumers = consumers
+        self.max_size = max_size
+        self.dedup_ttl = dedup_ttl
+        self.session_factory = session_factory
+        self._seen: TTLCache[int, bool] = TTLCache(dedup_window, dedup_ttl)
+        # Очереди создаются сразу: апдейты, принятые до start(), дождутся обработчиков
+        self._queues: List["asyncio.Queue[Tuple[float, Dict[str, Any]]]"] = [
+            asyncio.Queue(maxsize=max(1, max_size // consumers)) for _ in range(consumers)
+        ]
+        self._tasks: List[asyncio.Task] = []
+
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def join(self) -> None:
+        """Ждёт, пока все принятые апдейты будут обработаны"""
+        await asyncio.gather(*(queue.join() for queue in self._queues))
+
+    async def _is_duplicate(self, update_id: int) -> bool:
+        if self._seen.get(update_id):
+            return True
+        self._seen.set(update_id, True)
+        if not settings.TELEGRAM_UPDATE_DEDUP_SHARED:
+            return False
+        # Несколько процессов: апдейт мог прийти в соседний воркер
+        try:
+            return not await get_redis().set(
+                f"telegram:update:{update_id}", 1, nx=True, ex=max(1, int(self.dedup_ttl))
+            )
+        except Exception as e:
+            logger.warning(f"Telegram update dedup via Redis failed: {str(e)}")
+            return False
+
+    async def _forget(self, update_id: int) -> None:
+        self._seen.pop(update_id)
+        if settings.TELEGRAM_UPDATE_DEDUP_SHARED:
+            try:
+                await get_redis().delete(f"telegram:update:{update_id}")
+            except Exception as e:
+                logger.warning(f"Telegram update dedup via Redis failed: {str(e)}")
+
+    async def enqueue(self, update: Dict[str, Any]) -> bool:
+        """
+        Ставит апдейт в очередь; False - повтор уже принятого апдейта. UpdateQueueFull -
+        очередь заполнена, апдейт не запомнен и будет принят при переотправке.
+        """
+        metrics.inc("telegram.updates.received")
+        update_id = update.get("update_id")
+        if update_id is not None and await self._is_duplicate(update_id):
+            metrics.inc("telegram.updates.duplicate")
+            return False
+
+        chat_id = update_chat_id(update)
+        key = chat_id if chat_id is not None else update_id or 0
+        try:
+            self._queues[hash(key) % self.consumers].put_nowait((time.monotonic(), update))
+        except asyncio.QueueFull:
+            if update_id is not None:
+                await self._forget(update_id)
+            metrics.inc("telegram.updates.rejected")
+            raise UpdateQueueFull()
+        return True
+
+    async def _consume(self, queue: "asyncio.Queue[Tuple[float, Dict[str, Any]]]") -> None:
+        while True:
+            enqueued_at, update = await queue.get()
+            metrics.set_gauge("telegram.updates.lag", time.monotonic() - enqueued_at)
+            try:
+                async with self.session_factory() as db:
+                    await process_telegram_update(update=update, db=db)
+                metrics.inc("telegram.updates.processed")
+            except Exception as e:
+                metrics.inc("telegram.updates.failed")
+                logger.error(f"Error processing Telegram update {update.get('update_id')}: {str(e)}")
+            finally:
+                queue.task_done()
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._consume(queue)) for queue in self._queues]
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Дорабатывает принятые апдейты (не дольше timeout) и останавливает обработчики"""
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.depth()} Telegram updates left unprocessed on shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+telegram_update_queue = TelegramUpdateQueue(
+    settings.TELEGRAM_UPDATE_CONSUMERS,
+    settings.TELEGRAM_UPDATE_QUEUE_SIZE,
+    settings.TELEGRAM_UPDATE_DEDUP_WINDOW,
+    settings.TELEGRAM_UPDATE_DEDUP_TTL,
+)
+metrics.register_collector(lambda: {"telegram.updates.depth": telegram_update_queue.depth()})
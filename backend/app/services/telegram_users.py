@@ -0,0 +1,101 @@
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.auth_cache import auth_cache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud.user import user as user_crud
+from app.db.session import AsyncSessionLocal
+from app.models.user import User
+from app.schemas.user import UserCreate
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FIELDS = ("username", "first_name", "last_name")
+
+
+class TelegramUserSync:
+    """
+    Пользователь бота без запроса в БД на каждое сообщение: снимок берётся из
+    auth_cache (тот же, что при аутентификации, и инвалидируется так же), в БД
+    идём только при промахе, новый пользователь создаётся сразу. Изменения
+    профиля Telegram копятся в памяти и раз в interval секунд пишутся одним
+    INSERT ... ON CONFLICT DO UPDATE; при нескольких изменениях побеждает последнее.
+    """
+
+    def __init__(self, interval: float, session_factory: Callable[[], AsyncSession] = AsyncSessionLocal):
+        self.interval = interval
+        self.session_factory = session_factory
+        self._pending: Dict[str, Dict[str, Optional[str]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def upsert(self, db: AsyncSession, from_user: Dict[str, Any]) -> User:
+        telegram_id = str(from_user.get("id"))
+        profile = {field: from_user.get(field) for field in PROFILE_FIELDS}
+
+        user = await auth_cache.get_user(db, telegram_id)
+        if user is None:
+            user = await user_crud.get_by_telegram_id(db=db, telegram_id=telegram_id)
+            if user is None:
+                user = await user_crud.create(db=db, obj_in=UserCreate(telegram_id=telegram_id, **profile))
+                metrics.inc("telegram.users.created")
+            auth_cache.set_user(user)
+
+        if any(getattr(user, field) != value for field, value in profile.items()):
+            # Без пометки объекта изменённым: commit в хендлере не должен писать профиль сам
+            for field, value in profile.items():
+                set_committed_value(user, field, value)
+            self._pending[telegram_id] = profile
+            auth_cache.set_user(user)
+        return user
+
+    async def flush(self) -> int:
+        """Записывает накопленные изменения профилей; возвращает их число"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            async with self.session_factory() as db:
+                await user_crud.upsert_profiles(db, profiles=pending)
+        except Exception:
+            # Запишем со следующей пачкой; пришедшие за это время изменения новее
+            self._pending = {**pending, **self._pending}
+            raise
+        metrics.inc("telegram.users.profile_updates", len(pending))
+        return len(pending)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Telegram profile flush failed: {str(e)}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Telegram profile flush failed: {str(e)}")
+
+
+telegram_user_sync = TelegramUserSync(settings.TELEGRAM_USER_FLUSH_INTERVAL)
+metrics.register_collector(lambda: {"telegram.users.pending": telegram_user_sync.pending()})
@@ -0,0 +1,116 @@
+from typing import Callable, List, Optional
+import asyncio
+import json
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import Headers
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud.webhook import webhook_event as webhook_event_crud
+from app.db.session import AsyncSessionLocal
+from app.models.payment import WebhookEvent
+from app.services.payment_service import process_payment_callback
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts: int) -> float:
+    """Экспоненциальная задержка перед следующей попыткой: base, 2*base, 4*base, ... до max"""
+    return min(settings.WEBHOOK_RETRY_BASE * 2 ** (attempts - 1), settings.WEBHOOK_RETRY_MAX)
+
+
+class WebhookInbox:
+    """
+    Пул воркеров, разбирающих очередь вебхуков. Эндпоинт только сохраняет событие
+    и будит воркеры через notify(), обработка идёт вне запроса, в своей сессии БД.
+    Неприменимое событие (неизвестный тип или заказ) сразу
+    завершается без повторов. Временная ошибка откладывает событие с
+    экспоненциальной задержкой, после WEBHOOK_MAX_ATTEMPTS оно помечается FAILED.
+    """
+
+    def __init__(
+        self, workers: int, batch_size: int, poll_interval: float,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.session_factory = session_factory
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def process(self, event: WebhookEvent) -> bool:
+        try:
+            async with self.session_factory() as db:
+                applied = await process_payment_callback(
+                    provider=event.provider,
+                    payload=json.loads(event.payload),
+                    headers=Headers(headers=json.loads(event.headers)),
+                    raw_payload=event.payload,
+                    db=db,
+                )
+        except Exception as e:
+            error = str(e)
+        else:
+            # False - событие неприменимо окончательно, повтор ничего не изменит
+            async with self.session_factory() as db:
+                await webhook_event_crud.mark_done(
+                    db, event_id=event.id, error=None if applied else "Callback was not applicable"
+                )
+            metrics.inc("webhooks.processed" if applied else "webhooks.ignored")
+            return True
+
+        async with self.session_factory() as db:
+            give_up = event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS
+            await webhook_event_crud.mark_failed(
+                db, event_id=event.id, error=error, retry_in=retry_delay(event.attempts), give_up=give_up
+            )
+        metrics.inc("webhooks.failed" if give_up else "webhooks.retried")
+        if give_up:
+            logger.error(f"Webhook {event.provider.value}/{event.event_id} failed after {event.attempts} attempts: {error}")
+        return False
+
+    async def drain(self) -> int:
+        """Обрабатывает готовые события, пока они есть; возвращает их количество"""
+        handled = 0
+        while True:
+            async with self.session_factory() as db:
+                events = await webhook_event_crud.claim(db, limit=self.batch_size, lease=settings.WEBHOOK_LEASE)
+            for event in events:
+                await self.process(event)
+            handled += len(events)
+            if len(events) < self.batch_size:
+                return handled
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.drain()
+            except Exception as e:
+                logger.error(f"Webhook inbox drain failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._wakeup = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+
+webhook_inbox = WebhookInbox(settings.WEBHOOK_WORKERS, settings.WEBHOOK_BATCH_SIZE, settings.WEBHOOK_POLL_INTERVAL)
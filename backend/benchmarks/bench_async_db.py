@@ -0,0 +1,138 @@
+"""
+Бенчмарк пропускной способности /payments/create/{order_id} и /telegram/webhook.
+
+Приложение поднимается in-process через httpx.ASGITransport, вызовы Stripe и
+Telegram Bot API подменяются задержкой --upstream-latency. Каждый запрос к БД
+получает дополнительную задержку --db-latency: с флагом --blocking-db она
+выполняется через time.sleep прямо в event loop (так вёл себя синхронный Session
+внутри async-обработчиков), без флага - через asyncio.sleep, как с AsyncSession.
+
+    python benchmarks/bench_async_db.py --requests 2000 --concurrency 100
+    python benchmarks/bench_async_db.py --requests 2000 --concurrency 100 --blocking-db
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import create_access_token
+from app.db.session import Base, async_engine, AsyncSessionLocal
+from app.models.order import Order, OrderStatus
+from app.models.shop import Shop, ShopSettings
+from app.models.user import User
+from app.services.payment_service import StripePaymentService
+from app.services.telegram_service import telegram_service
+from main import app
+
+
+async def seed() -> dict:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        user = User(telegram_id="100", first_name="Bench", is_active=True)
+        db.add(user)
+        await db.commit()
+        shop = Shop(name="Bench Shop", owner_id=user.id)
+        db.add(shop)
+        await db.commit()
+        db.add(ShopSettings(shop_id=shop.id, payment_providers='{"stripe": true}'))
+        order = Order(
+            user_id=user.id,
+            shop_id=shop.id,
+            order_number="ORD-BENCH",
+            status=OrderStatus.PENDING,
+            total_amount=10.0,
+        )
+        db.add(order)
+        await db.commit()
+        return {"order_id": order.id, "telegram_id": user.telegram_id}
+
+
+async def run_load(client: httpx.AsyncClient, make_request, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    ids = await seed()
+    headers = {"Authorization": f"Bearer {create_access_token(ids['telegram_id'])}"}
+
+    original_execute = AsyncSession.execute
+
+    async def execute_with_latency(self, *a, **kw):
+        if args.blocking_db:
+            time.sleep(args.db_latency)
+        else:
+            await asyncio.sleep(args.db_latency)
+        return await original_execute(self, *a, **kw)
+
+    async def fake_upstream(*a, **kw):
+        await asyncio.sleep(args.upstream_latency)
+        return {"id": "cs_bench", "url": "https://example.com", "status": "open", "ok": True}
+
+    async def create_payment(client, i):
+        return await client.post(
+            f"/api/v1/payments/create/{ids['order_id']}?provider=stripe", headers=headers
+        )
+
+    async def webhook(client, i):
+        update = {
+            "update_id": i,
+            "message": {
+                "from": {"id": ids["telegram_id"], "first_name": "Bench"},
+                "chat": {"id": ids["telegram_id"]},
+                "text": "/help",
+            },
+        }
+        return await client.post("/api/v1/telegram/webhook", json=update)
+
+    transport = httpx.ASGITransport(app=app)
+    with patch.object(AsyncSession, "execute", execute_with_latency), \
+            patch.object(StripePaymentService, "create_payment", fake_upstream), \
+            patch.object(telegram_service, "send_message", fake_upstream):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, make_request in (("payments/create", create_payment), ("telegram/webhook", webhook)):
+                result = await run_load(client, make_request, args.requests, args.concurrency)
+                print(
+                    f"{name:<18} {result['rps']:>9.1f} req/s  "
+                    f"p50 {result['p50_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк async-слоя БД")
+    parser.add_argument("--requests", type=int, default=1000, help="Количество запросов на эндпоинт")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных запросов")
+    parser.add_argument("--db-latency", type=float, default=0.002, help="Задержка запроса к БД, сек")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="Задержка внешнего API, сек")
+    parser.add_argument("--blocking-db", action="store_true", help="Эмулировать синхронный драйвер БД")
+
+    asyncio.run(main(parser.parse_args()))
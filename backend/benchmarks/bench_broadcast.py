@@ -0,0 +1,98 @@
+"""
+Бенчмарк рассылки: постановка в очередь и отправка через BroadcastEngine
+против мок-сервиса Telegram с задержкой ответа.
+
+Сравнивается старый путь (последовательный send_message в обработчике запроса)
+и движок рассылок: темп отправки держится на --rate, пиковая память
+(tracemalloc) не зависит от числа получателей - в памяти только пачка.
+Таблицы пересоздаются.
+
+    python benchmarks/bench_broadcast.py --recipients 100000 --rate 1000 --latency 0.05
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.crud.broadcast import broadcast as broadcast_crud
+from app.db.base import Base
+from app.db.session import async_engine, AsyncSessionLocal
+from app.models.shop import Shop
+from app.models.user import User
+from app.services.broadcast import BroadcastEngine
+
+
+class MockTelegram:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent = 0
+
+    async def send_message(self, chat_id, text):
+        await asyncio.sleep(self.latency)
+        self.sent += 1
+        return {"ok": True, "result": {"message_id": self.sent}}
+
+
+async def seed() -> int:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        owner = User(telegram_id="1", first_name="Owner", is_active=True)
+        db.add(owner)
+        await db.commit()
+        shop = Shop(name="Bench Shop", owner_id=owner.id)
+        db.add(shop)
+        await db.commit()
+        return shop.id
+
+
+async def main(args: argparse.Namespace) -> None:
+    shop_id = await seed()
+    service = MockTelegram(args.latency)
+
+    sample = min(args.recipients, 200)
+    started = time.perf_counter()
+    for chat_id in range(sample):
+        await service.send_message(chat_id=chat_id, text="Sale!")
+    sequential = sample / (time.perf_counter() - started)
+    print(f"{'sequential':<12} {sequential:.0f} сообщений/с, на {args.recipients} получателей "
+          f"{args.recipients / sequential:.0f} s в одном запросе")
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        job = await broadcast_crud.create(
+            db, shop_id=shop_id, text="Sale!", chat_ids=(str(i) for i in range(args.recipients))
+        )
+    print(f"{'enqueue':<12} {args.recipients} получателей за {time.perf_counter() - started:.2f} s")
+
+    engine = BroadcastEngine(args.rate, 1.0, args.concurrency, args.batch_size, 1, service=service)
+    service.sent = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    await engine.drain()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    async with AsyncSessionLocal() as db:
+        job = await broadcast_crud.get(db, shop_id=shop_id, job_id=job.id)
+    print(
+        f"{'engine':<12} {service.sent / elapsed:.0f} сообщений/с (лимит {args.rate:.0f}), {elapsed:.2f} s, "
+        f"статус {job.status.value}, отправлено {job.sent}, пик памяти {peak / 2**20:.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк рассылок в Telegram")
+    parser.add_argument("--recipients", type=int, default=100_000, help="Получателей")
+    parser.add_argument("--rate", type=float, default=1000, help="Сообщений в секунду")
+    parser.add_argument("--concurrency", type=int, default=50, help="Параллельных отправок")
+    parser.add_argument("--batch-size", type=int, default=500, help="Получателей в пачке")
+    parser.add_argument("--latency", type=float, default=0.05, help="Задержка ответа Telegram, с")
+
+    asyncio.run(main(parser.parse_args()))
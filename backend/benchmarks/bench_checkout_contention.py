@@ -0,0 +1,109 @@
+"""
+Бенчмарк оформления заказов на "горячих" товарах: много покупателей одновременно
+раскупают несколько товаров с ограниченным остатком.
+
+Каждый заказ берёт случайный набор горячих товаров в случайном порядке - без
+упорядоченных блокировок такие транзакции взаимно блокировались бы. Проверяется,
+что продано ровно столько, сколько было на складе, и нет ответов 5xx. Таблицы
+пересоздаются. SQLite не допускает параллельных пишущих транзакций - на нём
+запускать с --concurrency 1.
+
+    python benchmarks/bench_checkout_contention.py --buyers 200 --products 5 --stock 500
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import func, select
+
+from app.core.security import create_access_token
+from app.db.session import Base, async_engine, AsyncSessionLocal
+from app.models.order import OrderItem
+from app.models.product import Product
+from app.models.shop import Shop
+from app.models.user import User
+from main import app
+
+
+async def seed(buyers: int, products: int, stock: int):
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        users = [User(telegram_id=str(1000 + i), first_name=f"Buyer {i}", is_active=True) for i in range(buyers)]
+        db.add_all(users)
+        await db.commit()
+        shop = Shop(name="Bench Shop", owner_id=users[0].id)
+        db.add(shop)
+        await db.commit()
+        hot = [Product(name=f"Hot {i}", price=10.0, stock=stock, shop_id=shop.id) for i in range(products)]
+        db.add_all(hot)
+        await db.commit()
+        return shop.id, [(user.id, user.telegram_id) for user in users], [p.id for p in hot]
+
+
+async def main(args: argparse.Namespace) -> None:
+    shop_id, buyers, product_ids = await seed(args.buyers, args.products, args.stock)
+    statuses: Counter = Counter()
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def buyer(client: httpx.AsyncClient, user_id: int, telegram_id: str, seed: int) -> None:
+        rnd = random.Random(seed)
+        headers = {"Authorization": f"Bearer {create_access_token(subject=telegram_id)}"}
+        for _ in range(args.orders):
+            picked = rnd.sample(product_ids, rnd.randint(1, len(product_ids)))
+            payload = {
+                "user_id": user_id,
+                "shop_id": shop_id,
+                "payment_method": "card",
+                "items": [{"product_id": id, "quantity": rnd.randint(1, 3)} for id in picked],
+            }
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/api/v1/orders/", json=payload, headers=headers)
+                latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            buyer(client, user_id, telegram_id, i) for i, (user_id, telegram_id) in enumerate(buyers)
+        ))
+        elapsed = time.perf_counter() - started
+
+    async with AsyncSessionLocal() as db:
+        left = (await db.execute(select(func.sum(Product.stock)))).scalar()
+        sold = (await db.execute(select(func.sum(OrderItem.quantity)))).scalar() or 0
+
+    latencies.sort()
+    print(f"checkouts          {len(latencies)} за {elapsed:.1f} s, {len(latencies) / elapsed:.0f} запросов/с")
+    print(f"statuses           {dict(sorted(statuses.items()))}")
+    print(
+        f"latency            p50 {statistics.median(latencies) * 1000:.2f} ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms"
+    )
+    total = args.products * args.stock
+    print(f"stock              продано {sold} из {total}, осталось {left}, {'OK' if sold + left == total and left >= 0 else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк оформления заказов на горячих товарах")
+    parser.add_argument("--buyers", type=int, default=200, help="Покупателей")
+    parser.add_argument("--orders", type=int, default=5, help="Попыток заказа на покупателя")
+    parser.add_argument("--products", type=int, default=5, help="Горячих товаров")
+    parser.add_argument("--stock", type=int, default=500, help="Начальный остаток каждого товара")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных запросов")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,106 @@
+"""
+Бенчмарк POST /orders/: пропускная способность создания заказов при конкурентных запросах.
+
+Каждый воркер оформляет заказы от своего пользователя; считаются запросы к БД
+и commit'ы на один заказ. Таблицы пересоздаются. SQLite не допускает
+параллельных пишущих транзакций - на нём запускать с --concurrency 1.
+
+    python benchmarks/bench_create_orders.py --orders 10000 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import event
+
+from app.core.security import create_access_token
+from app.db.session import Base, async_engine, AsyncSessionLocal
+from app.models.product import Product
+from app.models.shop import Shop
+from app.models.user import User
+from main import app
+
+
+async def seed(users: int, items: int):
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        buyers = [User(telegram_id=str(1000 + i), first_name=f"Buyer {i}", is_active=True) for i in range(users)]
+        db.add_all(buyers)
+        await db.commit()
+        shop = Shop(name="Bench Shop", owner_id=buyers[0].id)
+        db.add(shop)
+        await db.commit()
+        products = [Product(name=f"Product {i}", price=10.0 + i, stock=10**9, shop_id=shop.id) for i in range(items)]
+        db.add_all(products)
+        await db.commit()
+        return shop.id, [(user.id, user.telegram_id) for user in buyers], [(p.id, p.price) for p in products]
+
+
+async def main(args: argparse.Namespace) -> None:
+    shop_id, buyers, products = await seed(args.concurrency, args.items)
+    counters: Dict[str, int] = {"statements": 0, "commits": 0}
+
+    def count_statement(*_):
+        counters["statements"] += 1
+
+    def count_commit(*_):
+        counters["commits"] += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_statement)
+    event.listen(async_engine.sync_engine, "commit", count_commit)
+
+    per_worker = [args.orders // args.concurrency + (i < args.orders % args.concurrency) for i in range(args.concurrency)]
+    latencies: List[float] = []
+
+    async def worker(client: httpx.AsyncClient, user_id: int, telegram_id: str, count: int) -> None:
+        headers = {"Authorization": f"Bearer {create_access_token(subject=telegram_id)}"}
+        payload = {
+            "user_id": user_id,
+            "shop_id": shop_id,
+            "payment_method": "card",
+            "items": [{"product_id": id, "quantity": 1, "price": price} for id, price in products],
+        }
+        for _ in range(count):
+            started = time.perf_counter()
+            response = await client.post("/api/v1/orders/", json=payload, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, user_id, telegram_id, count)
+            for (user_id, telegram_id), count in zip(buyers, per_worker)
+        ))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"orders             {len(latencies)} за {elapsed:.1f} s, {len(latencies) / elapsed:.0f} заказов/с")
+    print(
+        f"latency            p50 {statistics.median(latencies) * 1000:.2f} ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms"
+    )
+    print(
+        f"per order          {counters['statements'] / len(latencies):.2f} запросов, "
+        f"{counters['commits'] / len(latencies):.2f} commit"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк создания заказов")
+    parser.add_argument("--orders", type=int, default=10_000, help="Всего заказов")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных покупателей")
+    parser.add_argument("--items", type=int, default=5, help="Позиций в заказе")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,126 @@
+"""
+Бенчмарк исходящих запросов: рассылка 10k сообщений через TelegramService против
+локального мок-сервера Bot API по HTTPS.
+
+Сравниваются новый httpx.AsyncClient на каждое сообщение (как было) и общий
+клиент из app.core.http. Мок-сервер считает принятые TCP-соединения - каждое
+означает отдельное TLS-рукопожатие. Самоподписанный сертификат создаётся через
+openssl во временном каталоге.
+
+    python benchmarks/bench_http_clients.py --messages 10000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+
+from app.core.http import HTTP2_AVAILABLE, close_http_clients
+from app.services.telegram_service import TelegramService
+
+RESPONSE = b'{"ok": true, "result": {"message_id": 1}}'
+
+
+class MockBotAPI:
+    """HTTP/1.1 сервер с keep-alive: на любой запрос отвечает успешным sendMessage"""
+
+    def __init__(self):
+        self.connections = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                await reader.readexactly(length)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(RESPONSE)).encode() + b"\r\n\r\n" + RESPONSE
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def make_certificate(directory: str) -> ssl.SSLContext:
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    # Клиенты httpx доверяют сертификату из SSL_CERT_FILE
+    os.environ["SSL_CERT_FILE"] = cert
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+async def broadcast(service: TelegramService, messages: int, concurrency: int, send) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(chat_id: int) -> None:
+        async with semaphore:
+            result = await send(service, chat_id)
+            assert result.get("ok"), result
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(chat_id) for chat_id in range(messages)))
+    return time.perf_counter() - started
+
+
+async def send_with_new_client(service: TelegramService, chat_id: int):
+    async with httpx.AsyncClient() as client:
+        response = await client.post(f"{service.api_url}/sendMessage", json={"chat_id": chat_id, "text": "Hi"})
+        return response.json()
+
+
+async def send_with_shared_client(service: TelegramService, chat_id: int):
+    return await service.send_message(chat_id=chat_id, text="Hi")
+
+
+async def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        server_ssl = make_certificate(directory)
+        mock = MockBotAPI()
+        server = await asyncio.start_server(mock.handle, "127.0.0.1", 0, ssl=server_ssl)
+        port = server.sockets[0].getsockname()[1]
+
+        service = TelegramService("BENCH")
+        service.api_url = f"https://127.0.0.1:{port}/botBENCH"
+        print(f"http2 available    {HTTP2_AVAILABLE} (мок-сервер отвечает по HTTP/1.1)")
+
+        for name, send in (("new client", send_with_new_client), ("shared client", send_with_shared_client)):
+            mock.connections = 0
+            elapsed = await broadcast(service, args.messages, args.concurrency, send)
+            print(
+                f"{name:<18} {args.messages / elapsed:.0f} сообщений/с, {elapsed:.2f} s, "
+                f"TLS-рукопожатий {mock.connections}"
+            )
+
+        await close_http_clients()
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк общего HTTP-клиента")
+    parser.add_argument("--messages", type=int, default=10_000, help="Сообщений в рассылке")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных запросов")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,149 @@
+"""
+Бенчмарк проверки подписи вебхуков PayPal: локальная проверка по закэшированному
+сертификату против запроса verify-webhook-signature на каждый вебхук.
+
+Ответы PayPal (сертификат и verify-webhook-signature) подменяются, задержка
+сетевого запроса задаётся --latency. Сертификат и ключ создаются через cryptography.
+
+    python benchmarks/bench_paypal_webhooks.py --webhooks 2000 --concurrency 50 --latency 0.05
+"""
+import argparse
+import asyncio
+import base64
+import datetime
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.x509.oid import NameOID
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services import payment_service, paypal_signature
+from app.services.payment_service import PayPalPaymentService
+from app.services.paypal_signature import signed_message
+
+CERT_URL = "https://api.paypal.com/v1/notifications/certs/CERT-BENCH"
+WEBHOOK_ID = "WH-BENCH"
+
+
+def make_certificate():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "messageverificationcerts.paypal.com")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    return key, cert.public_bytes(serialization.Encoding.PEM)
+
+
+class MockResponse:
+    def __init__(self, content: bytes = b"", data: dict = None):
+        self.content = content
+        self.status_code = 200
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+class MockPayPal:
+    """Вместо HTTP-клиента: каждый запрос ждёт latency секунд"""
+
+    def __init__(self, pem: bytes, latency: float):
+        self.pem = pem
+        self.latency = latency
+        self.requests = 0
+
+    async def get(self, url, **kwargs):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return MockResponse(content=self.pem)
+
+    async def post(self, url, **kwargs):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return MockResponse(data={"verification_status": "SUCCESS"})
+
+
+class BenchPayPal(PayPalPaymentService):
+    async def _get_access_token(self):
+        return "token"
+
+
+def make_webhooks(key, count: int):
+    webhooks = []
+    for i in range(count):
+        payload = f'{{"id": "WH-{i}", "event_type": "PAYMENT.CAPTURE.COMPLETED"}}'.encode()
+        headers = {
+            "PAYPAL-TRANSMISSION-ID": f"transmission-{i}",
+            "PAYPAL-TRANSMISSION-TIME": "2026-10-17T10:00:00Z",
+            "PAYPAL-CERT-URL": CERT_URL,
+            "PAYPAL-AUTH-ALGO": "SHA256withRSA",
+        }
+        signature = key.sign(signed_message(headers, WEBHOOK_ID, payload), padding.PKCS1v15(), hashes.SHA256())
+        headers["PAYPAL-TRANSMISSION-SIG"] = base64.b64encode(signature).decode()
+        webhooks.append((payload, headers))
+    return webhooks
+
+
+async def run(service: BenchPayPal, webhooks, concurrency: int, verify) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(payload: bytes, headers: dict) -> None:
+        async with semaphore:
+            assert await verify(service, payload, headers)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(payload, headers) for payload, headers in webhooks))
+    return time.perf_counter() - started
+
+
+async def verify_remotely(service: BenchPayPal, payload: bytes, headers: dict) -> bool:
+    return await service._verify_webhook_remotely(payload, headers, WEBHOOK_ID)
+
+
+async def verify(service: BenchPayPal, payload: bytes, headers: dict) -> bool:
+    return await service.verify_webhook(payload, headers)
+
+
+async def main(args: argparse.Namespace) -> None:
+    key, pem = make_certificate()
+    mock = MockPayPal(pem, args.latency)
+    webhooks = make_webhooks(key, args.webhooks)
+
+    settings.PAYMENT_PROVIDERS.setdefault("paypal", {})["webhook_id"] = WEBHOOK_ID
+    payment_service.get_http_client = paypal_signature.get_http_client = lambda upstream: mock
+    service = BenchPayPal("client", "secret", sandbox=True)
+
+    for name, check in (("remote", verify_remotely), ("local", verify)):
+        mock.requests = 0
+        elapsed = await run(service, webhooks, args.concurrency, check)
+        print(
+            f"{name:<8} {args.webhooks / elapsed:.0f} вебхуков/с, {elapsed:.2f} s, "
+            f"запросов к PayPal {mock.requests}"
+        )
+    snapshot = metrics.snapshot()
+    print(f"сертификат скачан {snapshot.get('paypal.cert.fetch', 0):.0f} раз")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк проверки подписи вебхуков PayPal")
+    parser.add_argument("--webhooks", type=int, default=2000, help="Вебхуков")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных проверок")
+    parser.add_argument("--latency", type=float, default=0.05, help="Задержка запроса к PayPal, с")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,124 @@
+"""
+Бенчмарк /products/search/{shop_id} на магазине с большим каталогом.
+
+Рассчитан на PostgreSQL (SQLALCHEMY_DATABASE_URI): create_all создаёт tsvector-колонку
+и GIN-индексы поиска, после заполнения выполняется ANALYZE. Таблицы пересоздаются.
+Для сравнения тот же набор запросов прогоняется через прежний name ILIKE '%q%'.
+
+    python benchmarks/bench_product_search.py --products 1000000
+    python benchmarks/bench_product_search.py --products 1000000 --skip-seed
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import insert, select, text
+
+from app.db.session import Base, async_engine, AsyncSessionLocal
+from app.models.product import Product
+from app.models.shop import Shop
+from app.models.user import User
+from main import app
+
+WORDS = [
+    "red", "blue", "green", "black", "white", "cotton", "leather", "wool", "summer", "winter",
+    "shirt", "jacket", "shoes", "boots", "scarf", "hat", "bag", "wallet", "belt", "dress",
+]
+QUERIES = ["leather boots", "red", "winter jacket", "wallet", "lether", "SKU-4242"]
+
+
+async def seed(total: int, batch: int) -> int:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        user = User(telegram_id="100", first_name="Bench", is_active=True)
+        db.add(user)
+        await db.commit()
+        shop = Shop(name="Bench Shop", owner_id=user.id)
+        db.add(shop)
+        await db.commit()
+
+        rnd = random.Random(42)
+        for start in range(0, total, batch):
+            rows = [
+                {
+                    "name": " ".join(rnd.sample(WORDS, 3)),
+                    "description": " ".join(rnd.choices(WORDS, k=12)),
+                    "sku": f"SKU-{i}",
+                    "price": 10.0,
+                    "stock": 1,
+                    "shop_id": shop.id,
+                }
+                for i in range(start, min(start + batch, total))
+            ]
+            await db.execute(insert(Product), rows)
+            await db.commit()
+            print(f"seeded {min(start + batch, total)}/{total}", end="\r")
+        print()
+
+    async with async_engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("ANALYZE products"))
+    return shop.id
+
+
+async def measure(run_query, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await run_query()
+        latencies.append(time.perf_counter() - started)
+    return {"p50_ms": statistics.median(latencies) * 1000, "max_ms": max(latencies) * 1000}
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.skip_seed:
+        async with AsyncSessionLocal() as db:
+            shop_id = (await db.execute(select(Shop.id).where(Shop.name == "Bench Shop"))).scalar_one()
+    else:
+        shop_id = await seed(args.products, args.batch)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for query in QUERIES:
+            async def search():
+                response = await client.get(
+                    f"/api/v1/products/search/{shop_id}", params={"query": query, "limit": args.limit}
+                )
+                response.raise_for_status()
+
+            async def legacy():
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        select(Product)
+                        .where(Product.shop_id == shop_id, Product.name.ilike(f"%{query}%"))
+                        .order_by(Product.id)
+                        .limit(args.limit)
+                    )
+
+            new = await measure(search, args.repeat)
+            old = await measure(legacy, args.repeat)
+            print(
+                f"{query!r:<16} search p50 {new['p50_ms']:>8.1f} ms  max {new['max_ms']:>8.1f} ms   "
+                f"ilike p50 {old['p50_ms']:>8.1f} ms  max {old['max_ms']:>8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска товаров")
+    parser.add_argument("--products", type=int, default=1_000_000, help="Товаров в магазине")
+    parser.add_argument("--batch", type=int, default=10_000, help="Размер пачки при заполнении")
+    parser.add_argument("--limit", type=int, default=20, help="Размер страницы выдачи")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов каждого запроса")
+    parser.add_argument("--skip-seed", action="store_true", help="Использовать уже заполненную БД")
+
+    asyncio.run(main(parser.parse_args()))
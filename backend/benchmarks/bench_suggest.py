@@ -0,0 +1,90 @@
+"""
+Бенчмарк /products/suggest/{shop_id}: задержка подсказок на магазине со 100k товаров.
+
+Индекс строится первым запросом, дальше измеряются запросы по случайным префиксам
+длиной 1-6 символов, как при наборе текста. Таблицы пересоздаются.
+
+    python benchmarks/bench_suggest.py --products 100000 --requests 5000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import insert
+
+from app.db.session import Base, async_engine, AsyncSessionLocal
+from app.models.category import Category
+from app.models.product import Product
+from app.models.shop import Shop
+from app.models.user import User
+from main import app
+
+WORDS = [
+    "red", "blue", "green", "black", "white", "cotton", "leather", "wool", "summer", "winter",
+    "shirt", "jacket", "shoes", "boots", "scarf", "hat", "bag", "wallet", "belt", "dress",
+]
+
+
+async def seed(total: int) -> int:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        user = User(telegram_id="100", first_name="Bench", is_active=True)
+        db.add(user)
+        await db.commit()
+        shop = Shop(name="Bench Shop", owner_id=user.id)
+        db.add(shop)
+        await db.commit()
+        db.add_all([Category(name=word.title(), shop_id=shop.id) for word in WORDS])
+
+        rnd = random.Random(42)
+        rows = [
+            {"name": f"{' '.join(rnd.sample(WORDS, 3))} {i}", "price": 10.0, "shop_id": shop.id}
+            for i in range(total)
+        ]
+        for start in range(0, total, 10_000):
+            await db.execute(insert(Product), rows[start:start + 10_000])
+        await db.commit()
+        return shop.id
+
+
+async def main(args: argparse.Namespace) -> None:
+    shop_id = await seed(args.products)
+    rnd = random.Random(7)
+    prefixes = [rnd.choice(WORDS)[:rnd.randint(1, 6)] for _ in range(args.requests)]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        (await client.get(f"/api/v1/products/suggest/{shop_id}", params={"q": "a"})).raise_for_status()
+        print(f"index build        {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        latencies = []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            response = await client.get(f"/api/v1/products/suggest/{shop_id}", params={"q": prefix})
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    latencies.sort()
+    print(
+        f"suggest            p50 {statistics.median(latencies) * 1000:.2f} ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк подсказок поиска")
+    parser.add_argument("--products", type=int, default=100_000, help="Товаров в магазине")
+    parser.add_argument("--requests", type=int, default=5000, help="Количество запросов подсказок")
+
+    asyncio.run(main(parser.parse_args()))
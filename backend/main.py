@@ -1,16 +1,50 @@
+from contextlib import AsyncExitStack, asynccontextmanager
+
 import uvicorn
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse
 
 from app.core.config import settings
 from app.api.v1.api import api_router
-from app.db.session import get_db
-from app.db.init_db import init_db
+from app.core.auth_cache import auth_cache
+from app.core.http import HTTP_UPSTREAMS, close_http_clients, open_http_clients
+from app.core.redis import close_redis
+from app.crud.base import InvalidCursorError
+from app.db.init_db import init_db_async
+from app.services.broadcast import broadcast_engine
+from app.services.reservation_sweeper import reservation_sweeper
+from app.services.telegram_updates import telegram_update_queue
+from app.services.telegram_users import telegram_user_sync
+from app.services.webhook_inbox import webhook_inbox
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Остановка - в обратном порядке запуска, в том числе если запуск прервался:
+    # воркеры завершаются раньше Redis и HTTP-клиентов, которыми пользуются
+    async with AsyncExitStack() as stack:
+        await init_db_async()
+        open_http_clients(*HTTP_UPSTREAMS)
+        stack.push_async_callback(close_http_clients)
+        stack.push_async_callback(close_redis)
+        auth_cache.start_listener()
+        stack.push_async_callback(auth_cache.stop_listener)
+        reservation_sweeper.start()
+        stack.push_async_callback(reservation_sweeper.stop)
+        webhook_inbox.start()
+        stack.push_async_callback(webhook_inbox.stop)
+        broadcast_engine.start()
+        stack.push_async_callback(broadcast_engine.stop)
+        telegram_update_queue.start()
+        stack.push_async_callback(telegram_update_queue.stop)
+        telegram_user_sync.start()
+        stack.push_async_callback(telegram_user_sync.stop)
+        yield
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 if settings.BACKEND_CORS_ORIGINS:
@@ -20,14 +54,14 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
-@app.on_event("startup")
-async def startup_event():
-    db = next(get_db())
-    init_db(db)
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+    return JSONResponse(status_code=400, content={"detail": "Invalid cursor"})
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,15 +1,23 @@
 import os
 import pytest
-from typing import Dict, Generator, Any
+import pytest_asyncio
+from contextlib import contextmanager
+from typing import AsyncGenerator, Callable, ContextManager, Dict, Generator, Any, List
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from datetime import datetime, timedelta
 
+# Кэш и прочие клиенты Redis в тестах работают на fakeredis
+os.environ.setdefault("REDIS_FAKE", "true")
+
 from app.db.base import Base
 from app.db.session import get_db
 from app.core.config import settings
+from app.core.auth_cache import auth_cache
+from app.core.redis import get_redis
+from app.core.suggest import suggest_index
 from app.core.security import create_access_token
 from app.models.user import User, Role, UserRole
 from app.models.shop import Shop, ShopSettings
@@ -19,33 +27,39 @@ from app.models.order import Order, OrderItem, OrderStatus
 from backend.app.crud.user import user as user_crud
 from main import app
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+# NullPool: TestClient крутит приложение в своём event loop, соединения между loop'ами не переиспользуются
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(
+    bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-@pytest.fixture(scope="function")
-def db() -> Generator[Session, None, None]:
-    Base.metadata.create_all(bind=engine)
+@pytest_asyncio.fixture(scope="function")
+async def db() -> AsyncGenerator[AsyncSession, None]:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     
     db = TestingSessionLocal()
     
     try:
         yield db
     finally:
-        db.close()
-        Base.metadata.drop_all(bind=engine)
+        await db.close()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+
+@pytest_asyncio.fixture(autouse=True)
+async def reset_caches() -> AsyncGenerator[None, None]:
+    yield
+    auth_cache.clear()
+    suggest_index.clear()
+    await get_redis().flushall()
 
 @pytest.fixture(scope="function")
-def client(db: Session) -> Generator[TestClient, None, None]:
-    def override_get_db():
-        try:
-            yield db
-        finally:
-            pass
+def client(db: AsyncSession) -> Generator[TestClient, None, None]:
+    async def override_get_db():
+        async with TestingSessionLocal() as session:
+            yield session
     
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as client:
@@ -53,7 +67,31 @@ def client(db: Session) -> Generator[TestClient, None, None]:
     app.dependency_overrides = {}
 
 @pytest.fixture
-def test_user(db: Session) -> User:
+def assert_max_queries() -> Callable[[int], ContextManager[List[str]]]:
+    """
+    Ловит N+1: with assert_max_queries(3): client.get(...) падает,
+    если внутри блока к тестовой БД ушло больше 3 SQL-запросов.
+    """
+    @contextmanager
+    def counter(max_queries: int) -> Generator[List[str], None, None]:
+        queries: List[str] = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            queries.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield queries
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        assert len(queries) <= max_queries, (
+            f"Expected at most {max_queries} queries, got {len(queries)}:\n" + "\n".join(queries)
+        )
+
+    return counter
+
+@pytest_asyncio.fixture
+async def test_user(db: AsyncSession) -> User:
     user_data = {
         "telegram_id": "12345678",
         "username": "testuser",
@@ -64,20 +102,20 @@ def test_user(db: Session) -> User:
     }
     user = User(**user_data)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
-@pytest.fixture
-def test_admin_role(db: Session) -> Role:
+@pytest_asyncio.fixture
+async def test_admin_role(db: AsyncSession) -> Role:
     role = Role(name="admin", description="Administrator role")
     db.add(role)
-    db.commit()
-    db.refresh(role)
+    await db.commit()
+    await db.refresh(role)
     return role
 
-@pytest.fixture
-def test_shop(db: Session, test_user: User) -> Shop:
+@pytest_asyncio.fixture
+async def test_shop(db: AsyncSession, test_user: User) -> Shop:
     shop = Shop(
         name="Test Shop",
         description="Test Shop Description",
@@ -86,8 +124,8 @@ def test_shop(db: Session, test_user: User) -> Shop:
         is_active=True
     )
     db.add(shop)
-    db.commit()
-    db.refresh(shop)
+    await db.commit()
+    await db.refresh(shop)
     
     settings = ShopSettings(
         shop_id=shop.id,
@@ -98,24 +136,24 @@ def test_shop(db: Session, test_user: User) -> Shop:
         payment_providers='{"stripe":true,"paypal":false}'
     )
     db.add(settings)
-    db.commit()
+    await db.commit()
     
     return shop
 
-@pytest.fixture
-def test_category(db: Session, test_shop: Shop) -> Category:
+@pytest_asyncio.fixture
+async def test_category(db: AsyncSession, test_shop: Shop) -> Category:
     category = Category(
         name="Test Category",
         description="Test Category Description",
         shop_id=test_shop.id
     )
     db.add(category)
-    db.commit()
-    db.refresh(category)
+    await db.commit()
+    await db.refresh(category)
     return category
 
-@pytest.fixture
-def test_product(db: Session, test_shop: Shop, test_category: Category) -> Product:
+@pytest_asyncio.fixture
+async def test_product(db: AsyncSession, test_shop: Shop, test_category: Category) -> Product:
     product = Product(
         name="Test Product",
         description="Test Product Description",
@@ -126,12 +164,12 @@ def test_product(db: Session, test_shop: Shop, test_category: Category) -> Produ
         category_id=test_category.id
     )
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    await db.refresh(product)
     return product
 
-@pytest.fixture
-def test_order(db: Session, test_user: User, test_shop: Shop, test_product: Product) -> Order:
+@pytest_asyncio.fixture
+async def test_order(db: AsyncSession, test_user: User, test_shop: Shop, test_product: Product) -> Order:
     order = Order(
         user_id=test_user.id,
         shop_id=test_shop.id,
@@ -141,8 +179,8 @@ def test_order(db: Session, test_user: User, test_shop: Shop, test_product: Prod
         payment_method="credit_card"
     )
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    await db.refresh(order)
 
     order_item = OrderItem(
         order_id=order.id,
@@ -151,7 +189,7 @@ def test_order(db: Session, test_user: User, test_shop: Shop, test_product: Prod
         price=99.99
     )
     db.add(order_item)
-    db.commit()
+    await db.commit()
     
     return order
 
@@ -0,0 +1,79 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import Permission, create_access_token, resolve_permissions
+from app.crud.shop import shop as shop_crud
+from app.models.shop import Shop
+from app.models.user import Role, User, UserRole
+
+
+@pytest_asyncio.fixture
+async def other_user(db: AsyncSession) -> User:
+    user = User(telegram_id="87654321", username="other", is_active=True)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+def test_current_user_served_from_cache(client, test_user, user_token_headers, assert_max_queries):
+    first = client.get("/api/v1/users/me", headers=user_token_headers)
+    with assert_max_queries(0):
+        second = client.get("/api/v1/users/me", headers=user_token_headers)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+
+
+def test_update_user_me_invalidates_cache(client, test_user, user_token_headers):
+    client.get("/api/v1/users/me", headers=user_token_headers)
+
+    response = client.put("/api/v1/users/me", headers=user_token_headers, json={"first_name": "Renamed"})
+    assert response.status_code == 200
+
+    assert client.get("/api/v1/users/me", headers=user_token_headers).json()["first_name"] == "Renamed"
+
+
+def test_role_assignment_invalidates_cache(
+    client, test_user, test_shop, test_admin_role: Role, other_user: User, user_token_headers
+):
+    # Пустой набор ролей попадает в кэш и должен сброситься при назначении
+    other_headers = {"Authorization": f"Bearer {create_access_token(subject=other_user.telegram_id)}"}
+    assert client.get(f"/api/v1/users/shop/{test_shop.id}/users", headers=other_headers).status_code == 403
+
+    response = client.post(
+        f"/api/v1/roles/users/{other_user.id}/roles?shop_id={test_shop.id}",
+        headers=user_token_headers,
+        json={"role_id": test_admin_role.id, "shop_id": test_shop.id, "user_id": other_user.id},
+    )
+    assert response.status_code == 200
+
+    assert client.get(f"/api/v1/users/shop/{test_shop.id}/users", headers=other_headers).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_shop_permissions_resolved_in_one_query(
+    db: AsyncSession, test_user: User, test_shop: Shop, other_user: User, assert_max_queries
+):
+    roles = [Role(name="admin"), Role(name="manager")]
+    db.add_all(roles)
+    await db.commit()
+    db.add_all([UserRole(user_id=other_user.id, role_id=role.id, shop_id=test_shop.id) for role in roles])
+    await db.commit()
+
+    with assert_max_queries(1):
+        shop, role_names = await shop_crud.get_with_user_roles(db, shop_id=test_shop.id, user_id=other_user.id)
+
+    assert shop.id == test_shop.id
+    assert resolve_permissions(other_user, shop, role_names) == Permission.ADMIN | Permission.MANAGER
+    assert resolve_permissions(test_user, shop, set()) == Permission.OWNER
+    assert await shop_crud.get_with_user_roles(db, shop_id=999, user_id=other_user.id) == (None, set())
+
+
+def test_shop_owner_endpoint_reuses_resolved_shop(client, test_shop, user_token_headers, assert_max_queries):
+    # Пользователь, права + магазин, UPDATE и refresh - без повторной выборки магазина
+    with assert_max_queries(4):
+        response = client.put(f"/api/v1/shops/{test_shop.id}", headers=user_token_headers, json={"name": "Renamed"})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
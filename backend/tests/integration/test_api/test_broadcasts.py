@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.broadcast import BroadcastStatus
+
+
+@pytest.mark.asyncio
+async def test_broadcast_is_queued_and_controlled(client, db: AsyncSession, test_shop, test_order, user_token_headers):
+    response = client.post(
+        f"/api/v1/telegram/broadcast/{test_shop.id}", params={"message": "Hello"}, headers=user_token_headers
+    )
+    assert response.status_code == 202
+    job = response.json()
+    # Без списка получателей - покупатели магазина
+    assert (job["status"], job["audience"], job["total"], job["pending"]) == ("running", "all_customers", 1, 1)
+
+    url = f"/api/v1/telegram/broadcast/{test_shop.id}/{job['id']}"
+    assert client.post(f"{url}/pause", headers=user_token_headers).json()["status"] == "paused"
+    assert client.post(f"{url}/pause", headers=user_token_headers).status_code == 409
+    assert client.post(f"{url}/resume", headers=user_token_headers).json()["status"] == "running"
+    assert client.post(f"{url}/cancel", headers=user_token_headers).json()["status"] == "cancelled"
+    assert client.get(url, headers=user_token_headers).json()["status"] == BroadcastStatus.CANCELLED.value
+    assert client.get(f"{url}0", headers=user_token_headers).status_code == 404
+
+    response = client.post(
+        f"/api/v1/telegram/broadcast/{test_shop.id}", params={"message": "Hello", "audience": "abandoned_carts"},
+        headers=user_token_headers,
+    )
+    assert (response.json()["status"], response.json()["total"]) == ("completed", 0)
@@ -0,0 +1,42 @@
+from app.core.metrics import metrics
+
+
+def test_products_served_from_cache(client, test_shop, test_product, assert_max_queries):
+    hits = metrics.snapshot().get("cache.products.hit", 0)
+
+    first = client.get(f"/api/v1/products/shop/{test_shop.id}")
+    with assert_max_queries(0):
+        second = client.get(f"/api/v1/products/shop/{test_shop.id}")
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert metrics.snapshot()["cache.products.hit"] == hits + 1
+
+
+def test_update_product_invalidates_cache(client, test_shop, test_product, user_token_headers):
+    client.get(f"/api/v1/products/shop/{test_shop.id}")
+    client.get(f"/api/v1/products/{test_product.id}")
+
+    response = client.put(
+        f"/api/v1/products/{test_product.id}?shop_id={test_shop.id}",
+        headers=user_token_headers,
+        json={"price": 42.0},
+    )
+    assert response.status_code == 200
+
+    products = client.get(f"/api/v1/products/shop/{test_shop.id}").json()
+    assert products[0]["price"] == 42.0
+    assert client.get(f"/api/v1/products/{test_product.id}").json()["price"] == 42.0
+
+
+def test_review_invalidates_rating_cache(client, test_user, test_product, user_token_headers):
+    assert client.get(f"/api/v1/reviews/product/{test_product.id}/rating").json() == {"average": 0.0, "count": 0}
+
+    response = client.post(
+        "/api/v1/reviews/",
+        headers=user_token_headers,
+        json={"product_id": test_product.id, "user_id": test_user.id, "rating": 4},
+    )
+    assert response.status_code == 200
+
+    assert client.get(f"/api/v1/reviews/product/{test_product.id}/rating").json() == {"average": 4.0, "count": 1}
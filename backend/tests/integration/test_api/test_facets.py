@@ -0,0 +1,98 @@
+from collections import Counter
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.facet import ProductFilters, _upsert_deltas, product_facet as product_facet_crud
+from app.models.category import Category
+from app.models.product import Product
+from app.models.review import Review
+from app.models.shop import Shop
+from app.models.user import User
+
+
+@pytest_asyncio.fixture
+async def catalog(db: AsyncSession, test_user: User, test_shop: Shop, test_category: Category):
+    child = Category(name="Child", shop_id=test_shop.id, parent_id=test_category.id)
+    db.add(child)
+    await db.commit()
+
+    products = {
+        "cheap": Product(name="Cheap", price=5, stock=10, shop_id=test_shop.id, category_id=test_category.id),
+        "sale": Product(name="Sale", price=60, discount_price=40, stock=0, shop_id=test_shop.id, category_id=child.id),
+        "hidden": Product(name="Hidden", price=200, stock=3, is_available=False, shop_id=test_shop.id),
+    }
+    db.add_all(products.values())
+    await db.commit()
+
+    db.add_all([
+        Review(product_id=products["cheap"].id, user_id=test_user.id, rating=5),
+        Review(product_id=products["sale"].id, user_id=test_user.id, rating=3),
+        Review(product_id=products["sale"].id, user_id=test_user.id, rating=4),
+    ])
+    await db.commit()
+    return products
+
+
+async def _assert_summary_matches_scan(db: AsyncSession, shop_id: int):
+    summary = await product_facet_crud.get_summary(db, shop_id=shop_id)
+    scanned = await product_facet_crud.count_filtered(db, shop_id=shop_id, filters=ProductFilters())
+    assert summary == scanned
+    return summary
+
+
+@pytest.mark.asyncio
+async def test_summary_maintained_on_writes(db: AsyncSession, test_shop: Shop, test_category: Category, catalog):
+    summary = await _assert_summary_matches_scan(db, test_shop.id)
+    assert summary["price"] == {"0-10": 1, "10-50": 1, "100-500": 1}
+    assert summary["availability"] == {"in_stock": 1, "out_of_stock": 2}
+    assert summary["discount"] == {"yes": 1, "no": 2}
+    assert summary["rating"] == {"5": 1, "3": 1, "none": 1}
+
+    catalog["cheap"].price = 700
+    catalog["sale"].discount_price = None
+    await db.commit()
+    await db.delete(catalog["hidden"])
+    await db.commit()
+
+    summary = await _assert_summary_matches_scan(db, test_shop.id)
+    assert summary["price"] == {"500-1000": 1, "50-100": 1}
+    assert summary["rating"] == {"5": 1, "3": 1}
+
+
+def test_filters_on_product_list(client, test_shop, test_category, catalog):
+    def names(**params):
+        response = client.get(f"/api/v1/products/shop/{test_shop.id}", params=params)
+        assert response.status_code == 200
+        return sorted(p["name"] for p in response.json())
+
+    assert names(category_id=test_category.id) == ["Cheap", "Sale"]
+    assert names(min_price=30, max_price=100) == ["Sale"]
+    assert names(in_stock=True) == ["Cheap"]
+    assert names(has_discount=True) == ["Sale"]
+    assert names(min_rating=4) == ["Cheap"]
+    assert names(in_stock=False, min_rating=3) == ["Sale"]
+
+
+def test_facet_counts_exclude_own_filter(client, test_shop, catalog, assert_max_queries):
+    with assert_max_queries(1):
+        response = client.get(f"/api/v1/products/shop/{test_shop.id}/facets", params={"in_stock": True})
+    assert response.status_code == 200
+    facets = response.json()
+
+    assert facets["availability"] == {"in_stock": 1, "out_of_stock": 2}
+    assert facets["price"] == {"0-10": 1}
+    assert facets["rating"] == {"5": 1}
+
+    with assert_max_queries(1):
+        unfiltered = client.get(f"/api/v1/products/shop/{test_shop.id}/facets").json()
+    assert unfiltered["availability"] == {"in_stock": 1, "out_of_stock": 2}
+
+
+def test_facet_upsert_locks_rows_in_key_order():
+    deltas = Counter({(2, "price", "0-10"): 1, (1, "stock", "in_stock"): -1, (1, "category", "5"): 1, (1, "price", "x"): 0})
+    params = _upsert_deltas("postgresql", deltas).compile(dialect=postgresql.dialect()).params
+    keys = [(params[f"shop_id_m{i}"], params[f"facet_m{i}"], params[f"value_m{i}"]) for i in range(3)]
+    assert keys == [(1, "category", "5"), (1, "stock", "in_stock"), (2, "price", "0-10")]
@@ -0,0 +1,114 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cart import CartItem
+from app.models.order import OrderItem
+from app.models.product import Product
+from app.models.shop import Shop
+from app.models.user import User
+
+
+@pytest_asyncio.fixture
+async def cart(db: AsyncSession, test_user: User, test_shop: Shop):
+    products = [Product(name=f"Item {i}", price=10 + i, stock=5, shop_id=test_shop.id) for i in range(3)]
+    db.add_all(products)
+    await db.commit()
+    db.add_all([
+        CartItem(user_id=test_user.id, product_id=product.id, quantity=2, price=product.price)
+        for product in products
+    ])
+    await db.commit()
+    return products
+
+
+@pytest.mark.asyncio
+async def test_create_order_single_transaction(
+    client, db: AsyncSession, test_user, test_shop, cart, user_token_headers, assert_max_queries
+):
+    payload = {
+        "user_id": test_user.id,
+        "shop_id": test_shop.id,
+        "payment_method": "card",
+        "items": [{"product_id": p.id, "quantity": 2, "price": 0.01} for p in cart],
+    }
+    # Пользователь, блокировка товаров, списание остатков, INSERT заказа,
+    # один INSERT позиций, INSERT удержаний, DELETE корзины
+    with assert_max_queries(7):
+        response = client.post("/api/v1/orders/", json=payload, headers=user_token_headers)
+    assert response.status_code == 200
+    order = response.json()
+    assert order["total_amount"] == sum(p.price * 2 for p in cart)
+    assert order["status"] == "pending"
+
+    items = (await db.execute(select(OrderItem).where(OrderItem.order_id == order["id"]))).scalars().all()
+    assert sorted((item.product_id, item.price) for item in items) == sorted((p.id, p.price) for p in cart)
+    assert await db.scalar(select(func.count()).select_from(CartItem).where(CartItem.user_id == test_user.id)) == 0
+
+
+
+@pytest.mark.asyncio
+async def test_create_order_reports_failed_items(client, db: AsyncSession, test_user, test_shop, cart, user_token_headers):
+    cart[1].is_available = False
+    await db.commit()
+    payload = {
+        "user_id": test_user.id,
+        "shop_id": test_shop.id,
+        "payment_method": "card",
+        "items": [
+            {"product_id": cart[0].id, "quantity": 5},
+            {"product_id": cart[1].id, "quantity": 1},
+            {"product_id": cart[2].id, "quantity": 6},
+            {"product_id": 999_999, "quantity": 1},
+        ],
+    }
+    response = client.post("/api/v1/orders/", json=payload, headers=user_token_headers)
+    assert response.status_code == 409
+    assert response.json()["detail"] == [
+        {"product_id": cart[1].id, "reason": "unavailable"},
+        {"product_id": cart[2].id, "reason": "insufficient_stock", "available": 5},
+        {"product_id": 999_999, "reason": "not_found"},
+    ]
+
+    # Ничего не списано, корзина на месте
+    stocks = (await db.execute(select(Product.stock).where(Product.shop_id == test_shop.id))).scalars().all()
+    assert stocks == [5, 5, 5]
+    assert await db.scalar(select(func.count()).select_from(CartItem).where(CartItem.user_id == test_user.id)) == 3
+
+
+@pytest.mark.asyncio
+async def test_create_order_sells_out_stock(client, db: AsyncSession, test_user, test_shop, cart, user_token_headers):
+    payload = {
+        "user_id": test_user.id,
+        "shop_id": test_shop.id,
+        "payment_method": "card",
+        "items": [{"product_id": cart[0].id, "quantity": 5}],
+    }
+    assert client.post("/api/v1/orders/", json=payload, headers=user_token_headers).status_code == 200
+    response = client.post("/api/v1/orders/", json=payload, headers=user_token_headers)
+    assert response.status_code == 409
+    assert response.json()["detail"] == [{"product_id": cart[0].id, "reason": "insufficient_stock", "available": 0}]
+
+    facets = client.get(f"/api/v1/products/shop/{test_shop.id}/facets").json()
+    assert facets["availability"] == {"in_stock": 2, "out_of_stock": 1}
+
+
+@pytest.mark.asyncio
+async def test_update_order_status_goes_through_transitions(
+    client, db: AsyncSession, test_user: User, test_shop: Shop, cart, user_token_headers
+):
+    payload = {"user_id": test_user.id, "shop_id": test_shop.id, "payment_method": "card",
+               "items": [{"product_id": cart[0].id, "quantity": 2, "price": 0.01}]}
+    order_id = client.post("/api/v1/orders/", json=payload, headers=user_token_headers).json()["id"]
+    url = f"/api/v1/orders/{order_id}?shop_id={test_shop.id}"
+
+    response = client.put(url, json={"status": "cancelled", "shipping_method": "pickup"}, headers=user_token_headers)
+    assert response.status_code == 200
+    assert (response.json()["status"], response.json()["shipping_method"]) == ("cancelled", "pickup")
+    # Отмена вернула удержанный остаток
+    assert await db.scalar(select(Product.stock).where(Product.id == cart[0].id).execution_options(populate_existing=True)) == 5
+
+    response = client.put(url, json={"status": "pending", "shipping_method": "courier"}, headers=user_token_headers)
+    assert response.status_code == 409
+    assert client.get(url, headers=user_token_headers).json()["shipping_method"] == "pickup"
@@ -0,0 +1,77 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cart import CartItem
+from app.models.category import Category
+from app.models.order import Order, OrderItem
+from app.models.product import Product, ProductImage
+from app.models.shop import Shop
+from app.models.user import User
+
+# Число запросов не должно зависеть от количества строк в ответе
+ROWS = 5
+
+
+@pytest_asyncio.fixture
+async def catalog(db: AsyncSession, test_user: User, test_shop: Shop, test_category: Category, test_order: Order):
+    products = [
+        Product(name=f"Product {i}", price=10, stock=10, shop_id=test_shop.id, category_id=test_category.id)
+        for i in range(ROWS)
+    ]
+    db.add_all(products)
+    await db.commit()
+
+    parent = test_category
+    for depth in range(3):
+        child = Category(name=f"Level {depth}", shop_id=test_shop.id, parent_id=parent.id)
+        db.add(child)
+        await db.commit()
+        parent = child
+
+    for product in products:
+        db.add(ProductImage(product_id=product.id, image_url=f"https://example.com/{product.id}.png"))
+        db.add(OrderItem(order_id=test_order.id, product_id=product.id, quantity=1, price=10))
+        db.add(CartItem(user_id=test_user.id, product_id=product.id, quantity=1, price=10))
+    await db.commit()
+    return products
+
+
+def test_read_products_query_count(client, test_shop, catalog, assert_max_queries):
+    with assert_max_queries(2):
+        response = client.get(f"/api/v1/products/shop/{test_shop.id}")
+    assert response.status_code == 200
+    assert sum(len(product["images"]) for product in response.json()) == ROWS
+
+
+def test_read_product_query_count(client, catalog, assert_max_queries):
+    with assert_max_queries(2):
+        response = client.get(f"/api/v1/products/{catalog[0].id}")
+    assert response.status_code == 200
+    assert response.json()["category"] is not None
+
+
+def test_read_order_query_count(client, test_order, catalog, user_token_headers, assert_max_queries):
+    with assert_max_queries(3):
+        response = client.get(f"/api/v1/orders/{test_order.id}", headers=user_token_headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == ROWS + 1
+
+
+def test_read_cart_query_count(client, catalog, user_token_headers, assert_max_queries):
+    with assert_max_queries(3):
+        response = client.get("/api/v1/cart/", headers=user_token_headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == ROWS
+
+
+def test_read_categories_query_count(client, test_shop, catalog, assert_max_queries):
+    with assert_max_queries(2):
+        response = client.get(f"/api/v1/categories/shop/{test_shop.id}")
+    assert response.status_code == 200
+    tree = response.json()[0]
+    depth = 0
+    while tree["subcategories"]:
+        tree = tree["subcategories"][0]
+        depth += 1
+    assert depth == 3
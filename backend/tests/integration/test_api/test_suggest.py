@@ -0,0 +1,28 @@
+def test_suggest_products_and_categories(client, test_shop, test_category, test_product):
+    response = client.get(f"/api/v1/products/suggest/{test_shop.id}?q=test")
+
+    assert response.status_code == 200
+    assert {(s["type"], s["id"]) for s in response.json()} == {
+        ("product", test_product.id),
+        ("category", test_category.id),
+    }
+
+
+def test_suggest_updated_on_product_write(client, test_shop, test_product, user_token_headers, assert_max_queries):
+    client.get(f"/api/v1/products/suggest/{test_shop.id}?q=test")
+
+    response = client.put(
+        f"/api/v1/products/{test_product.id}?shop_id={test_shop.id}",
+        headers=user_token_headers,
+        json={"name": "Wool scarf"},
+    )
+    assert response.status_code == 200
+
+    with assert_max_queries(0):
+        found = client.get(f"/api/v1/products/suggest/{test_shop.id}?q=scar").json()
+    assert found == [{"text": "Wool scarf", "type": "product", "id": test_product.id}]
+    assert client.get(f"/api/v1/products/suggest/{test_shop.id}?q=test%20prod").json() == []
+
+    response = client.delete(f"/api/v1/products/{test_product.id}?shop_id={test_shop.id}", headers=user_token_headers)
+    assert response.status_code == 200
+    assert client.get(f"/api/v1/products/suggest/{test_shop.id}?q=wool").json() == []
@@ -1,60 +1,93 @@
 import pytest
-from unittest.mock import patch
+import hashlib
+import hmac
 import json
 
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.payment import PaymentProvider, WebhookEvent, WebhookStatus
+from app.services.telegram_updates import TelegramUpdateQueue
+
 def test_telegram_webhook_with_message(client, monkeypatch):
-    with patch("app.api.v1.telegram.process_telegram_update") as mock_process:
-        telegram_update = {
-            "update_id": 123456789,
-            "message": {
-                "message_id": 123,
-                "from": {
-                    "id": 12345678,
-                    "first_name": "Test",
-                    "last_name": "User",
-                    "username": "testuser"
-                },
-                "chat": {
-                    "id": 12345678,
-                    "type": "private"
-                },
-                "text": "/start"
-            }
+    queue = TelegramUpdateQueue(consumers=2, max_size=2, dedup_window=100, dedup_ttl=60)
+    monkeypatch.setattr("app.api.v1.telegram.telegram_update_queue", queue)
+    telegram_update = {
+        "update_id": 123456789,
+        "message": {
+            "message_id": 123,
+            "from": {
+                "id": 12345678,
+                "first_name": "Test",
+                "last_name": "User",
+                "username": "testuser"
+            },
+            "chat": {
+                "id": 12345678,
+                "type": "private"
+            },
+            "text": "/start"
         }
+    }
 
+    # Переотправка того же апдейта подтверждается, но в очередь не попадает
+    for _ in range(2):
         response = client.post(
             "/api/v1/telegram/webhook",
             json=telegram_update
         )
-        
+
         assert response.status_code == 200
         assert response.json() == {"status": "ok"}
-        
-        mock_process.assert_called_once()
-
-def test_payment_webhook_stripe(client, test_order, monkeypatch):
-    with patch("app.api.v1.payments.process_payment_callback") as mock_process:
-        payment_data = {
-            "id": "evt_123456",
-            "type": "payment_intent.succeeded",
-            "data": {
-                "object": {
-                    "id": "pi_123456",
-                    "amount": test_order.total_amount * 100,
-                    "status": "succeeded"
-                }
+
+    assert queue.depth() == 1
+
+    # Очередь чата заполнена - 503, Telegram повторит позже
+    response = client.post("/api/v1/telegram/webhook", json={**telegram_update, "update_id": 123456790})
+    assert response.status_code == 503
+    response = client.post("/api/v1/telegram/webhook", json={**telegram_update, "update_id": 123456790})
+    assert response.status_code == 503
+
+@pytest.mark.asyncio
+async def test_payment_webhook_stripe(client, db, test_order, monkeypatch):
+    monkeypatch.setitem(settings.PAYMENT_PROVIDERS["stripe"], "webhook_secret", "whsec_test")
+    payment_data = {
+        "id": "evt_123456",
+        "type": "payment_intent.succeeded",
+        "data": {
+            "object": {
+                "id": "pi_123456",
+                "amount": test_order.total_amount * 100,
+                "status": "succeeded"
             }
         }
-        
+    }
+    body = json.dumps(payment_data).encode()
+    signature = "t=1,v1=" + hmac.new(b"whsec_test", b"1." + body, hashlib.sha256).hexdigest()
+
+    # Поддельный запрос отклоняется и не занимает id события
+    response = client.post(
+        "/api/v1/payments/webhook/stripe",
+        content=body,
+        headers={"Content-Type": "application/json", "Stripe-Signature": "t=1,v1=abc"}
+    )
+    assert response.status_code == 400
+    assert (await db.execute(select(WebhookEvent))).scalars().all() == []
+
+    # Повторная доставка того же события не создаёт второй записи
+    for _ in range(2):
         response = client.post(
             "/api/v1/payments/webhook/stripe",
-            json=payment_data
+            content=body,
+            headers={"Content-Type": "application/json", "Stripe-Signature": signature}
         )
-        
         assert response.status_code == 200
         assert response.json() == {"status": "processing"}
-        
-        mock_process.assert_called_once()
-        args, kwargs = mock_process.call_args
-        assert kwargs["provider"] == "stripe"
-        assert kwargs["payload"] == payment_data
+
+    events = (await db.execute(select(WebhookEvent))).scalars().all()
+    assert len(events) == 1
+    assert events[0].provider == PaymentProvider.STRIPE
+    assert events[0].event_id == "evt_123456"
+    assert events[0].payload == body
+    assert json.loads(events[0].headers)["stripe-signature"] == signature
+    assert events[0].status == WebhookStatus.PENDING
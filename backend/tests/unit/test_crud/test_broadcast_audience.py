@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.broadcast import broadcast as broadcast_crud
+from app.models.broadcast import BroadcastAudience, BroadcastRecipient
+from app.models.cart import CartItem
+from app.models.order import Order, OrderStatus
+from app.models.product import Product
+from app.models.shop import Shop
+from app.models.user import User
+
+
+@pytest.mark.asyncio
+async def test_audiences_are_selected_in_sql(db: AsyncSession, test_shop: Shop, test_product: Product):
+    now = datetime.now()
+    users = {
+        name: User(telegram_id=name, first_name=name, is_active=name != "inactive")
+        for name in ("recent", "old", "pending", "abandoned", "fresh_cart", "cart_then_order", "inactive", "other_shop")
+    }
+    db.add_all(users.values())
+    other_shop = Shop(name="Other", owner_id=users["other_shop"].id)
+    db.add(other_shop)
+    await db.commit()
+
+    def order(user: str, status: OrderStatus, age: timedelta, shop_id: int = test_shop.id) -> Order:
+        return Order(user_id=users[user].id, shop_id=shop_id, order_number=f"ORD-{user}-{status.value}",
+                     status=status, total_amount=10, created_at=now - age)
+
+    def cart(user: str, age: timedelta) -> CartItem:
+        return CartItem(user_id=users[user].id, product_id=test_product.id, quantity=1, price=10,
+                        created_at=now - age, updated_at=now - age)
+
+    db.add_all([
+        order("recent", OrderStatus.PAID, timedelta(days=3)),
+        order("old", OrderStatus.DELIVERED, timedelta(days=90)),
+        order("pending", OrderStatus.PENDING, timedelta(days=1)),
+        order("inactive", OrderStatus.PAID, timedelta(days=1)),
+        order("other_shop", OrderStatus.PAID, timedelta(days=1), shop_id=other_shop.id),
+        cart("abandoned", timedelta(days=2)),
+        cart("fresh_cart", timedelta(hours=1)),
+        cart("cart_then_order", timedelta(days=2)),
+        order("cart_then_order", OrderStatus.PENDING, timedelta(days=1)),
+    ])
+    await db.commit()
+
+    async def recipients(audience: BroadcastAudience):
+        job = await broadcast_crud.create(db, shop_id=test_shop.id, text="Hi", audience=audience, days=30)
+        chat_ids = (await db.execute(
+            select(BroadcastRecipient.chat_id).where(BroadcastRecipient.job_id == job.id)
+        )).scalars().all()
+        assert job.total == len(chat_ids)
+        assert job.audience == audience
+        return set(chat_ids)
+
+    assert await recipients(BroadcastAudience.ALL_CUSTOMERS) == {"recent", "old", "pending", "cart_then_order"}
+    assert await recipients(BroadcastAudience.RECENT_BUYERS) == {"recent"}
+    assert await recipients(BroadcastAudience.ABANDONED_CARTS) == {"abandoned"}
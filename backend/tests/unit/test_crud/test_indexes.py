@@ -0,0 +1,70 @@
+import re
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.cart import cart_item as cart_item_crud
+from app.crud.category import category as category_crud
+from app.crud.order import order as order_crud
+from app.crud.payment import payment as payment_crud
+from app.crud.product import product as product_crud, product_image as product_image_crud
+from app.crud.review import review as review_crud
+from app.crud.shop import shop as shop_crud
+from app.crud.user import user as user_crud
+from app.models.cart import CartItem
+from app.models.order import Order, OrderStatus
+from app.models.payment import Payment, PaymentProvider
+from app.models.product import Product, ProductImage
+from app.models.review import Review
+from app.models.shop import Shop
+from app.models.user import User
+
+
+def _is_bad_plan(detail: str) -> bool:
+    # Полный проход по таблице или сортировка во временном B-дереве
+    return bool(re.fullmatch(r"SCAN \w+", detail)) or "TEMP B-TREE" in detail
+
+
+@pytest.mark.asyncio
+async def test_crud_queries_use_indexes(db: AsyncSession, test_user: User, test_shop: Shop, test_product: Product, test_order: Order):
+    db.add_all([
+        ProductImage(product_id=test_product.id, image_url="https://example.com/1.png", order=0),
+        CartItem(user_id=test_user.id, product_id=test_product.id, quantity=1, price=test_product.price),
+        Review(product_id=test_product.id, user_id=test_user.id, rating=5),
+        Payment(order_id=test_order.id, provider=PaymentProvider.STRIPE, provider_payment_id="pi_1", amount=1),
+    ])
+    await db.commit()
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    sync_engine = db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        await order_crud.get_by_shop(db, shop_id=test_shop.id)
+        await order_crud.get_by_shop_and_status(db, shop_id=test_shop.id, status=OrderStatus.PENDING)
+        await order_crud.get_by_user(db, user_id=test_user.id)
+        await product_crud.get_by_shop(db, shop_id=test_shop.id)
+        await product_crud.get_by_category(db, category_id=test_product.category_id)
+        await product_image_crud.get_by_product(db, product_id=test_product.id)
+        await category_crud.get_by_shop(db, shop_id=test_shop.id)
+        await cart_item_crud.get_by_user(db, user_id=test_user.id)
+        await review_crud.get_by_product(db, product_id=test_product.id)
+        await review_crud.get_by_user_and_product(db, user_id=test_user.id, product_id=test_product.id)
+        await review_crud.get_product_rating(db, product_id=test_product.id)
+        await payment_crud.get_by_order(db, order_id=test_order.id)
+        await payment_crud.get_by_provider_payment_id(db, provider_payment_id="pi_1")
+        await user_crud.get_user_roles(db, user_id=test_user.id, shop_id=test_shop.id)
+        await shop_crud.get_multi_by_owner(db, owner_id=test_user.id)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+
+    assert statements
+    conn = await db.connection()
+    for statement, parameters in statements:
+        result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        details = [row[-1] for row in result]
+        assert not any(_is_bad_plan(detail) for detail in details), f"{statement}\n{details}"
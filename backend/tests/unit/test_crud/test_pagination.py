@@ -0,0 +1,46 @@
+import pytest
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.base import InvalidCursorError
+from app.crud.order import order as order_crud
+from app.models.order import Order, OrderStatus
+from app.models.shop import Shop
+from app.models.user import User
+
+
+@pytest.mark.asyncio
+async def test_order_cursor_pages_match_offset(db: AsyncSession, test_user: User, test_shop: Shop):
+    # Одинаковый created_at у части заказов проверяет сортировку по id внутри
+    created_at = datetime(2024, 1, 1)
+    db.add_all([
+        Order(
+            user_id=test_user.id,
+            shop_id=test_shop.id,
+            order_number=f"ORD-{i}",
+            status=OrderStatus.PENDING,
+            total_amount=10,
+            created_at=created_at if i % 2 else datetime(2024, 1, 1 + i),
+        )
+        for i in range(7)
+    ])
+    await db.commit()
+
+    expected = await order_crud.get_by_shop(db, shop_id=test_shop.id, limit=100)
+
+    pages, cursor = [], None
+    while True:
+        page = await order_crud.get_by_shop(db, shop_id=test_shop.id, limit=3, cursor=cursor)
+        pages.extend(page)
+        cursor = order_crud.next_cursor(page, 3)
+        if cursor is None:
+            break
+
+    assert [o.id for o in pages] == [o.id for o in expected]
+    assert len(pages) == 7
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor(db: AsyncSession, test_shop: Shop):
+    with pytest.raises(InvalidCursorError):
+        await order_crud.get_by_shop(db, shop_id=test_shop.id, cursor="not-a-cursor")
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.base import InvalidCursorError
+from app.crud.product import product as product_crud
+from app.models.product import Product
+from app.models.shop import Shop
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_name_over_sku_and_description(db: AsyncSession, test_shop: Shop):
+    db.add_all([
+        Product(name="Plain mug", description="Red coffee mug", price=1, shop_id=test_shop.id),
+        Product(name="Red mug", price=1, shop_id=test_shop.id),
+        Product(name="Blue mug", sku="RED-42", price=1, shop_id=test_shop.id),
+        Product(name="Blue cup", price=1, shop_id=test_shop.id),
+    ])
+    await db.commit()
+
+    found = await product_crud.search(db, shop_id=test_shop.id, query="red")
+
+    assert [p.name for p in found] == ["Red mug", "Blue mug", "Plain mug"]
+
+
+@pytest.mark.asyncio
+async def test_search_cursor_pages_match_full_result(db: AsyncSession, test_shop: Shop):
+    # Одинаковый ранг у части товаров проверяет сортировку по id внутри
+    db.add_all(
+        [Product(name=f"Lamp {i}", price=1, shop_id=test_shop.id) for i in range(5)]
+        + [Product(name=f"Desk {i}", description="lamp included", price=1, shop_id=test_shop.id) for i in range(3)]
+    )
+    await db.commit()
+
+    expected = await product_crud.search(db, shop_id=test_shop.id, query="lamp")
+
+    pages, cursor = [], None
+    while True:
+        page = await product_crud.search(db, shop_id=test_shop.id, query="lamp", limit=3, cursor=cursor)
+        pages.extend(page)
+        cursor = product_crud.next_search_cursor(page, 3)
+        if cursor is None:
+            break
+
+    assert [p.id for p in pages] == [p.id for p in expected]
+    assert len(pages) == 8
+
+
+@pytest.mark.asyncio
+async def test_search_invalid_cursor(db: AsyncSession, test_shop: Shop):
+    with pytest.raises(InvalidCursorError):
+        await product_crud.search(db, shop_id=test_shop.id, query="lamp", cursor="not-a-cursor")
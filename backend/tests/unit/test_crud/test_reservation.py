@@ -0,0 +1,185 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.facet import product_facet as product_facet_crud
+from backend.app.crud.order import OrderStatusConflict, order as order_crud
+from app.crud.reservation import stock_reservation as stock_reservation_crud
+from app.models.order import Order, OrderStatus
+from app.models.payment import Payment, PaymentProvider, PaymentStatus
+from app.models.product import Product
+from app.models.reservation import ReservationStatus, StockReservation
+from app.models.shop import Shop
+from app.models.user import User
+from app.schemas.order import OrderCreate
+from app.services import payment_service as payment_service_module
+
+
+async def _checkout(db: AsyncSession, user: User, shop: Shop, product: Product, quantity: int) -> Order:
+    return await order_crud.create_with_items(db, obj_in=OrderCreate(
+        user_id=user.id, shop_id=shop.id, payment_method="card",
+        items=[{"product_id": product.id, "quantity": quantity}],
+    ))
+
+
+async def _state(db: AsyncSession, product: Product, order: Order):
+    stock = await db.scalar(select(Product.stock).where(Product.id == product.id))
+    statuses = (await db.execute(
+        select(StockReservation.status).where(StockReservation.order_id == order.id)
+    )).scalars().all()
+    return stock, statuses
+
+
+@pytest.mark.asyncio
+async def test_paid_order_commits_and_cancelled_order_releases(db: AsyncSession, test_user: User, test_shop: Shop):
+    product = Product(name="Mug", price=10, stock=3, shop_id=test_shop.id)
+    db.add(product)
+    await db.commit()
+
+    paid = await _checkout(db, test_user, test_shop, product, 1)
+    cancelled = await _checkout(db, test_user, test_shop, product, 2)
+    assert await _state(db, product, cancelled) == (0, [ReservationStatus.HELD])
+
+    await order_crud.update_status(db, order_id=paid.id, status=OrderStatus.PAID)
+    await order_crud.update_status(db, order_id=cancelled.id, status=OrderStatus.CANCELLED)
+    assert await _state(db, product, paid) == (2, [ReservationStatus.COMMITTED])
+    assert await _state(db, product, cancelled) == (2, [ReservationStatus.RELEASED])
+
+    # Повторная отмена не возвращает остаток второй раз
+    await order_crud.update_status(db, order_id=cancelled.id, status=OrderStatus.CANCELLED)
+    assert (await _state(db, product, cancelled))[0] == 2
+    summary = await product_facet_crud.get_summary(db, shop_id=test_shop.id)
+    assert summary["availability"] == {"in_stock": 1}
+
+
+@pytest.mark.asyncio
+async def test_release_expired_in_batches(db: AsyncSession, test_user: User, test_shop: Shop):
+    product = Product(name="Lamp", price=10, stock=5, shop_id=test_shop.id)
+    db.add(product)
+    await db.commit()
+    # release_expired без просроченных делает rollback, объекты сессии истекают
+    product_id, shop_id = product.id, product.shop_id
+
+    orders = [(await _checkout(db, test_user, test_shop, product, 1)).id for _ in range(3)]
+    await db.execute(
+        StockReservation.__table__.update()
+        .where(StockReservation.order_id.in_(orders[:2]))
+        .values(expires_at=datetime.now() - timedelta(minutes=1))
+    )
+    await db.commit()
+
+    assert (await stock_reservation_crud.release_expired(db, limit=1))[0] == 1
+    released, restocked = await stock_reservation_crud.release_expired(db, limit=1)
+    assert (released, restocked) == (1, {(shop_id, product_id)})
+    assert (await stock_reservation_crud.release_expired(db, limit=1))[0] == 0
+
+    statuses = dict((await db.execute(
+        select(Order.id, Order.status).where(Order.id.in_(orders))
+    )).all())
+    assert statuses == {orders[0]: OrderStatus.CANCELLED, orders[1]: OrderStatus.CANCELLED, orders[2]: OrderStatus.PENDING}
+    assert await db.scalar(select(Product.stock).where(Product.id == product_id)) == 4
+
+
+@pytest.mark.asyncio
+async def test_order_status_transitions_are_guarded(db: AsyncSession, test_user: User, test_shop: Shop):
+    product = Product(name="Cup", price=10, stock=5, shop_id=test_shop.id)
+    db.add(product)
+    await db.commit()
+
+    paid = await _checkout(db, test_user, test_shop, product, 1)
+    await order_crud.update_status(db, order_id=paid.id, status=OrderStatus.PAID)
+    # FAILED после COMPLETED не отменяет оплаченный заказ и не возвращает остаток
+    with pytest.raises(OrderStatusConflict):
+        await order_crud.update_status(db, order_id=paid.id, status=OrderStatus.CANCELLED)
+    assert await _state(db, product, paid) == (4, [ReservationStatus.COMMITTED])
+    assert (await order_crud.update_status(db, order_id=paid.id, status=OrderStatus.REFUNDED)).status == OrderStatus.REFUNDED
+
+    cancelled = await _checkout(db, test_user, test_shop, product, 1)
+    await order_crud.update_status(db, order_id=cancelled.id, status=OrderStatus.CANCELLED)
+    with pytest.raises(OrderStatusConflict):
+        await order_crud.update_status(db, order_id=cancelled.id, status=OrderStatus.PAID)
+
+    # Удержание уже снято, а заказ ещё PENDING - оплатить без остатка нельзя
+    released_id = (await _checkout(db, test_user, test_shop, product, 1)).id
+    await db.execute(
+        StockReservation.__table__.update()
+        .where(StockReservation.order_id == released_id)
+        .values(status=ReservationStatus.RELEASED)
+    )
+    await db.commit()
+    with pytest.raises(OrderStatusConflict):
+        await order_crud.update_status(db, order_id=released_id, status=OrderStatus.PAID)
+    assert await db.scalar(select(Order.status).where(Order.id == released_id)) == OrderStatus.PENDING
+
+
+@pytest.mark.asyncio
+async def test_payment_after_expired_hold_flags_refund(db: AsyncSession, test_user: User, test_shop: Shop, monkeypatch):
+    product = Product(name="Vase", price=10, stock=1, shop_id=test_shop.id)
+    db.add(product)
+    await db.commit()
+    product_id = product.id
+    order = await _checkout(db, test_user, test_shop, product, 1)
+    order_id = order.id
+    db.add(Payment(order_id=order_id, provider=PaymentProvider.STRIPE, amount=10, status=PaymentStatus.PENDING))
+    await db.execute(
+        StockReservation.__table__.update()
+        .where(StockReservation.order_id == order_id)
+        .values(expires_at=datetime.now() - timedelta(minutes=1))
+    )
+    await db.commit()
+    assert (await stock_reservation_crud.release_expired(db, limit=10))[0] == 1
+
+    service = AsyncMock()
+    service.process_webhook.return_value = (True, PaymentStatus.COMPLETED, str(order_id))
+    monkeypatch.setattr(payment_service_module, "get_payment_service", lambda provider: service)
+    assert await payment_service_module.process_payment_callback(
+        PaymentProvider.STRIPE, {"id": "evt_late"}, {}, b"{}", db
+    )
+
+    db.expire_all()
+    assert await db.scalar(select(Order.status).where(Order.id == order_id)) == OrderStatus.CANCELLED
+    assert await db.scalar(select(Product.stock).where(Product.id == product_id)) == 1
+    payment = (await db.execute(select(Payment).where(Payment.order_id == order_id))).scalar_one()
+    assert payment.status == PaymentStatus.COMPLETED and payment.refund_required
+
+
+@pytest.mark.asyncio
+async def test_payment_completes_order_without_reservations_and_flags_rejected_ones(
+    db: AsyncSession, test_user: User, test_shop: Shop, test_order: Order, monkeypatch
+):
+    # test_order оформлен без удержаний, как заказы до их появления
+    legacy_id = test_order.id
+    db.add(Payment(order_id=legacy_id, provider=PaymentProvider.PAYPAL, amount=10, status=PaymentStatus.PENDING))
+    product = Product(name="Bowl", price=10, stock=2, shop_id=test_shop.id)
+    db.add(product)
+    await db.commit()
+    # Удержание снято, а заказ ещё PENDING - оплатить его нельзя
+    released_id = (await _checkout(db, test_user, test_shop, product, 1)).id
+    db.add(Payment(order_id=released_id, provider=PaymentProvider.PAYPAL, amount=10, status=PaymentStatus.PENDING))
+    await db.execute(
+        StockReservation.__table__.update()
+        .where(StockReservation.order_id == released_id)
+        .values(status=ReservationStatus.RELEASED)
+    )
+    await db.commit()
+
+    service = AsyncMock()
+    monkeypatch.setattr(payment_service_module, "get_payment_service", lambda provider: service)
+    for order_id in (legacy_id, released_id):
+        service.process_webhook.return_value = (True, PaymentStatus.COMPLETED, str(order_id))
+        assert await payment_service_module.process_payment_callback(
+            PaymentProvider.PAYPAL, {"id": f"evt_{order_id}"}, {}, b"{}", db
+        )
+
+    db.expire_all()
+    payments = dict((await db.execute(
+        select(Payment.order_id, Payment.refund_required).where(Payment.status == PaymentStatus.COMPLETED)
+    )).all())
+    assert payments == {legacy_id: False, released_id: True}
+    statuses = dict((await db.execute(
+        select(Order.id, Order.status).where(Order.id.in_([legacy_id, released_id]))
+    )).all())
+    assert statuses == {legacy_id: OrderStatus.PAID, released_id: OrderStatus.PENDING}
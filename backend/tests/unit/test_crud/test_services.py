@@ -12,9 +12,9 @@ from app.schemas.user import UserCreate
 
 @pytest.fixture
 def mock_httpx_client():
-    with patch("httpx.AsyncClient") as mock:
+    with patch("app.services.telegram_service.get_http_client") as mock:
         client_instance = AsyncMock()
-        mock.return_value.__aenter__.return_value = client_instance
+        mock.return_value = client_instance
         
         response = MagicMock()
         response.json.return_value = {"ok": True, "result": {"message_id": 123}}
@@ -0,0 +1,43 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import select, update
+
+from app.crud.product import product as product_crud
+from app.db import session as db_session
+from app.db.pool import InstrumentedQueuePool, pool_stats
+from app.db.session import RoutingSession
+from app.models.product import Product
+
+
+def test_routing_session_sends_marked_reads_to_replica():
+    replica = MagicMock()
+    with patch.object(db_session, "replica_engines", [replica]):
+        db = RoutingSession()
+        assert db.get_bind(clause=select(Product).execution_options(use_replica=True)) is replica.sync_engine
+        assert db.get_bind(clause=select(Product)) is db_session.async_engine.sync_engine
+
+
+def test_routing_session_sticks_to_primary_after_write():
+    replica = MagicMock()
+    with patch.object(db_session, "replica_engines", [replica]):
+        db = RoutingSession()
+        assert db.get_bind(clause=update(Product).values(name="x")) is db_session.async_engine.sync_engine
+        assert db.get_bind(clause=select(Product).execution_options(use_replica=True)) is db_session.async_engine.sync_engine
+
+
+@pytest.mark.asyncio
+async def test_crud_get_reads_primary_unless_asked():
+    db = MagicMock(execute=AsyncMock(return_value=MagicMock()))
+    await product_crud.get(db, 1)
+    await product_crud.get(db, 1, use_replica=True)
+    first, second = (call.args[0] for call in db.execute.call_args_list)
+    assert not first.get_execution_options().get("use_replica")
+    assert second.get_execution_options().get("use_replica")
+
+
+def test_pool_stats_use_configured_overflow():
+    pool = InstrumentedQueuePool(MagicMock(), pool_size=2, max_overflow=3)
+    assert pool.recreate().max_overflow == 3
+    stats = pool_stats(pool, "db")
+    assert stats["db.size"] == 2 and stats["db.utilisation"] == 0.0
@@ -49,21 +49,37 @@ def test_verify_telegram_auth_invalid():
     result = verify_telegram_auth(telegram_data)
     assert result is False
 
-def test_check_user_role(db, test_user, test_admin_role, test_shop):
+@pytest.mark.asyncio
+async def test_check_user_role(db, test_user, test_admin_role, test_shop):
     from backend.app.crud.user import user as user_crud
 
-    user_crud.add_role_to_user(
+    await user_crud.add_role_to_user(
         db=db, 
         user_id=test_user.id, 
         role_id=test_admin_role.id,
         shop_id=test_shop.id
     )
     
-    result = check_user_role(test_user, "admin", test_shop.id, db)
+    result = await check_user_role(test_user, "admin", test_shop.id, db)
     assert result is True
 
-    result = check_user_role(test_user, "manager", test_shop.id, db)
+    result = await check_user_role(test_user, "manager", test_shop.id, db)
     assert result is False
 
-    result = check_user_role(test_user, "admin", 999, db)
+    result = await check_user_role(test_user, "admin", 999, db)
     assert result is False
+
+@pytest.mark.asyncio
+async def test_check_user_role_uses_shop_permissions(db, test_user, test_admin_role, test_shop):
+    from app.core.auth_cache import auth_cache
+    from backend.app.crud.user import user as user_crud
+
+    await user_crud.add_role_to_user(db=db, user_id=test_user.id, role_id=test_admin_role.id, shop_id=test_shop.id)
+    assert await check_user_role(test_user, "admin", test_shop.id, db) is True
+    assert auth_cache.get_permissions(test_user.id, test_shop.id) is not None
+
+    # Снятие роли сбрасывает ту же маску прав, что проверяет get_shop_access
+    await user_crud.remove_role_from_user(db=db, user_id=test_user.id, role_id=test_admin_role.id, shop_id=test_shop.id)
+    await auth_cache.invalidate_roles(test_user.id)
+    assert await check_user_role(test_user, "admin", test_shop.id, db) is False
+    assert await check_user_role(test_user, "admin", None, db) is False
@@ -0,0 +1,98 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.metrics import metrics
+from app.services.telegram_service import BotContext, BotRouter, process_telegram_update
+
+
+def message(text: str, chat_id: int = 42) -> dict:
+    return {"update_id": 1, "message": {"chat": {"id": chat_id}, "from": {"id": chat_id}, "text": text}}
+
+
+def callback(data: str, chat_id: int = 42) -> dict:
+    return {
+        "update_id": 2,
+        "callback_query": {"id": "q", "from": {"id": chat_id}, "message": {"chat": {"id": chat_id}}, "data": data},
+    }
+
+
+@pytest.fixture
+def router():
+    router = BotRouter()
+    calls = []
+
+    async def record(ctx: BotContext) -> None:
+        calls.append((ctx.route, ctx.args, ctx.chat_id))
+
+    router.command("start")(record)
+    router.command("help")(record)
+    router.deep_link("shop")(record)
+    router.callback("shop")(record)
+    router.update("my_chat_member")(record)
+    router.calls = calls
+    return router
+
+
+@pytest.mark.asyncio
+async def test_routes_commands_callbacks_and_deep_links(router):
+    assert await router.dispatch(message("/start"), db=None)
+    assert await router.dispatch(message("/start 7"), db=None)
+    assert await router.dispatch(message("/start shop_5"), db=None)
+    assert await router.dispatch(message("/help@shop_bot"), db=None)
+    assert await router.dispatch(callback("shop_3"), db=None)
+    assert await router.dispatch({"update_id": 3, "my_chat_member": {"chat": {"id": -1}}}, db=None)
+
+    assert router.calls == [
+        ("command.start", "", 42),
+        ("command.start", "7", 42),
+        ("deep_link.shop", "5", 42),
+        ("command.help", "", 42),
+        ("callback.shop", "3", 42),
+        ("my_chat_member", "", -1),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_unrouted_updates_skip_middleware(router):
+    middleware = AsyncMock()
+    router.middleware(middleware)
+
+    assert not await router.dispatch(message("просто текст"), db=None)
+    assert not await router.dispatch(message("/unknown"), db=None)
+    assert not await router.dispatch(callback("cart_1"), db=None)
+    assert not await router.dispatch({"update_id": 4, "edited_message": {"chat": {"id": 1}}}, db=None)
+    middleware.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_middleware_wraps_handler_in_registration_order(router):
+    order = []
+
+    def make(name):
+        async def middleware(ctx, call_next):
+            order.append(f"{name}:before")
+            await call_next(ctx)
+            order.append(f"{name}:after")
+        return middleware
+
+    router.middleware(make("outer"))
+    router.middleware(make("inner"))
+    await router.dispatch(message("/help"), db=None)
+
+    assert order == ["outer:before", "inner:before", "inner:after", "outer:after"]
+    assert router.calls == [("command.help", "", 42)]
+
+
+@pytest.mark.asyncio
+async def test_bot_router_upserts_user_and_captures_errors(db):
+    errors = metrics.snapshot().get("telegram.bot.errors", 0)
+    with patch("app.services.telegram_service.handle_help_command", AsyncMock(side_effect=RuntimeError)):
+        await process_telegram_update(message("/help", chat_id=777001), db)
+    assert metrics.snapshot()["telegram.bot.errors"] == errors + 1
+
+    with patch("app.services.telegram_service.handle_shop_selection", AsyncMock()) as handle:
+        await process_telegram_update(callback("shop_9", chat_id=777001), db)
+    chat_id, user, shop_id, _ = handle.call_args.args
+    assert (chat_id, user.telegram_id, shop_id) == (777001, "777001", 9)
+    assert metrics.snapshot()["telegram.bot.callback.shop.calls"] >= 1
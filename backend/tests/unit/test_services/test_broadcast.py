@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.rate_limit import KeyedThrottle, TokenBucket
+from app.crud.broadcast import broadcast as broadcast_crud
+from app.models.broadcast import BroadcastJob, BroadcastRecipient, BroadcastStatus, RecipientStatus
+from app.services import broadcast as broadcast_module
+from app.services.broadcast import BroadcastEngine
+
+
+class FakeTelegram:
+    """Отвечает по сценарию: chat_id -> список ответов, по одному на попытку"""
+
+    def __init__(self, script=None):
+        self.script = script or {}
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        self.sent.append(chat_id)
+        replies = self.script.get(chat_id)
+        if replies:
+            return replies.pop(0)
+        return {"ok": True, "result": {"message_id": len(self.sent)}}
+
+
+def make_engine(db: AsyncSession, service: FakeTelegram, batch_size: int = 10) -> BroadcastEngine:
+    return BroadcastEngine(
+        rate=1000, chat_interval=0, concurrency=5, batch_size=batch_size, poll_interval=1,
+        session_factory=async_sessionmaker(bind=db.bind, expire_on_commit=False), service=service,
+    )
+
+
+async def _recipients(db: AsyncSession, job_id: int):
+    db.expire_all()
+    result = await db.execute(select(BroadcastRecipient).where(BroadcastRecipient.job_id == job_id))
+    return {r.chat_id: r for r in result.scalars().all()}
+
+
+@pytest.mark.asyncio
+async def test_broadcast_retries_transient_errors_and_completes(db: AsyncSession, monkeypatch):
+    monkeypatch.setattr(broadcast_module.settings, "BROADCAST_RETRY_BASE", 0)
+    monkeypatch.setattr(broadcast_module.settings, "BROADCAST_MAX_ATTEMPTS", 2)
+    service = FakeTelegram({
+        "flaky": [{"ok": False, "error_code": 502, "description": "Bad Gateway"}],
+        "down": [{"ok": False, "description": "timeout"}, {"ok": False, "description": "timeout"}],
+        "blocked": [{"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"}],
+    })
+    job = await broadcast_crud.create(db, shop_id=1, text="Sale!", chat_ids=["1", "flaky", "down", "blocked", "2", "1"])
+    job_id = job.id
+    assert job.total == 5
+
+    await make_engine(db, service).drain()
+    recipients = await _recipients(db, job_id)
+    assert recipients["flaky"].status == RecipientStatus.SENT
+    assert (recipients["down"].status, recipients["down"].attempts) == (RecipientStatus.FAILED, 2)
+    assert (recipients["blocked"].status, recipients["blocked"].attempts) == (RecipientStatus.FAILED, 1)
+    job = await broadcast_crud.get(db, shop_id=1, job_id=job_id)
+    assert job.status == BroadcastStatus.COMPLETED
+    assert (job.sent, job.failed, job.pending) == (3, 2, 0)
+    assert sorted(service.sent) == sorted(["1", "2", "flaky", "flaky", "down", "down", "blocked"])
+
+
+@pytest.mark.asyncio
+async def test_broadcast_honours_retry_after(db: AsyncSession):
+    service = FakeTelegram({
+        "flood": [{"ok": False, "error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": 0.2}}],
+    })
+    job = await broadcast_crud.create(db, shop_id=1, text="Sale!", chat_ids=["1", "flood", "2"])
+    job_id = job.id
+    engine = make_engine(db, service)
+
+    await engine.drain()
+    recipients = await _recipients(db, job_id)
+    # 429 откладывает получателя на retry_after, не тратя попытку, и притормаживает всю отправку
+    assert (recipients["flood"].status, recipients["flood"].attempts) == (RecipientStatus.PENDING, 0)
+    assert engine.bucket.reserve() > 0.1
+    assert (await broadcast_crud.get(db, shop_id=1, job_id=job_id)).status == BroadcastStatus.RUNNING
+
+    await asyncio.sleep(0.25)
+    await engine.drain()
+    db.expire_all()
+    job = await broadcast_crud.get(db, shop_id=1, job_id=job_id)
+    assert (job.status, job.sent, job.failed) == (BroadcastStatus.COMPLETED, 3, 0)
+
+
+@pytest.mark.asyncio
+async def test_paused_broadcast_resumes_where_it_stopped(db: AsyncSession):
+    service = FakeTelegram()
+    job = await broadcast_crud.create(db, shop_id=1, text="News", chat_ids=[str(i) for i in range(25)])
+    job_id = job.id
+    engine = make_engine(db, service, batch_size=10)
+
+    assert await engine.run_batch(job_id) == 10
+    assert (await broadcast_crud.set_status(db, shop_id=1, job_id=job_id, status=BroadcastStatus.PAUSED)).status \
+        == BroadcastStatus.PAUSED
+    assert await engine.drain() == 0
+    # Повторная пауза и отмена чужой рассылки недопустимы
+    assert await broadcast_crud.set_status(db, shop_id=1, job_id=job_id, status=BroadcastStatus.PAUSED) is None
+    assert await broadcast_crud.set_status(db, shop_id=2, job_id=job_id, status=BroadcastStatus.CANCELLED) is None
+
+    await broadcast_crud.set_status(db, shop_id=1, job_id=job_id, status=BroadcastStatus.RUNNING)
+    assert await engine.drain() == 15
+    db.expire_all()
+    job = await db.get(BroadcastJob, job_id)
+    assert job.status == BroadcastStatus.COMPLETED
+    assert job.sent == 25
+    assert len(service.sent) == len(set(service.sent)) == 25
+    assert await broadcast_crud.set_status(db, shop_id=1, job_id=job_id, status=BroadcastStatus.CANCELLED) is None
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_spaces_requests_and_pauses():
+    bucket = TokenBucket(rate=10)
+    delays = [bucket.reserve() for _ in range(3)]
+    assert delays[0] == 0
+    assert delays[1] == pytest.approx(0.1, abs=0.01)
+    assert delays[2] == pytest.approx(0.2, abs=0.01)
+
+    bucket.pause(5)
+    assert bucket.reserve() == pytest.approx(5, abs=0.01)
+
+    throttle = KeyedThrottle(interval=1)
+    assert throttle.reserve("chat") == 0
+    assert throttle.reserve("other") == 0
+    assert throttle.reserve("chat") == pytest.approx(1, abs=0.01)
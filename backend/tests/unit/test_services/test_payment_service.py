@@ -31,9 +31,10 @@ async def test_create_payment(db, test_order, test_shop, monkeypatch):
     
     monkeypatch.setattr("app.services.payment_service.create_stripe_payment", mock_create_stripe)
 
+    await db.refresh(test_shop, attribute_names=["settings"])
     test_shop.settings.payment_providers = json.dumps({"stripe": True, "paypal": False, "yookassa": False})
     db.add(test_shop.settings)
-    db.commit()
+    await db.commit()
     
     result = await create_payment(
         order=test_order,
@@ -49,9 +50,10 @@ async def test_create_payment(db, test_order, test_shop, monkeypatch):
 
 @pytest.mark.asyncio
 async def test_create_payment_provider_disabled(db, test_order, test_shop):
+    await db.refresh(test_shop, attribute_names=["settings"])
     test_shop.settings.payment_providers = json.dumps({"stripe": False, "paypal": False, "yookassa": False})
     db.add(test_shop.settings)
-    db.commit()
+    await db.commit()
     
     result = await create_payment(
         order=test_order,
@@ -75,7 +77,7 @@ async def test_process_payment_callback_success(db, test_order, monkeypatch):
         amount=test_order.total_amount,
         currency="USD"
     )
-    payment = payment_crud.create(db=db, obj_in=payment_in)
+    payment = await payment_crud.create(db=db, obj_in=payment_in)
   
     payload = {
         "id": "stripe_payment_123",
@@ -90,8 +92,8 @@ async def test_process_payment_callback_success(db, test_order, monkeypatch):
         db=db
     )
     
-    db.refresh(payment)
+    await db.refresh(payment)
     assert payment.status == PaymentStatus.COMPLETED
     
-    db.refresh(test_order)
+    await db.refresh(test_order)
     assert test_order.status == OrderStatus.PAID
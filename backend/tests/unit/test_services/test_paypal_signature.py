@@ -0,0 +1,105 @@
+import asyncio
+import base64
+import datetime
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.x509.oid import NameOID
+
+from app.services import paypal_signature
+from app.services.paypal_signature import PayPalCertCache, signed_message, verify_locally
+
+CERT_URL = "https://api.sandbox.paypal.com/v1/notifications/certs/CERT-360caa42"
+WEBHOOK_ID = "WH-1"
+PAYLOAD = b'{"id": "WH-EVENT-1", "event_type": "PAYMENT.CAPTURE.COMPLETED"}'
+
+
+def make_certificate():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "messageverificationcerts.paypal.com")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    return key, cert.public_bytes(serialization.Encoding.PEM)
+
+
+class FakeResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeClient:
+    def __init__(self, pem: bytes):
+        self.pem = pem
+        self.requests = []
+
+    async def get(self, url):
+        self.requests.append(url)
+        await asyncio.sleep(0.01)
+        return FakeResponse(self.pem)
+
+
+@pytest.fixture
+def paypal(monkeypatch):
+    key, pem = make_certificate()
+    client = FakeClient(pem)
+    monkeypatch.setattr(paypal_signature, "get_http_client", lambda upstream: client)
+    monkeypatch.setattr(paypal_signature, "paypal_cert_cache", PayPalCertCache(10, 60))
+
+    def headers(payload: bytes = PAYLOAD, **overrides):
+        result = {
+            "PAYPAL-TRANSMISSION-ID": "69cd13f0-d67a-11e5-baa3-778b53f4ae55",
+            "PAYPAL-TRANSMISSION-TIME": "2026-10-17T10:00:00Z",
+            "PAYPAL-CERT-URL": CERT_URL,
+            "PAYPAL-AUTH-ALGO": "SHA256withRSA",
+        }
+        result.update(overrides)
+        signature = key.sign(signed_message(result, WEBHOOK_ID, payload), padding.PKCS1v15(), hashes.SHA256())
+        result.setdefault("PAYPAL-TRANSMISSION-SIG", base64.b64encode(signature).decode())
+        return result
+
+    return client, headers
+
+
+@pytest.mark.asyncio
+async def test_valid_signature_verified_with_single_cert_fetch(paypal):
+    client, headers = paypal
+
+    results = await asyncio.gather(*(verify_locally(headers(), WEBHOOK_ID, PAYLOAD) for _ in range(10)))
+
+    assert results == [True] * 10
+    assert client.requests == [CERT_URL]
+
+
+@pytest.mark.asyncio
+async def test_tampered_payload_rejected(paypal):
+    _, headers = paypal
+
+    assert await verify_locally(headers(), WEBHOOK_ID, PAYLOAD + b" ") is False
+    assert await verify_locally(headers(), "WH-OTHER", PAYLOAD) is False
+    assert await verify_locally(headers(**{"PAYPAL-TRANSMISSION-SIG": "not base64!"}), WEBHOOK_ID, PAYLOAD) is False
+
+
+@pytest.mark.asyncio
+async def test_untrusted_cert_url_falls_back_to_remote(paypal):
+    client, headers = paypal
+
+    for url in (
+        "https://evil.example.com/v1/notifications/certs/CERT",
+        "http://api.paypal.com/v1/notifications/certs/CERT",
+        "https://api.paypal.com.evil.com/v1/notifications/certs/CERT",
+    ):
+        assert await verify_locally(headers(**{"PAYPAL-CERT-URL": url}), WEBHOOK_ID, PAYLOAD) is None
+    assert await verify_locally(headers(**{"PAYPAL-AUTH-ALGO": "SHA512withRSA"}), WEBHOOK_ID, PAYLOAD) is None
+    assert client.requests == []
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import payment_service
+from app.services.payment_service import PayPalPaymentService, PayPalTokenCache
+
+
+class FakePayPal(PayPalPaymentService):
+    def __init__(self, expires_in: float = 3600):
+        super().__init__("client", "secret", sandbox=True)
+        self.expires_in = expires_in
+        self.fetches = 0
+
+    async def _fetch_access_token(self):
+        self.fetches += 1
+        await asyncio.sleep(0.01)
+        return f"token-{self.fetches}", self.expires_in
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_fetch_token_once():
+    cache, service = PayPalTokenCache(), FakePayPal()
+
+    tokens = await asyncio.gather(*(cache.get(service) for _ in range(20)))
+
+    assert set(tokens) == {"token-1"}
+    assert service.fetches == 1
+
+
+@pytest.mark.asyncio
+async def test_token_refreshed_ahead_of_expiry(monkeypatch):
+    cache, service = PayPalTokenCache(), FakePayPal(expires_in=1000)
+    assert await cache.get(service) == "token-1"
+
+    # В окне обновления отдаётся старый токен, новый запрашивается в фоне один раз
+    now = time.time()
+    monkeypatch.setattr(payment_service.time, "time", lambda: now + 800)
+    assert await asyncio.gather(cache.get(service), cache.get(service)) == ["token-1", "token-1"]
+    await asyncio.sleep(0.05)
+    assert service.fetches == 2
+    assert await cache.get(service) == "token-2"
+
+    # Истёкший токен не отдаётся
+    monkeypatch.setattr(payment_service.time, "time", lambda: now + 5000)
+    assert await cache.get(service) == "token-3"
+
+
+@pytest.mark.asyncio
+async def test_token_shared_between_workers_through_redis(monkeypatch):
+    monkeypatch.setattr(payment_service.settings, "PAYPAL_TOKEN_SHARED", True)
+    first, second = FakePayPal(), FakePayPal()
+
+    assert await PayPalTokenCache().get(first) == "token-1"
+    assert await PayPalTokenCache().get(second) == "token-1"
+    assert second.fetches == 0
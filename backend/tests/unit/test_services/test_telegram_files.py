@@ -0,0 +1,71 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.telegram_file import telegram_file as telegram_file_crud
+from app.services.telegram_files import TelegramFileCache
+
+LOGO = "https://shop.example.com/uploads/1/logo.png"
+
+
+class FakeService:
+    def __init__(self, bot_token: str = "1001:SECRET"):
+        self.bot_token = bot_token
+        self.uploads = 0
+        self.send_photo = AsyncMock(side_effect=self._send_photo)
+
+    async def _send_photo(self, chat_id, photo, **kwargs):
+        if photo.startswith("http"):
+            self.uploads += 1
+            return {"ok": True, "result": {"photo": [
+                {"file_id": f"small-{self.uploads}"}, {"file_id": f"big-{self.uploads}"},
+            ]}}
+        return {"ok": True, "result": {"photo": [{"file_id": photo}]}}
+
+    def sent(self):
+        return [call.kwargs["photo"] for call in self.send_photo.call_args_list]
+
+
+@pytest.mark.asyncio
+async def test_file_id_reused_after_first_upload(db: AsyncSession):
+    service = FakeService()
+    await TelegramFileCache(100, 60).send_photo(db, service, chat_id=1, url=LOGO, caption="Магазин")
+    await TelegramFileCache(100, 60).send_photo(db, service, chat_id=2, url=LOGO, caption="Магазин")
+
+    # Второй процесс (новый кэш) берёт file_id из БД
+    assert service.sent() == [LOGO, "big-1"]
+    assert service.send_photo.call_args.kwargs["caption"] == "Магазин"
+
+    # file_id другого бота не подходит
+    other = FakeService("2002:SECRET")
+    await TelegramFileCache(100, 60).send_photo(db, other, chat_id=1, url=LOGO)
+    assert other.sent() == [LOGO]
+
+
+@pytest.mark.asyncio
+async def test_rejected_file_id_replaced(db: AsyncSession):
+    service = FakeService()
+    cache = TelegramFileCache(100, 60)
+    await telegram_file_crud.save(db, bot_id="1001", url=LOGO, file_id="expired")
+    service.send_photo.side_effect = [
+        {"ok": False, "error_code": 400, "description": "Bad Request: wrong file identifier"},
+        {"ok": True, "result": {"photo": [{"file_id": "fresh"}]}},
+    ]
+
+    await cache.send_photo(db, service, chat_id=1, url=LOGO)
+    assert service.sent() == ["expired", LOGO]
+    assert await telegram_file_crud.get_file_id(db, bot_id="1001", url=LOGO) == "fresh"
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_new_upload(db: AsyncSession):
+    service = FakeService()
+    cache = TelegramFileCache(100, 60)
+    await cache.send_photo(db, service, chat_id=1, url=LOGO)
+    await cache.invalidate(db, None, LOGO)
+    assert await telegram_file_crud.get_file_id(db, bot_id="1001", url=LOGO) is None
+
+    await cache.send_photo(db, service, chat_id=1, url=LOGO)
+    await cache.send_photo(db, service, chat_id=1, url=LOGO)
+    assert service.sent() == [LOGO, LOGO, "big-2"]
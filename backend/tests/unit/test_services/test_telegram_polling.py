@@ -0,0 +1,121 @@
+import asyncio
+import json
+from collections import defaultdict
+
+import pytest
+import pytest_asyncio
+
+from app.core.http import close_http_clients
+from app.services import telegram_updates as telegram_updates_module
+from app.services.telegram_polling import TelegramPoller
+from app.services.telegram_service import TelegramService
+from app.services.telegram_updates import TelegramUpdateQueue, update_chat_id
+
+
+class FakeBotAPI:
+    """Локальный Bot API: getUpdates с offset и long polling, как у Telegram"""
+
+    def __init__(self):
+        self.updates = []
+        self.requests = []
+        self._new = asyncio.Event()
+
+    def push(self, *update_ids: int, chat_id: int = 1):
+        for update_id in update_ids:
+            self.updates.append({"update_id": update_id, "message": {"chat": {"id": chat_id}, "text": "hi"}})
+        self._new.set()
+
+    async def get_updates(self, params):
+        self.requests.append(params)
+        offset = params.get("offset")
+        if offset is not None:
+            # Запрос с offset подтверждает все апдейты до него
+            self.updates = [u for u in self.updates if u["update_id"] >= offset]
+        if not self.updates and params.get("timeout"):
+            self._new.clear()
+            try:
+                await asyncio.wait_for(self._new.wait(), params["timeout"])
+            except asyncio.TimeoutError:
+                pass
+        return {"ok": True, "result": self.updates[:params.get("limit", 100)]}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                body = await reader.readexactly(length)
+                method = head.split(b" ")[1].rsplit(b"/", 1)[-1].decode()
+                if method == "getUpdates":
+                    result = await self.get_updates(json.loads(body or b"{}"))
+                else:
+                    result = {"ok": False, "error_code": 404, "description": "Not Found"}
+                data = json.dumps(result).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(data)).encode() + b"\r\n\r\n" + data
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+@pytest_asyncio.fixture
+async def bot_api():
+    api = FakeBotAPI()
+    server = await asyncio.start_server(api.handle, "127.0.0.1", 0)
+    service = TelegramService("TEST")
+    service.api_url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/botTEST"
+    yield api, service
+    await close_http_clients()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_polling_processes_updates_and_resumes_from_saved_offset(bot_api, monkeypatch):
+    api, service = bot_api
+    processed = defaultdict(list)
+
+    async def fake_process(update, db):
+        await asyncio.sleep(0.01)
+        processed[update_chat_id(update)].append(update["update_id"])
+
+    monkeypatch.setattr(telegram_updates_module, "process_telegram_update", fake_process)
+
+    def make_poller() -> TelegramPoller:
+        queue = TelegramUpdateQueue(consumers=2, max_size=4, dedup_window=100, dedup_ttl=60)
+        queue.start()
+        return TelegramPoller(queue, service=service, timeout=1, limit=3)
+
+    api.push(1, 2, 3, chat_id=10)
+    api.push(4, 5, chat_id=20)
+    poller = make_poller()
+    assert await poller.load_offset() is None
+    assert await poller.poll_once() == 3
+    assert await poller.poll_once() == 2
+    assert poller.offset == 6
+    assert processed == {10: [1, 2, 3], 20: [4, 5]}
+    await poller.queue.stop()
+
+    # Перезапуск: offset берётся из Redis, уже обработанное не приходит снова
+    api.push(6, chat_id=10)
+    restarted = make_poller()
+    assert await restarted.load_offset() == 6
+    assert await restarted.poll_once() == 1
+    assert processed[10] == [1, 2, 3, 6]
+    assert api.requests[-1] == {"timeout": 1, "limit": 3, "offset": 6}
+
+    # Long polling: запрос ждёт, пока не появятся апдейты
+    task = asyncio.create_task(restarted.poll_once())
+    await asyncio.sleep(0.2)
+    assert not task.done()
+    api.push(7, chat_id=20)
+    assert await task == 1
+    assert processed[20] == [4, 5, 7]
+    await restarted.queue.stop()
@@ -0,0 +1,60 @@
+import asyncio
+import random
+from collections import defaultdict
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.metrics import metrics
+from app.services import telegram_updates as telegram_updates_module
+from app.services.telegram_updates import TelegramUpdateQueue, update_chat_id
+
+
+def make_update(update_id: int, chat_id: int):
+    return {"update_id": update_id, "message": {"message_id": update_id, "chat": {"id": chat_id}, "text": "hi"}}
+
+
+@pytest.mark.asyncio
+async def test_updates_deduplicated_and_ordered_per_chat(db: AsyncSession, monkeypatch):
+    processed = defaultdict(list)
+    sessions = []
+
+    async def fake_process(update, db):
+        assert db not in sessions
+        sessions.append(db)
+        await asyncio.sleep(random.random() / 100)
+        processed[update_chat_id(update)].append(update["update_id"])
+
+    monkeypatch.setattr(telegram_updates_module, "process_telegram_update", fake_process)
+    queue = TelegramUpdateQueue(consumers=4, max_size=400, dedup_window=1000, dedup_ttl=60,
+                                session_factory=async_sessionmaker(bind=db.bind, expire_on_commit=False))
+    updates = [make_update(update_id, chat_id=update_id % 7) for update_id in range(1, 71)]
+    assert all([await queue.enqueue(update) for update in updates])
+    # Переотправленные Telegram апдейты отбрасываются
+    assert not any([await queue.enqueue(update) for update in updates[:10]])
+    assert queue.depth() == 70
+    assert metrics.snapshot()["telegram.updates.depth"] >= 0
+
+    queue.start()
+    await queue.stop()
+
+    assert queue.depth() == 0
+    assert sum(len(ids) for ids in processed.values()) == 70
+    for chat_id, ids in processed.items():
+        assert ids == sorted(ids), chat_id
+    # Каждый апдейт - в своей сессии
+    assert len(sessions) == 70
+    assert metrics.snapshot()["telegram.updates.lag"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_shared_dedup_across_processes(monkeypatch):
+    monkeypatch.setattr(telegram_updates_module.settings, "TELEGRAM_UPDATE_DEDUP_SHARED", True)
+    first, second = (TelegramUpdateQueue(consumers=1, max_size=1, dedup_window=100, dedup_ttl=60) for _ in range(2))
+
+    assert await first.enqueue(make_update(1, chat_id=5))
+    assert not await second.enqueue(make_update(1, chat_id=5))
+    # Отклонённый из-за переполнения апдейт забывается и принимается при повторе
+    with pytest.raises(telegram_updates_module.UpdateQueueFull):
+        await first.enqueue(make_update(2, chat_id=5))
+    assert await second.enqueue(make_update(2, chat_id=5))
@@ -0,0 +1,69 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.crud.user import user as user_crud
+from app.models.user import User
+from app.services.telegram_users import TelegramUserSync
+
+
+def from_user(first_name: str = "Иван", username: str = "ivan") -> dict:
+    return {"id": 555001, "first_name": first_name, "last_name": None, "username": username}
+
+
+async def stored(db: AsyncSession) -> User:
+    db.expire_all()
+    return (await db.execute(select(User).where(User.telegram_id == "555001"))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_known_user_served_from_cache(db: AsyncSession):
+    sync = TelegramUserSync(interval=60, session_factory=async_sessionmaker(bind=db.bind, expire_on_commit=False))
+    created = await sync.upsert(db, from_user())
+    assert created.id and created.first_name == "Иван"
+
+    with patch.object(user_crud, "get_by_telegram_id", AsyncMock(side_effect=AssertionError("DB lookup"))):
+        user = await sync.upsert(db, from_user())
+    assert user.id == created.id
+    assert sync.pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_profile_changes_written_back_in_batch(db: AsyncSession):
+    sync = TelegramUserSync(interval=60, session_factory=async_sessionmaker(bind=db.bind, expire_on_commit=False))
+    await sync.upsert(db, from_user())
+    await sync.upsert(db, from_user(first_name="Ваня"))
+    user = await sync.upsert(db, from_user(first_name="Иван Петрович", username="ivan_p"))
+
+    # Хендлер видит новый профиль сразу, в БД он попадёт при сбросе пачки
+    assert (user.first_name, user.username) == ("Иван Петрович", "ivan_p")
+    assert sync.pending() == 1
+    await db.commit()
+    assert (await stored(db)).first_name == "Иван"
+
+    assert await sync.flush() == 1
+    row = await stored(db)
+    assert (row.first_name, row.username, row.id) == ("Иван Петрович", "ivan_p", user.id)
+    assert sync.pending() == 0 and await sync.flush() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_newer_changes(db: AsyncSession):
+    sync = TelegramUserSync(interval=60, session_factory=async_sessionmaker(bind=db.bind, expire_on_commit=False))
+    await sync.upsert(db, from_user())
+    await sync.upsert(db, from_user(first_name="Ваня"))
+
+    async def fail(session, profiles):
+        # Пока пачка пишется, пришло ещё одно изменение
+        await sync.upsert(db, from_user(first_name="Иван Петрович"))
+        raise RuntimeError("db down")
+
+    with patch.object(user_crud, "upsert_profiles", AsyncMock(side_effect=fail)):
+        with pytest.raises(RuntimeError):
+            await sync.flush()
+    assert sync.pending() == 1
+
+    await sync.stop()
+    assert (await stored(db)).first_name == "Иван Петрович"
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.crud.webhook import webhook_event as webhook_event_crud
+from app.models.payment import PaymentProvider, WebhookEvent, WebhookStatus
+from app.services import webhook_inbox as webhook_inbox_module
+from app.services.webhook_inbox import WebhookInbox, retry_delay
+
+
+async def _events(db: AsyncSession):
+    db.expire_all()
+    return {e.event_id: e for e in (await db.execute(select(WebhookEvent))).scalars().all()}
+
+
+@pytest.mark.asyncio
+async def test_inbox_retries_temporary_errors_and_skips_inapplicable_events(db: AsyncSession, monkeypatch):
+    monkeypatch.setattr(webhook_inbox_module.settings, "WEBHOOK_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(webhook_inbox_module.settings, "WEBHOOK_RETRY_BASE", 0)
+    calls = []
+
+    async def fake_callback(provider, payload, headers, raw_payload, db):
+        calls.append((payload["id"], headers.get("Stripe-Signature"), raw_payload))
+        if payload["id"] == "evt_bad":
+            raise RuntimeError("database is locked")
+        return payload["id"] == "evt_ok"
+
+    monkeypatch.setattr(webhook_inbox_module, "process_payment_callback", fake_callback)
+    for event_id in ("evt_ok", "evt_unknown", "evt_bad"):
+        body = json.dumps({"id": event_id}).encode()
+        assert await webhook_event_crud.enqueue(
+            db, provider=PaymentProvider.STRIPE, event_id=event_id, payload=body, headers={"stripe-signature": "sig"}
+        )
+    assert not await webhook_event_crud.enqueue(
+        db, provider=PaymentProvider.STRIPE, event_id="evt_ok", payload=b"{}", headers={}
+    )
+
+    inbox = WebhookInbox(workers=1, batch_size=1, poll_interval=1,
+                         session_factory=async_sessionmaker(bind=db.bind, expire_on_commit=False))
+    assert await inbox.drain() == 4
+    events = await _events(db)
+    assert events["evt_ok"].status == WebhookStatus.DONE
+    # Неприменимое событие завершается с первой попытки, временная ошибка повторяется
+    assert (events["evt_unknown"].status, events["evt_unknown"].attempts) == (WebhookStatus.DONE, 1)
+    assert events["evt_unknown"].last_error
+    assert events["evt_bad"].status == WebhookStatus.FAILED
+    assert events["evt_bad"].attempts == 2
+    assert events["evt_bad"].last_error == "database is locked"
+    assert calls[0] == ("evt_ok", "sig", json.dumps({"id": "evt_ok"}).encode())
+    assert await inbox.drain() == 0
+
+
+def test_retry_delay_is_exponential_and_capped(monkeypatch):
+    monkeypatch.setattr(webhook_inbox_module.settings, "WEBHOOK_RETRY_BASE", 5)
+    monkeypatch.setattr(webhook_inbox_module.settings, "WEBHOOK_RETRY_MAX", 60)
+    assert [retry_delay(attempt) for attempt in range(1, 6)] == [5, 10, 20, 40, 60]
@@ -0,0 +1,38 @@
+from app.core.suggest import CATEGORY, PRODUCT, ShopSuggestIndex
+
+
+def test_prefix_matches_any_word():
+    index = ShopSuggestIndex.build(100, [
+        (PRODUCT, 1, "Leather Boots"),
+        (PRODUCT, 2, "Boots cleaner"),
+        (CATEGORY, 3, "Boots"),
+        (PRODUCT, 4, "Scarf"),
+    ])
+
+    assert {(s["type"], s["id"]) for s in index.lookup("BOO", 10)} == {(PRODUCT, 1), (PRODUCT, 2), (CATEGORY, 3)}
+    assert index.lookup("leather b", 10) == [{"text": "Leather Boots", "type": PRODUCT, "id": 1}]
+    assert len(index.lookup("b", 2)) == 2
+
+
+def test_incremental_add_and_remove():
+    index = ShopSuggestIndex.build(100, [(PRODUCT, 1, "Red hat")])
+
+    index.add(PRODUCT, 1, "Blue hat")
+    index.add(PRODUCT, 2, "Red scarf")
+    assert [s["id"] for s in index.lookup("red", 10)] == [2]
+    assert [s["text"] for s in index.lookup("hat", 10)] == ["Blue hat"]
+
+    index.remove(PRODUCT, 1)
+    assert index.lookup("hat", 10) == []
+    assert len(index.entries) == 2
+
+
+def test_memory_cap_keeps_full_names_first():
+    index = ShopSuggestIndex.build(3, [(PRODUCT, i, f"Item number {i}") for i in range(3)])
+
+    assert len(index.entries) == 3
+    assert [s["id"] for s in index.lookup("item", 10)] == [0, 1, 2]
+    assert index.lookup("number", 10) == []
+
+    index.add(PRODUCT, 9, "Overflow")
+    assert index.lookup("overflow", 10) == []
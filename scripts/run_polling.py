@@ -0,0 +1,55 @@
+import asyncio
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Модули backend импортируют друг друга и как app.*, и как backend.app.*
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.core.config import settings
+from app.core.http import close_http_clients
+from app.core.redis import close_redis
+from app.services.telegram_polling import TelegramPoller
+from app.services.telegram_service import telegram_service
+from app.services.telegram_updates import TelegramUpdateQueue
+from app.services.telegram_users import telegram_user_sync
+
+
+async def run_polling(timeout: int, limit: int, concurrency: int):
+    # Пока установлен вебхук, getUpdates возвращает 409 Conflict
+    print("Удаление вебхука...")
+    result = await telegram_service.delete_webhook()
+    print(f"Результат: {result}")
+    
+    queue = TelegramUpdateQueue(
+        concurrency,
+        settings.TELEGRAM_UPDATE_QUEUE_SIZE,
+        settings.TELEGRAM_UPDATE_DEDUP_WINDOW,
+        settings.TELEGRAM_UPDATE_DEDUP_TTL,
+    )
+    poller = TelegramPoller(queue, timeout=timeout, limit=limit)
+    print(f"Получение апдейтов, offset: {await poller.load_offset()}")
+    telegram_user_sync.start()
+    try:
+        await poller.run()
+    finally:
+        await telegram_user_sync.stop()
+        await close_http_clients()
+        await close_redis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Получение апдейтов Telegram через long polling (вместо вебхука)")
+    parser.add_argument("--timeout", type=int, default=settings.TELEGRAM_POLLING_TIMEOUT, help="Ожидание getUpdates, с")
+    parser.add_argument("--limit", type=int, default=settings.TELEGRAM_POLLING_LIMIT, help="Апдейтов за запрос (1-100)")
+    parser.add_argument("--concurrency", type=int, default=settings.TELEGRAM_UPDATE_CONSUMERS, help="Параллельных обработчиков")
+    
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    
+    try:
+        asyncio.run(run_polling(args.timeout, args.limit, args.concurrency))
+    except KeyboardInterrupt:
+        print("Остановлено")